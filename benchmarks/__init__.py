@@ -0,0 +1,6 @@
+'''
+Пакет бенчмарков производительности бота Vk-сообщества.
+
+Бенчмарки запускаются из корня проекта командой python -m benchmarks.<модуль>.
+
+'''
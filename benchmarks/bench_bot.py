@@ -0,0 +1,196 @@
+'''
+Нагрузочный бенчмарк бота: VkontakteBot (метод __call__) получает сообщения
+имитируемых пользователей от Long Poll сервера и отвечает им. Каждый пользователь
+проходит сценарий: приветствие, поиск, реакции на партнеров ('Далее', 'Лайк',
+'Дизлайк') и просмотр избранного, следующее сообщение отправляется после
+получения ответа бота на предыдущее.
+
+Запросы к API и Long Poll сервер - локальный сервер tests.fake_vk. Требует
+доступной базы данных (параметры подключения в config.py), тестовые данные
+удаляются по окончании. Выводит количество обработанных событий в секунду,
+перцентили задержки ответа пользователю по командам и количество запросов
+к API и базе данных на одно событие.
+
+Запуск: python -m benchmarks.bench_bot [пользователей] [одновременно активных]
+Параметры бота задаются переменными окружения (config.py), например, ограничения
+частоты запросов к API снимаются переменными VKGROUPRPS=1000 VKUSERRPS=1000.
+
+'''
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import random
+import sys
+import threading
+import time
+
+import sqlalchemy as sq
+
+from main import Database, Buttons, VkontakteBot
+from models import Users, Partners, UsersPartners, SearchCursors, DatabaseConfig
+from extrapacks.config import (BOT_WORKERS, PREFETCH_SIZE, REACTIONS_FLUSH_INTERVAL,
+                               OUTBOX_ENABLED, VK_GROUP_RPS, VK_USER_RPS)
+from extrapacks.dispatcher import LatencyStats
+from extrapacks.longpoll import ResilientLongPoll
+from tests.fake_vk import FakeVkServer
+
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+USERS_START = 950000000
+SWIPES = 8
+LATENCY = 0.005
+REPLY_TIMEOUT = 30
+
+# команда: (название в отчете, количество ответных сообщений бота)
+COMMANDS = {
+    'Начать': ('greeting', 2),
+    Buttons.start_searching_label: ('search', 2),
+    Buttons.next_partner_label: ('next', 1),
+    Buttons.like_label: ('like', 1),
+    Buttons.dislike_label: ('dislike', 1),
+    Buttons.favorites_label: ('favorites', 1),
+    Buttons.favorites_next_label: ('favorites_next', 1),
+}
+
+
+class BenchBot(VkontakteBot):
+    '''Бот, подключающийся к Long Poll серверу локального сервера API.
+
+    '''
+    def __init__(self, server: FakeVkServer):
+        super().__init__(token='bench-bot')
+        self.server = server
+        server.mount(self.http)
+        server.mount(self.api_user_token.http)
+
+    def create_longpoll(self) -> ResilientLongPoll:
+        longpoll = ResilientLongPoll(self, wait=1)
+        self.server.mount(longpoll.session)
+        return longpoll
+
+
+def delete_data():
+    '''Функция удаления тестовых данных.
+
+    '''
+    users = sq.and_(Users.id_user >= USERS_START, Users.id_user < USERS_START + USERS)
+    with DatabaseConfig.Session() as session:
+        session.query(SearchCursors).filter(
+            SearchCursors.id_user.between(USERS_START, USERS_START + USERS - 1)).delete()
+        session.query(UsersPartners).filter(
+            UsersPartners.id_user.between(USERS_START, USERS_START + USERS - 1)).delete()
+        start = FakeVkServer.search_id_start
+        session.query(Partners).filter(
+            Partners.id_partner.between(start, start + 1000 * FakeVkServer.search_total)).delete()
+        session.query(Users).filter(users).delete()
+        session.commit()
+
+
+def get_script(user_id: int) -> list:
+    '''Функция формирования сценария сообщений пользователя.
+
+    '''
+    rnd = random.Random(user_id)
+    swipes = [Buttons.next_partner_label, Buttons.like_label, Buttons.dislike_label]
+    return ['Начать', Buttons.start_searching_label,
+            *rnd.choices(swipes, weights=(2, 3, 3), k=SWIPES),
+            Buttons.favorites_label, Buttons.favorites_next_label]
+
+
+class Population:
+    '''Класс имитируемых пользователей бота.
+
+    '''
+    def __init__(self, server: FakeVkServer):
+        self.server = server
+        self.latency = {name: LatencyStats(sample_size=10 ** 6) for name, _ in COMMANDS.values()}
+        self.events = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def run_user(self, user_id: int):
+        '''Метод выполнения сценария одного пользователя.
+
+        '''
+        for text in get_script(user_id):
+            name, replies = COMMANDS[text]
+            start = time.perf_counter()
+            self.server.push_message(user_id, text)
+            replied = self.server.wait_replies(user_id, replies, timeout=REPLY_TIMEOUT)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.events += 1
+                if replied:
+                    self.latency[name].add(elapsed)
+                else:
+                    self.timeouts += 1
+
+    def run(self, users: range, concurrency: int):
+        '''Метод выполнения сценариев пользователей, не более concurrency одновременно.
+
+        '''
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for _ in executor.map(self.run_user, users):
+                pass
+
+
+def report(population: Population, elapsed: float, api_calls: Counter, db_queries: int):
+    '''Функция вывода результатов бенчмарка.
+
+    '''
+    events = population.events
+    print(f'BOT_WORKERS={BOT_WORKERS}, PREFETCH_SIZE={PREFETCH_SIZE}, '
+          f'REACTIONS_FLUSH_INTERVAL={REACTIONS_FLUSH_INTERVAL}, OUTBOX_ENABLED={OUTBOX_ENABLED}, '
+          f'VK_GROUP_RPS={VK_GROUP_RPS:g}, VK_USER_RPS={VK_USER_RPS:g}, '
+          f'API latency {LATENCY * 1000:g} ms')
+    print(f'{USERS} users ({CONCURRENCY} concurrent): {events} events in {elapsed:.1f} s, '
+          f'{events / elapsed:.0f} events/s, {population.timeouts} timeouts')
+    for name, stats in population.latency.items():
+        if stats.count:
+            print(f'  {name:<15} n={stats.count:<6} p50 {stats.percentile(50) * 1000:7.1f} ms  '
+                  f'p95 {stats.percentile(95) * 1000:7.1f} ms  '
+                  f'p99 {stats.percentile(99) * 1000:7.1f} ms')
+    total_calls = sum(api_calls.values())
+    print(f'API calls per event: {total_calls / events:.2f} '
+          f'({", ".join(f"{method} {count}" for method, count in api_calls.most_common())})')
+    print(f'DB queries per event: {db_queries / events:.2f}')
+
+
+if __name__ == '__main__':
+    logging.disable(logging.INFO)
+    delete_data()
+
+    db_queries = Counter()
+    db_lock = threading.Lock()
+
+    def count_query(*args):
+        with db_lock:
+            db_queries['query'] += 1
+
+    sq.event.listen(DatabaseConfig.engine, 'before_cursor_execute', count_query)
+    try:
+        with FakeVkServer(latency=LATENCY) as fake_server:
+            bot = BenchBot(fake_server)
+            bot_thread = threading.Thread(target=bot, name='bench-bot')
+            bot_thread.start()
+            while bot_thread.is_alive() and not bot.registry.wait(timeout=0.1):
+                pass
+            if not bot_thread.is_alive():
+                raise RuntimeError('Бот остановлен до начала бенчмарка')
+
+            population = Population(fake_server)
+            fake_server.calls.clear()
+            db_queries.clear()
+            start = time.perf_counter()
+            population.run(range(USERS_START, USERS_START + USERS), CONCURRENCY)
+            elapsed = time.perf_counter() - start
+            api_calls = Counter(fake_server.calls)
+            queries = db_queries['query']
+
+            fake_server.push_message(USERS_START, 'Стоп')
+            bot_thread.join()
+            report(population, elapsed, api_calls, queries)
+    finally:
+        Database.session.remove()
+        delete_data()
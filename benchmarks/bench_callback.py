@@ -0,0 +1,105 @@
+'''
+Нагрузочный бенчмарк сервера Callback API: генератор нагрузки отправляет
+уведомления message_new по нескольким постоянным HTTP-соединениям (часть
+уведомлений - повторные доставки), потребитель получает события генератором listen.
+
+Выводит количество обработанных запросов в секунду, перцентили задержки
+ответа сервера и количество полученных потребителем событий.
+
+Запуск: python -m benchmarks.bench_callback [запросов] [соединений]
+
+'''
+import http.client
+import json
+import logging
+import sys
+import threading
+import time
+
+from extrapacks.callback import CallbackServer
+from extrapacks.dispatcher import LatencyStats
+
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+CONNECTIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+DUPLICATE_EVERY = 20
+SECRET = 'bench-secret'
+
+
+def create_body(number: int) -> bytes:
+    '''Функция формирования уведомления о новом сообщении.
+
+    '''
+    user_id = 960000000 + number % 5000
+    return json.dumps({
+        'type': 'message_new', 'event_id': f'event-{number}', 'v': '5.199',
+        'group_id': 1, 'secret': SECRET,
+        'object': {'message': {'id': number, 'date': 1700000000, 'from_id': user_id,
+                               'peer_id': user_id, 'text': 'Далее'},
+                   'client_info': {}}}).encode('utf-8')
+
+
+def send_requests(address: tuple, numbers: range, latency: LatencyStats, lock: threading.Lock):
+    '''Функция отправки уведомлений по одному постоянному соединению.
+
+       Каждое DUPLICATE_EVERY-е уведомление отправляется повторно.
+
+    '''
+    connection = http.client.HTTPConnection(*address[:2], timeout=10)
+    headers = {'Content-Type': 'application/json'}
+    durations = []
+    for number in numbers:
+        body = create_body(number)
+        for _ in range(2 if number % DUPLICATE_EVERY == 0 else 1):
+            start = time.perf_counter()
+            connection.request('POST', '/callback', body=body, headers=headers)
+            response = connection.getresponse()
+            assert response.read() == b'ok'
+            durations.append(time.perf_counter() - start)
+    connection.close()
+    with lock:
+        for duration in durations:
+            latency.add(duration)
+
+
+def consume(server: CallbackServer, expected: int, received: list):
+    '''Функция получения событий потребителем.
+
+    '''
+    events = server.listen()
+    for _ in range(expected):
+        next(events)
+        received.append(time.perf_counter())
+
+
+if __name__ == '__main__':
+    logging.disable(logging.INFO)
+    server = CallbackServer('127.0.0.1', 0, confirmation='bench', secret=SECRET,
+                            dedup_size=REQUESTS)
+    server.start()
+    received = []
+    consumer = threading.Thread(target=consume, args=(server, REQUESTS, received))
+    consumer.start()
+
+    latency = LatencyStats(sample_size=REQUESTS * 2)
+    lock = threading.Lock()
+    senders = [threading.Thread(target=send_requests,
+                                args=(server.address, range(index, REQUESTS, CONNECTIONS),
+                                      latency, lock))
+               for index in range(CONNECTIONS)]
+    start = time.perf_counter()
+    for sender in senders:
+        sender.start()
+    for sender in senders:
+        sender.join()
+    elapsed = time.perf_counter() - start
+    consumer.join(timeout=30)
+    server.shutdown()
+
+    stats = server.get_stats()
+    print(f'{stats["received"]} requests over {CONNECTIONS} connections in {elapsed:.2f} s: '
+          f'{stats["received"] / elapsed:.0f} requests/s')
+    print(f'ack latency p50 {latency.percentile(50) * 1000:.2f} ms, '
+          f'p95 {latency.percentile(95) * 1000:.2f} ms, p99 {latency.percentile(99) * 1000:.2f} ms')
+    print(f'events delivered {len(received)}, duplicates dropped {stats["duplicates"]}, '
+          f'last event delivered {(received[-1] - start) * 1000:.0f} ms after start')
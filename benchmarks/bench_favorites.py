@@ -0,0 +1,114 @@
+'''
+Бенчмарк выборки избранных партнеров Database.get_favorite_partners по мере роста
+таблицы "users_partners": полный список и страница (keyset-пагинация) с частичным
+индексом ix_users_partners_favorites и без него.
+
+Требует доступной базы данных (параметры подключения в config.py),
+тестовые данные удаляются по окончании.
+
+'''
+import time
+
+import sqlalchemy as sq
+
+from main import Database
+from models import UsersPartners, DatabaseConfig
+
+
+START = 4000000000
+PARTNERS = 100000
+REACTIONS = 100
+TARGET_REACTIONS = 20000
+STEPS = (1000, 10000, 30000)
+PAGE_SIZE = 10
+CALLS = 200
+
+
+def execute(statement: str, **params):
+    '''Функция выполнения запроса вне транзакции.
+
+    '''
+    with DatabaseConfig.engine.connect() as connection:
+        connection.execution_options(isolation_level='AUTOCOMMIT').\
+            execute(sq.text(statement), params)
+
+
+def fill_data(users_from: int, users_to: int):
+    '''Функция добавления пользователей и их реакций: по REACTIONS реакций,
+       каждая десятая - "нравится".
+
+    '''
+    execute('INSERT INTO users (id_user, id_city, age, sex) '
+            'SELECT :start + u, 1, 25, 1 FROM generate_series(:u_from, :u_to) u',
+            start=START, u_from=users_from, u_to=users_to - 1)
+    execute('INSERT INTO users_partners (id_user, id_partner, ignore) '
+            'SELECT :start + u, :start + (u * 37 + k) % :partners, k % 10 <> 0 '
+            'FROM generate_series(:u_from, :u_to) u, generate_series(0, :reactions - 1) k',
+            start=START, partners=PARTNERS, reactions=REACTIONS,
+            u_from=users_from, u_to=users_to - 1)
+    execute('ANALYZE users_partners')
+
+
+def fill_target():
+    '''Функция добавления активного пользователя с TARGET_REACTIONS реакциями.
+
+    '''
+    execute('INSERT INTO partners (id_partner, first_name, last_name, link) '
+            "SELECT :start + p, 'Тест', 'Тест', 'https://vk.com/id' || (:start + p) "
+            'FROM generate_series(0, :partners - 1) p', start=START, partners=PARTNERS)
+    execute('INSERT INTO users (id_user, id_city, age, sex) VALUES (:start - 1, 1, 25, 1)',
+            start=START)
+    execute('INSERT INTO users_partners (id_user, id_partner, ignore) '
+            'SELECT :start - 1, :start + k * 5, k % 10 <> 0 '
+            'FROM generate_series(0, :reactions - 1) k',
+            start=START, reactions=TARGET_REACTIONS)
+
+
+def delete_data():
+    '''Функция удаления тестовых данных.
+
+    '''
+    execute('DELETE FROM users_partners WHERE id_user >= :start - 1', start=START)
+    # проверка внешнего ключа при удалении партнеров просматривает всю таблицу
+    # "users_partners", поэтому удаленные строки предварительно очищаются
+    execute('VACUUM ANALYZE users_partners')
+    execute('DELETE FROM partners WHERE id_partner >= :start', start=START)
+    execute('DELETE FROM users WHERE id_user >= :start - 1', start=START)
+
+
+def bench(**kwargs) -> float:
+    '''Функция замера средней задержки выборки избранного, мс.
+
+    '''
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        Database.get_favorite_partners(START - 1, **kwargs)
+    return (time.perf_counter() - start) / CALLS * 1000
+
+
+if __name__ == '__main__':
+    index = next(index for index in UsersPartners.__table__.indexes
+                 if index.name == 'ix_users_partners_favorites')
+    delete_data()
+    fill_target()
+    try:
+        users = 0
+        for step in STEPS:
+            fill_data(users, step)
+            users = step
+            rows = users * REACTIONS + TARGET_REACTIONS
+            last = Database.get_favorite_partners(START - 1)[-PAGE_SIZE - 1].id_partner
+            for title in ('without index', 'with index'):
+                index.drop(DatabaseConfig.engine, checkfirst=True)
+                if title == 'with index':
+                    index.create(DatabaseConfig.engine)
+                execute('ANALYZE users_partners')
+                full = bench()
+                first = bench(limit=PAGE_SIZE)
+                deep = bench(after=last, limit=PAGE_SIZE)
+                print(f'{rows:>9,} rows, {title}: full list {full:.2f} ms, '
+                      f'first page {first:.2f} ms, last page {deep:.2f} ms')
+    finally:
+        index.create(DatabaseConfig.engine, checkfirst=True)
+        Database.session.remove()
+        delete_data()
@@ -0,0 +1,94 @@
+'''
+Бенчмарк вывода избранных партнеров: отправка отдельного сообщения на каждого
+партнера (прежняя версия show_favorite_partners) в сравнении со страницами
+в одном сообщении (локальный сервер tests.fake_vk).
+
+Требует доступной базы данных (параметры подключения в config.py),
+тестовые данные удаляются по окончании.
+
+'''
+import logging
+import time
+
+from main import Database, Buttons, VkontakteBot
+from models import Users, Partners, UsersPartners, DatabaseConfig
+from extrapacks.config import FAVORITES_PAGE_SIZE
+from tests.fake_vk import FakeVkServer
+
+
+USER_ID = 910000001
+PARTNERS_START = 910000100
+FAVORITES = 300
+LATENCY = 0.02
+
+
+def fill_data():
+    '''Функция заполнения базы данных тестовыми данными.
+
+    '''
+    with DatabaseConfig.Session() as session:
+        session.add(Users(id_user=USER_ID, id_city=1, age=25, sex=1))
+        for partner_id in range(PARTNERS_START, PARTNERS_START + FAVORITES):
+            model = Partners(id_partner=partner_id, first_name='Тест', last_name='Тест',
+                             link=f'https://vk.com/id{partner_id}')
+            model.users_partners = [UsersPartners(id_user=USER_ID, ignore=False)]
+            session.add(model)
+        session.commit()
+
+
+def delete_data():
+    '''Функция удаления тестовых данных.
+
+    '''
+    with DatabaseConfig.Session() as session:
+        session.query(UsersPartners).filter(UsersPartners.id_user == USER_ID).delete()
+        session.query(Partners).filter(Partners.id_partner >= PARTNERS_START,
+                                       Partners.id_partner < PARTNERS_START + FAVORITES).delete()
+        session.query(Users).filter(Users.id_user == USER_ID).delete()
+        session.commit()
+
+
+def show_legacy(bot: VkontakteBot, user_id: int):
+    '''Функция вывода избранного, как в прежней версии show_favorite_partners.
+
+    '''
+    favorite_partners = Database.get_favorite_partners(user_id)
+    keyboard = Buttons.get_main_navigation_keyboard()
+    bot.send_message(user_id, message='Вам понравились следующие люди \U0001F60A',
+                     keyboard=keyboard)
+    for partner in favorite_partners:
+        message = f'{partner.first_name} {partner.last_name}\n{partner.link}'
+        bot.send_message(user_id, message=message, keyboard=keyboard)
+
+
+def bench(server: FakeVkServer, title: str, func):
+    '''Функция замера запросов к API и задержки ответа пользователю.
+
+    '''
+    server.calls.clear()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f'{title}: {server.calls["messages.send"]} messages.send calls, '
+          f'{elapsed * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    logging.disable(logging.INFO)
+    fill_data()
+    try:
+        with FakeVkServer(latency=LATENCY) as fake_server:
+            bot = VkontakteBot(token='bench-favorites')
+            fake_server.mount(bot.http)
+            bench(fake_server, f'per-partner messages ({FAVORITES} favorites)',
+                  lambda: show_legacy(bot, USER_ID))
+            bench(fake_server, f'first page of {FAVORITES_PAGE_SIZE}',
+                  lambda: bot.show_favorite_partners(USER_ID))
+            bench(fake_server, 'all pages',
+                  lambda: [bot.show_favorite_partners(USER_ID, step=1)
+                           for _ in range(FAVORITES // FAVORITES_PAGE_SIZE - 1)])
+            last = fake_server.sent_messages[-1]
+            assert last['message'].splitlines()[-2].startswith(f'{FAVORITES}.')
+    finally:
+        Database.session.remove()
+        delete_data()
@@ -0,0 +1,54 @@
+'''
+Бенчмарк определения пола по имени: запрос Database.get_gender к таблице "genders"
+в сравнении с таблицей в памяти GenderLookup (по одному имени и страницами профилей).
+
+Требует доступной базы данных с заполненной таблицей "genders"
+(параметры подключения в config.py).
+
+'''
+import time
+
+from main import Database
+from extrapacks.genders import GenderLookup
+
+
+LOOKUPS = 2000
+PAGE_SIZE = 200
+
+
+def names() -> list:
+    '''Функция подготовки имен для определения пола (в т.ч. отсутствующих в таблице).
+
+    '''
+    table = list(Database.get_genders())
+    result = [name.lower() for name in table] + ['Aleksei']
+    return (result * (LOOKUPS // len(result) + 1))[:LOOKUPS]
+
+
+def bench(func, items: list) -> float:
+    '''Функция замера количества определений в секунду.
+
+    '''
+    start = time.perf_counter()
+    func(items)
+    return len(items) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    test_names = names()
+    lookup = GenderLookup(load=Database.get_genders, version=Database.get_genders_version)
+    lookup.reload()
+    profiles = [{'first_name': name, 'sex': 0} for name in test_names]
+    pages = [profiles[index:index + PAGE_SIZE] for index in range(0, len(profiles), PAGE_SIZE)]
+
+    results = (
+        ('Database.get_gender', bench(lambda items: [Database.get_gender(name) for name in items],
+                                      test_names)),
+        ('GenderLookup.get', bench(lambda items: [lookup.get(name) for name in items],
+                                   test_names * 100)),
+        ('GenderLookup.classify', bench(lambda items: [lookup.classify(page) for page in pages],
+                                        profiles)),
+    )
+    for title, rate in results:
+        print(f'{title}: {rate:,.0f} lookups/s')
+    Database.session.remove()
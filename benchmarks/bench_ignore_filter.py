@@ -0,0 +1,98 @@
+'''
+Бенчмарк количества запросов к базе данных на одно пролистывание партнера:
+проверка каждого кандидата функцией Database.check_ignore в сравнении
+с фильтрацией по множеству Database.get_ignored_partners.
+
+Требует доступной базы данных (параметры подключения в config.py),
+тестовые данные удаляются по окончании.
+
+'''
+import time
+
+import sqlalchemy as sq
+
+from main import Database
+from models import Users, Partners, UsersPartners, DatabaseConfig
+
+
+USER_ID = 900000001
+PARTNERS_START = 900000100
+DISLIKED = 500
+SWIPES = 100
+
+
+class QueryCounter:
+    '''Класс подсчета запросов к базе данных.
+
+    '''
+    def __init__(self):
+        self.count = 0
+        sq.event.listen(DatabaseConfig.engine, 'before_cursor_execute', self)
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def fill_data():
+    '''Функция заполнения базы данных тестовыми данными.
+
+    '''
+    with DatabaseConfig.Session() as session:
+        session.add(Users(id_user=USER_ID, id_city=1, age=25, sex=1))
+        for partner_id in range(PARTNERS_START, PARTNERS_START + DISLIKED):
+            model = Partners(id_partner=partner_id, first_name='Тест', last_name='Тест',
+                             link=f'https://vk.com/id{partner_id}')
+            model.users_partners = [UsersPartners(id_user=USER_ID, ignore=True)]
+            session.add(model)
+        session.commit()
+
+
+def delete_data():
+    '''Функция удаления тестовых данных.
+
+    '''
+    with DatabaseConfig.Session() as session:
+        session.query(UsersPartners).filter(UsersPartners.id_user == USER_ID).delete()
+        session.query(Partners).filter(Partners.id_partner >= PARTNERS_START,
+                                       Partners.id_partner < PARTNERS_START + DISLIKED).delete()
+        session.query(Users).filter(Users.id_user == USER_ID).delete()
+        session.commit()
+
+
+def candidates():
+    '''Функция-генератор кандидатов: каждый второй ранее отмечен как "не нравится".
+
+    '''
+    for index in range(DISLIKED):
+        yield PARTNERS_START + index
+        yield PARTNERS_START + DISLIKED + index
+
+
+def bench(counter: QueryCounter, use_set: bool) -> tuple:
+    '''Функция замера запросов и времени на SWIPES пролистываний.
+
+    '''
+    found = candidates()
+    counter.count = 0
+    start = time.perf_counter()
+    ignored = Database.get_ignored_partners(USER_ID) if use_set else None
+    for _ in range(SWIPES):
+        for partner_id in found:
+            if use_set:
+                if partner_id not in ignored:
+                    break
+            elif not Database.check_ignore(USER_ID, partner_id):
+                break
+    return counter.count / SWIPES, (time.perf_counter() - start) / SWIPES
+
+
+if __name__ == '__main__':
+    fill_data()
+    try:
+        query_counter = QueryCounter()
+        for title, flag in (('check_ignore', False), ('get_ignored_partners', True)):
+            queries, latency = bench(query_counter, flag)
+            print(f'{title}: {queries:.2f} queries/swipe, {latency * 1000:.3f} ms/swipe')
+    finally:
+        Database.session.remove()
+        delete_data()
@@ -0,0 +1,41 @@
+'''
+Микробенчмарк подготовки клавиатуры сообщения: формирование VkKeyboard
+и сериализация в JSON при каждом сообщении (прежняя версия Buttons)
+в сравнении с готовым JSON из реестра клавиатур keyboards.
+
+Запуск: python -m benchmarks.bench_keyboards [сообщений]
+
+'''
+import sys
+import time
+
+from main import Buttons
+
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+KEYBOARDS = {
+    'main_navigation': (Buttons.build_main_navigation_keyboard, {}),
+    'inline_reactions': (Buttons.build_inline_reactions_keyboard, {}),
+    'inline_favorites': (Buttons.build_inline_favorites_keyboard,
+                         {'has_prev': True, 'has_next': True}),
+}
+
+
+def per_message(func, params: dict) -> float:
+    '''Функция замера времени одного вызова func (микросекунды).
+
+    '''
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        func(**params)
+    return (time.perf_counter() - start) / MESSAGES * 10 ** 6
+
+
+if __name__ == '__main__':
+    print(f'{MESSAGES} messages per keyboard')
+    for name, (build, params) in KEYBOARDS.items():
+        rebuilt = per_message(lambda **kwargs: build(**kwargs).get_keyboard(), params)
+        cached = per_message(Buttons.get_keyboard, {'name': name, **params})
+        print(f'{name:17} build + serialize {rebuilt:7.2f} us/message, '
+              f'cached {cached:5.2f} us/message ({rebuilt / cached:.0f}x)')
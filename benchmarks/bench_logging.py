@@ -0,0 +1,87 @@
+'''
+Бенчмарк накладных расходов декоратора logging_decorator на вызов функции,
+возвращающей страницу результатов поиска: прежняя синхронная запись полного
+результата в сравнении с усечением, записью в фоновом потоке и отключением.
+
+'''
+import functools
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+
+from extrapacks.logging_functions import logging_decorator, set_function_logging
+
+
+CALLS = 2000
+PAGE = [{'id': index, 'first_name': 'Иван', 'last_name': 'Тестов', 'is_closed': False}
+        for index in range(200)]
+
+
+def legacy_logging_decorator(old_func):
+    '''Прежняя версия декоратора: полный вывод аргументов и результата.
+
+    '''
+    @functools.wraps(old_func)
+    def new_func(*args, **kwargs):
+        logging_params = {'old_func': old_func.__name__,
+                        'args': args,
+                        'kwargs': kwargs,
+                        'spaces': ' ' * 25}
+        logging.info('Запущена функция %(old_func)s\n%(spaces)sАргументы: %(args)s, %(kwargs)s',
+                     logging_params)
+        result = old_func(*args, **kwargs)
+        if result:
+            logging.info('Результат выполнения: %(result)s', {'result': result})
+        return result
+    return new_func
+
+
+def search_users(params: dict) -> list:
+    return PAGE
+
+
+def set_handler(handler: logging.Handler):
+    '''Функция замены обработчиков корневого логгера.
+
+    '''
+    root = logging.getLogger()
+    for old_handler in root.handlers[:]:
+        root.removeHandler(old_handler)
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def bench(title: str, func):
+    '''Функция замера средней задержки вызова.
+
+    '''
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        func({'sex': 1, 'city': 1, 'offset': 0})
+    elapsed = time.perf_counter() - start
+    print(f'{title}: {elapsed / CALLS * 10 ** 6:.1f} us/call')
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        file_handler = logging.FileHandler(os.path.join(directory, 'bench.log'), encoding='utf-8')
+        file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+
+        set_handler(file_handler)
+        bench('legacy, sync, full payload', legacy_logging_decorator(search_users))
+        bench('sync, truncated payload', logging_decorator(search_users))
+
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, file_handler)
+        listener.start()
+        set_handler(logging.handlers.QueueHandler(log_queue))
+        bench('async, truncated payload', logging_decorator(search_users))
+        listener.stop()
+
+        set_function_logging('search_users', False)
+        bench('disabled for function', logging_decorator(search_users))
+        bench('no decorator', search_users)
+        file_handler.close()
@@ -0,0 +1,52 @@
+'''
+Бенчмарк накладных расходов сбора метрик на вызов метода и обработку события:
+без метрик (METRICS_ENABLED = False) и с метриками.
+
+'''
+from contextlib import nullcontext
+import time
+
+from extrapacks.metrics import MetricsRegistry
+
+
+CALLS = 100000
+
+
+class Service:
+    def get(self, value):
+        return value
+
+
+def bench(title: str, func):
+    '''Функция замера средней задержки вызова.
+
+    '''
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f'{title}: {elapsed / CALLS * 10 ** 9:.0f} ns/call')
+
+
+if __name__ == '__main__':
+    registry = MetricsRegistry()
+    service = Service()
+
+    def handle_disabled():
+        with nullcontext():
+            service.get(1)
+
+    def handle_enabled():
+        with registry.track_event('Далее'):
+            registry.count_vk_call('...abcd', 'users.search')
+            registry.count_db_query()
+            service.get(1)
+
+    bench('method, disabled', lambda: service.get(1))
+    bench('event, disabled', handle_disabled)
+    registry.instrument(Service)
+    bench('method, enabled', lambda: service.get(1))
+    bench('event (1 VK call, 1 query), enabled', handle_enabled)
+    start = time.perf_counter()
+    registry.export_prometheus()
+    print(f'export_prometheus: {(time.perf_counter() - start) * 1000:.2f} ms')
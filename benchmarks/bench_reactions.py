@@ -0,0 +1,128 @@
+'''
+Бенчмарк записи реакций пользователей (лайк/дизлайк) в базу данных:
+последовательные проверки и вставки с фиксацией каждой записи (прежний вариант
+upload_partner_info) в сравнении с INSERT ... ON CONFLICT одной транзакцией
+и пакетной записью через WriteBehindBuffer.
+
+Требует доступной базы данных (параметры подключения в config.py),
+тестовые данные удаляются по окончании.
+
+'''
+import time
+
+import sqlalchemy as sq
+
+from main import Database
+from extrapacks.writebehind import WriteBehindBuffer
+from models import Users, Partners, UsersPartners, DatabaseConfig
+
+
+USERS_START = 910000001
+USERS = 50
+PARTNERS_START = 910100000
+REACTIONS = 1000
+
+
+class CommitCounter:
+    '''Класс подсчета фиксаций транзакций.
+
+    '''
+    def __init__(self):
+        self.count = 0
+        sq.event.listen(DatabaseConfig.engine, 'commit', self)
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def legacy_upload_partner_info(user_id: int, partner_info: dict, ignore: bool=False):
+    '''Прежний вариант Database.upload_partner_info: до 4-х запросов и 2-х фиксаций.
+
+    '''
+    partner_id = partner_info['id']
+    if Database.check_prkey_in_partners(partner_id):
+        if Database.check_prkey_in_users_partners(user_id, partner_id):
+            return
+        Database.upload_relationship(user_id, partner_id, ignore=ignore)
+        return
+    model = Partners(id_partner=partner_id, link=f'https://vk.com/id{partner_id}',
+                     first_name=partner_info['first_name'],
+                     last_name=partner_info['last_name'])
+    model.users_partners = [UsersPartners(id_user=user_id, ignore=ignore)]
+    Database.session.add(model)
+    Database.session.commit()
+
+
+def reactions(shift: int) -> list:
+    '''Функция формирования реакций: пользователи реагируют на общий набор партнеров.
+
+    '''
+    result = []
+    for index in range(REACTIONS):
+        user_id = USERS_START + index % USERS
+        partner_id = PARTNERS_START + shift + index // 2
+        result.append((user_id, {'id': partner_id, 'first_name': 'Тест', 'last_name': 'Тест'},
+                       bool(index % 3)))
+    return result
+
+
+def fill_data():
+    '''Функция заполнения базы данных тестовыми пользователями.
+
+    '''
+    with DatabaseConfig.Session() as session:
+        for user_id in range(USERS_START, USERS_START + USERS):
+            session.add(Users(id_user=user_id, id_city=1, age=25, sex=1))
+        session.commit()
+
+
+def delete_data():
+    '''Функция удаления тестовых данных.
+
+    '''
+    with DatabaseConfig.Session() as session:
+        session.query(UsersPartners).filter(UsersPartners.id_user >= USERS_START,
+                                            UsersPartners.id_user < USERS_START + USERS).delete()
+        session.query(Partners).filter(Partners.id_partner >= PARTNERS_START).delete()
+        session.query(Users).filter(Users.id_user >= USERS_START,
+                                    Users.id_user < USERS_START + USERS).delete()
+        session.commit()
+
+
+def bench(title: str, counter: CommitCounter, upload, items: list):
+    '''Функция замера записи реакций.
+
+    '''
+    counter.count = 0
+    start = time.perf_counter()
+    upload(items)
+    duration = time.perf_counter() - start
+    print(f'{title}: {len(items) / duration:.0f} reactions/s, '
+          f'{counter.count / duration:.0f} commits/s, '
+          f'{counter.count / len(items):.3f} commits/reaction')
+
+
+def write_behind(items: list):
+    '''Функция записи реакций через буфер отложенной записи.
+
+    '''
+    buffer = WriteBehindBuffer(Database.upload_partners_info, interval=0.005)
+    for item in items:
+        buffer.add(item)
+    buffer.close()
+
+
+if __name__ == '__main__':
+    fill_data()
+    try:
+        commit_counter = CommitCounter()
+        bench('legacy', commit_counter,
+              lambda items: [legacy_upload_partner_info(*item) for item in items],
+              reactions(0))
+        bench('upsert', commit_counter,
+              lambda items: [Database.upload_partner_info(*item) for item in items],
+              reactions(REACTIONS))
+        bench('write-behind', commit_counter, write_behind, reactions(REACTIONS * 2))
+    finally:
+        Database.session.remove()
+        delete_data()
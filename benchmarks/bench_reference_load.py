@@ -0,0 +1,65 @@
+'''
+Бенчмарк загрузки справочных данных в таблицу "genders": добавление записей
+по одной (session.add) в сравнении с пакетной загрузкой DatabaseConfig.bulk_upsert,
+в т.ч. повторной.
+
+Требует доступной базы данных (параметры подключения в config.py),
+тестовые данные удаляются по окончании.
+
+'''
+import time
+
+from models import Genders, DatabaseConfig
+
+
+PREFIX = 'Бенчтест'
+ROWS = 300000
+LEGACY_ROWS = 5000
+
+
+def rows(count: int):
+    '''Функция-генератор тестовых записей (имен с уменьшительными формами).
+
+    '''
+    for index in range(count):
+        yield {'name': f'{PREFIX}{index}', 'sex': index % 2 + 1}
+
+
+def load_legacy(count: int):
+    '''Функция загрузки записей по одной, как в прежней версии filling_out_gender.
+
+    '''
+    with DatabaseConfig.Session() as session:
+        for row in rows(count):
+            session.add(Genders(**row))
+        session.commit()
+
+
+def delete_data():
+    '''Функция удаления тестовых данных.
+
+    '''
+    with DatabaseConfig.Session() as session:
+        session.query(Genders).filter(Genders.name.like(f'{PREFIX}%')).delete()
+        session.commit()
+
+
+def bench(title: str, func, count: int):
+    '''Функция замера скорости загрузки.
+
+    '''
+    start = time.perf_counter()
+    func(count)
+    print(f'{title}: {count / (time.perf_counter() - start):,.0f} rows/s')
+
+
+if __name__ == '__main__':
+    delete_data()
+    try:
+        bench('session.add', load_legacy, LEGACY_ROWS)
+        delete_data()
+        bench('bulk_upsert', lambda count: DatabaseConfig.bulk_upsert(Genders, rows(count)), ROWS)
+        bench('bulk_upsert (re-run)',
+              lambda count: DatabaseConfig.bulk_upsert(Genders, rows(count)), ROWS)
+    finally:
+        delete_data()
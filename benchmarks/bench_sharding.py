@@ -0,0 +1,108 @@
+'''
+Бенчмарк пропускной способности бота в нескольких процессах (ShardedBot)
+в зависимости от количества процессов-обработчиков. Сценарии имитируемых
+пользователей - как в benchmarks.bench_bot, запросы к API и Long Poll
+сервер - локальный сервер tests.fake_vk.
+
+Требует доступной базы данных (параметры подключения в config.py),
+тестовые данные удаляются по окончании.
+
+Запуск: python -m benchmarks.bench_sharding [пользователей] [одновременно активных]
+[количества процессов через запятую]
+
+'''
+import functools
+import logging
+import sys
+import threading
+import time
+
+
+from main import VkontakteBot, ShardedBot
+from extrapacks.longpoll import ResilientLongPoll
+from extrapacks.sharding import shard_of
+from benchmarks.bench_bot import Population, delete_data, USERS, USERS_START, CONCURRENCY
+from tests.fake_vk import FakeVkServer, RedirectAdapter
+
+
+PROCESSES = tuple(map(int, sys.argv[3].split(','))) if len(sys.argv) > 3 else (1, 2, 4)
+LATENCY = 0.005
+
+
+def create_bot(url: str) -> VkontakteBot:
+    '''Функция создания бота процесса-обработчика, отправляющего запросы к локальному серверу.
+
+    '''
+    logging.disable(logging.INFO)
+    bot = VkontakteBot(token='bench-sharding')
+    for session in (bot.http, bot.api_user_token.http):
+        session.mount('https://api.vk.com/', RedirectAdapter(url, pool_maxsize=50))
+    return bot
+
+
+class BenchShardedBot(ShardedBot):
+    '''Бот, подключающийся к Long Poll серверу локального сервера API.
+
+    '''
+    def __init__(self, server: FakeVkServer, processes: int):
+        super().__init__(processes=processes, token='bench-sharding',
+                         factory=functools.partial(create_bot, server.url))
+        self.server = server
+        server.mount(self.api.http)
+
+    def create_longpoll(self) -> ResilientLongPoll:
+        longpoll = ResilientLongPoll(self.api, wait=1)
+        self.server.mount(longpoll.session)
+        return longpoll
+
+
+def wait_workers(server: FakeVkServer, processes: int):
+    '''Функция ожидания готовности всех процессов-обработчиков: каждому процессу
+       отправляется неизвестная боту команда до получения ответа (сообщения,
+       отправленные до подключения бота к Long Poll серверу, не будут получены).
+
+    '''
+    user_id = USERS_START + USERS
+    for shard in range(processes):
+        while shard_of(user_id, processes) != shard:
+            user_id += 1
+        for _ in range(120):
+            server.push_message(user_id, 'ping')
+            if server.wait_replies(user_id, timeout=1):
+                break
+        else:
+            raise RuntimeError(f'Процесс-обработчик {shard} не отвечает')
+
+
+def bench(processes: int):
+    '''Функция замера пропускной способности при заданном количестве процессов.
+
+    '''
+    delete_data()
+    with FakeVkServer(latency=LATENCY) as server:
+        bot = BenchShardedBot(server, processes)
+        thread = threading.Thread(target=bot, name='bench-sharding')
+        thread.start()
+        wait_workers(server, processes)
+
+        population = Population(server)
+        start = time.perf_counter()
+        population.run(range(USERS_START, USERS_START + USERS), CONCURRENCY)
+        elapsed = time.perf_counter() - start
+
+        server.push_message(USERS_START, 'Стоп')
+        thread.join()
+    latency = population.latency['like']
+    print(f'{processes} processes: {population.events / elapsed:.0f} events/s, '
+          f'like p50 {latency.percentile(50) * 1000:.1f} ms, '
+          f'p99 {latency.percentile(99) * 1000:.1f} ms, {population.timeouts} timeouts')
+
+
+if __name__ == '__main__':
+    logging.disable(logging.INFO)
+    print(f'{USERS} users ({CONCURRENCY} concurrent), API latency {LATENCY * 1000:g} ms')
+    try:
+        for processes in PROCESSES:
+            bench(processes)
+    finally:
+        delete_data()
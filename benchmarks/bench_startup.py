@@ -0,0 +1,94 @@
+'''
+Бенчмарк подготовки бота к опросу сервера при большом количестве пользователей:
+загрузка всех пользователей в словарь (прежняя функция Database.get_users)
+в сравнении с фоновым построением фильтра UserRegistry.
+
+Требует доступной базы данных (параметры подключения в config.py),
+тестовые пользователи удаляются по окончании.
+
+'''
+import sys
+import time
+import tracemalloc
+
+import sqlalchemy as sq
+
+from main import Database
+from models import Users, DatabaseConfig
+from extrapacks.registry import UserRegistry
+
+
+USERS_START = 3000000000
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+PROBES = 10000
+
+
+def fill_data():
+    '''Функция заполнения таблицы "users" тестовыми пользователями.
+
+    '''
+    with DatabaseConfig.engine.begin() as connection:
+        connection.execute(sq.text('INSERT INTO users (id_user, id_city, age, sex) '
+                                   'SELECT id, 1, 25, 1 FROM generate_series(:start, :stop) id'),
+                           {'start': USERS_START, 'stop': USERS_START + USERS - 1})
+
+
+def delete_data():
+    '''Функция удаления тестовых пользователей.
+
+    '''
+    with DatabaseConfig.Session() as session:
+        session.query(Users).filter(Users.id_user >= USERS_START).delete()
+        session.commit()
+
+
+def load_legacy() -> dict:
+    '''Функция загрузки всех пользователей, как в прежней версии Database.get_users.
+
+    '''
+    return {id.id_user: {} for id in Database.session.query(Users.id_user).all()}
+
+
+def measure(func) -> tuple:
+    '''Функция замера времени выполнения и пикового объема выделенной памяти.
+
+    '''
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+if __name__ == '__main__':
+    delete_data()
+    fill_data()
+    try:
+        users, elapsed, peak = measure(load_legacy)
+        print(f'get_users: {len(users):,} users, {elapsed:.3f} s before polling, '
+              f'peak {peak / 2 ** 20:.1f} MiB')
+        del users
+        Database.session.remove()
+
+        registry = UserRegistry(probe=Database.check_user, load_ids=Database.iter_user_ids,
+                                count=Database.count_users)
+        _, elapsed, _ = measure(registry.start)
+        print(f'UserRegistry: {elapsed * 1000:.3f} ms before polling')
+        registry.wait()
+        print(f'UserRegistry: built in background in {registry.stats["build_time"]:.3f} s, '
+              f'filter {len(registry.filter.bits) / 2 ** 20:.1f} MiB')
+
+        new_users = range(USERS_START + USERS, USERS_START + USERS + PROBES)
+        for title, check in (('check_user', Database.check_user),
+                             ('UserRegistry.check', registry.check)):
+            start = time.perf_counter()
+            assert not any(check(user_id) for user_id in new_users)
+            elapsed = time.perf_counter() - start
+            print(f'{title}: {elapsed / PROBES * 10 ** 6:.1f} us/new user')
+        print(f'UserRegistry: {registry.stats["probes"] / PROBES:.2%} of new users '
+              f'checked in the database')
+    finally:
+        Database.session.remove()
+        delete_data()
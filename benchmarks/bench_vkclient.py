@@ -0,0 +1,54 @@
+'''
+Бенчмарк пропускной способности запросов к API: vk_api.VkApi.method
+в сравнении с асинхронным клиентом AsyncVkClient (локальный сервер tests.fake_vk).
+
+'''
+import asyncio
+import time
+
+import vk_api
+
+from extrapacks.vkclient import PooledVkApi, AsyncVkClient
+from tests.fake_vk import FakeVkServer
+
+
+CALLS = 200
+LATENCY = 0.02
+
+
+def bench_baseline(server: FakeVkServer) -> float:
+    '''Функция замера последовательных вызовов vk_api.VkApi.method.
+
+    '''
+    vk = vk_api.VkApi(token='bench-baseline')
+    vk.RPS_DELAY = 0
+    server.mount(vk.http)
+    start = time.perf_counter()
+    for index in range(CALLS):
+        vk.method('photos.get', {'owner_id': index + 1})
+    return time.perf_counter() - start
+
+
+def bench_async(server: FakeVkServer, max_in_flight: int) -> float:
+    '''Функция замера параллельных вызовов AsyncVkClient.method.
+
+    '''
+    vk = PooledVkApi(token=f'bench-async-{max_in_flight}', rps=10000,
+                     max_in_flight=max_in_flight)
+    server.mount(vk.http)
+    client = AsyncVkClient(vk, max_in_flight=max_in_flight)
+    start = time.perf_counter()
+    asyncio.run(client.gather(('photos.get', {'owner_id': index + 1})
+                              for index in range(CALLS)))
+    duration = time.perf_counter() - start
+    client.close()
+    return duration
+
+
+if __name__ == '__main__':
+    with FakeVkServer(latency=LATENCY) as fake_server:
+        duration = bench_baseline(fake_server)
+        print(f'VkApi.method: {CALLS / duration:.1f} calls/s')
+        for in_flight in (1, 5, 10, 20):
+            duration = bench_async(fake_server, in_flight)
+            print(f'AsyncVkClient (max_in_flight={in_flight}): {CALLS / duration:.1f} calls/s')
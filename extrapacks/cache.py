@@ -0,0 +1,193 @@
+'''
+Модуль кэширования результатов запросов к API ВКонтакте.
+
+Поддерживаются два хранилища: кэш в памяти процесса (TTLCache) и общий для
+нескольких процессов кэш Redis (RedisCache, требуется библиотека redis).
+Хранилище выбирается параметром CACHE_BACKEND в config.py.
+
+'''
+from collections import OrderedDict
+from collections.abc import Callable
+import json
+import threading
+import time
+
+from extrapacks.config import CACHE_BACKEND
+
+
+class TTLCache:
+    '''Класс потокобезопасного кэша в памяти процесса с ограниченным временем жизни
+       записей (ttl, секунд) и ограниченным суммарным размером записей (maxsize).
+
+       Размер записи определяется функцией sizeof (по умолчанию каждая запись - 1).
+       При переполнении удаляются давно не использовавшиеся записи (LRU).
+       Ведет статистику попаданий, промахов и вытеснений (метод get_stats).
+
+    '''
+    def __init__(self, maxsize: int, ttl: float, sizeof: Callable=None):
+        '''Конструктор класса.
+
+        '''
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sizeof = sizeof or (lambda value: 1)
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0}
+
+    def get(self, key, default=None):
+        '''Метод получения значения по ключу.
+
+        '''
+        with self._lock:
+            if (entry := self._data.get(key)) is None:
+                self.stats['misses'] += 1
+                return default
+            expires, size, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                self._size -= size
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def get_many(self, keys: list) -> dict:
+        '''Метод получения значений по нескольким ключам.
+
+           Возвращает словарь только найденных значений.
+
+        '''
+        missing = object()
+        result = {key: self.get(key, missing) for key in keys}
+        return {key: value for key, value in result.items() if value is not missing}
+
+    def set(self, key, value):
+        '''Метод записи значения по ключу.
+
+        '''
+        size = self.sizeof(value)
+        with self._lock:
+            if (entry := self._data.pop(key, None)) is not None:
+                self._size -= entry[1]
+            self._data[key] = (time.monotonic() + self.ttl, size, value)
+            self._size += size
+            while self._size > self.maxsize and self._data:
+                _, (_, old_size, _) = self._data.popitem(last=False)
+                self._size -= old_size
+                self.stats['evicted'] += 1
+
+    def set_many(self, values: dict):
+        '''Метод записи нескольких значений.
+
+        '''
+        for key, value in values.items():
+            self.set(key, value)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> dict:
+        '''Метод получения статистики кэша.
+
+        '''
+        with self._lock:
+            requests = self.stats['hits'] + self.stats['misses']
+            return {**self.stats, 'size': self._size, 'entries': len(self._data),
+                    'hit_rate': self.stats['hits'] / requests if requests else 0.0}
+
+
+class RedisCache:
+    '''Класс кэша в Redis, общего для всех процессов бота.
+
+       Значения хранятся в формате JSON с временем жизни ttl секунд (с точностью
+       до миллисекунды), вытеснение при переполнении памяти выполняет сервер Redis
+       (политика maxmemory-policy allkeys-lru). Ключи записей имеют префикс namespace.
+
+    '''
+    def __init__(self, url: str, namespace: str, ttl: float):
+        '''Конструктор класса.
+
+        '''
+        try:
+            import redis
+        except ImportError as error:
+            raise ImportError('Для CACHE_BACKEND=redis://... необходима библиотека redis '
+                              '(pip install redis)') from error
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self.ttl = ttl
+        # время жизни записей в миллисекундах (Redis не принимает нулевое время жизни)
+        self._ttl_ms = max(1, int(ttl * 1000))
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _key(self, key) -> str:
+        return f'vkinder:{self.namespace}:{key!r}'
+
+    def _count(self, hits: int, misses: int):
+        with self._lock:
+            self.stats['hits'] += hits
+            self.stats['misses'] += misses
+
+    def get(self, key, default=None):
+        '''Метод получения значения по ключу.
+
+        '''
+        if (value := self.client.get(self._key(key))) is None:
+            self._count(0, 1)
+            return default
+        self._count(1, 0)
+        return json.loads(value)
+
+    def get_many(self, keys: list) -> dict:
+        '''Метод получения значений по нескольким ключам одним запросом.
+
+        '''
+        if not keys:
+            return {}
+        values = self.client.mget([self._key(key) for key in keys])
+        result = {key: json.loads(value) for key, value in zip(keys, values)
+                  if value is not None}
+        self._count(len(result), len(keys) - len(result))
+        return result
+
+    def set(self, key, value):
+        '''Метод записи значения по ключу.
+
+        '''
+        self.client.set(self._key(key), json.dumps(value), px=self._ttl_ms)
+
+    def set_many(self, values: dict):
+        '''Метод записи нескольких значений одним запросом.
+
+        '''
+        with self.client.pipeline(transaction=False) as pipeline:
+            for key, value in values.items():
+                pipeline.set(self._key(key), json.dumps(value), px=self._ttl_ms)
+            pipeline.execute()
+
+    def get_stats(self) -> dict:
+        '''Метод получения статистики кэша.
+
+        '''
+        with self._lock:
+            requests = self.stats['hits'] + self.stats['misses']
+            stats = {**self.stats, 'hit_rate': self.stats['hits'] / requests if requests else 0.0}
+        stats['evicted'] = self.client.info('stats').get('evicted_keys')
+        return stats
+
+
+def create_cache(namespace: str, maxsize: int, ttl: float, sizeof: Callable=None):
+    '''Функция создания кэша в хранилище, заданном параметром CACHE_BACKEND.
+
+       CACHE_BACKEND = 'local' - кэш в памяти процесса,
+       CACHE_BACKEND = 'redis://host:port/db' - общий кэш в Redis.
+
+    '''
+    if CACHE_BACKEND.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisCache(CACHE_BACKEND, namespace, ttl)
+    return TTLCache(maxsize, ttl, sizeof)
@@ -0,0 +1,216 @@
+'''
+Модуль приема событий бота через Callback API ВКонтакте.
+
+HTTP-сервер принимает уведомления сообщества (POST-запросы с JSON), отвечает
+на запрос подтверждения адреса сервера строкой confirmation, проверяет секретный
+ключ, отсеивает повторные доставки одного события (по event_id) и сразу отвечает
+'ok', а события message_new передает в очередь. Метод listen выдает события
+из очереди в формате событий Long Poll (vk_api.longpoll.Event), поэтому сервер
+используется ботом так же, как подключение к Long Poll серверу.
+
+'''
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import queue
+import threading
+
+from vk_api.longpoll import Event
+
+
+# номер, с которого начинаются идентификаторы бесед (peer_id)
+CHAT_START_ID = 2000000000
+
+
+class RecentIds:
+    '''Класс множества последних max_size идентификаторов (более ранние вытесняются).
+
+    '''
+    def __init__(self, max_size: int):
+        '''Конструктор класса.
+
+        '''
+        self.max_size = max_size
+        self._order = deque()
+        self._ids = set()
+        self._lock = threading.Lock()
+
+    def add(self, item) -> bool:
+        '''Метод добавления идентификатора.
+
+           Возвращает False, если идентификатор уже был добавлен.
+
+        '''
+        with self._lock:
+            if item in self._ids:
+                return False
+            self._ids.add(item)
+            self._order.append(item)
+            if len(self._order) > self.max_size:
+                self._ids.discard(self._order.popleft())
+            return True
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+def message_to_event(message: dict) -> Event:
+    '''Функция преобразования сообщения уведомления message_new в событие Long Poll.
+
+    '''
+    peer_id = message.get('peer_id', message['from_id'])
+    extra = {'title': ' ... '}
+    if peer_id >= CHAT_START_ID:
+        extra['from'] = str(message['from_id'])
+    # 1 - флаг непрочитанного входящего сообщения
+    return Event([4, message.get('id', 0), 1, peer_id, message.get('date', 0),
+                  message.get('text', ''), extra, {}])
+
+
+class CallbackHandler(BaseHTTPRequestHandler):
+    '''Обработчик HTTP-запросов сервера Callback API.
+
+    '''
+    protocol_version = 'HTTP/1.1'
+    # заголовки и тело ответа отправляются одним пакетом (без задержки алгоритма Нейгла)
+    wbufsize = 65536
+
+    def do_POST(self):
+        '''Метод обработки уведомления.
+
+        '''
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            notification = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_text(400, 'bad request')
+            return
+        status, text = self.server.callback.handle(notification)
+        self.send_text(status, text)
+
+    def send_text(self, status: int, text: str):
+        '''Метод отправки текстового ответа.
+
+        '''
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        '''Метод отключения вывода журнала запросов в консоль.
+
+        '''
+
+
+class CallbackServer:
+    '''Класс сервера Callback API.
+
+       confirmation - строка подтверждения адреса сервера (из настроек сообщества),
+       secret - секретный ключ (пустая строка - не проверяется),
+       dedup_size - количество запоминаемых идентификаторов событий для отсева
+       повторных доставок.
+
+    '''
+    def __init__(self, host: str, port: int, confirmation: str, secret: str='',
+                 dedup_size: int=100000):
+        '''Конструктор класса.
+
+        '''
+        self.confirmation = confirmation
+        self.secret = secret
+        self.events = queue.SimpleQueue()
+        self.recent = RecentIds(dedup_size)
+        self.stats = {'received': 0, 'queued': 0, 'duplicates': 0, 'rejected': 0,
+                      'confirmations': 0}
+        self._stats_lock = threading.Lock()
+
+        self._server = ThreadingHTTPServer((host, port), CallbackHandler)
+        self._server.daemon_threads = True
+        self._server.callback = self
+        self._thread = None
+        self._closed = False
+
+    @property
+    def address(self) -> tuple:
+        '''Адрес и порт, на которых принимаются уведомления.
+
+        '''
+        return self._server.server_address
+
+    def _count(self, key: str):
+        '''Метод увеличения счетчика статистики.
+
+        '''
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def handle(self, notification: dict) -> tuple[int, str]:
+        '''Метод обработки уведомления, возвращает код и текст HTTP-ответа.
+
+        '''
+        self._count('received')
+        if notification.get('type') == 'confirmation':
+            self._count('confirmations')
+            return 200, self.confirmation
+        if self.secret and notification.get('secret') != self.secret:
+            self._count('rejected')
+            logging.warning('Уведомление Callback API с неверным секретным ключом отклонено')
+            return 403, 'forbidden'
+
+        event_id = notification.get('event_id')
+        if event_id is not None and not self.recent.add(event_id):
+            self._count('duplicates')
+            return 200, 'ok'
+        if notification.get('type') == 'message_new':
+            obj = notification.get('object', {})
+            # начиная с версии API 5.103 сообщение передается в поле message
+            self.events.put(message_to_event(obj.get('message', obj)))
+            self._count('queued')
+        return 200, 'ok'
+
+    def get_stats(self) -> dict:
+        '''Метод получения статистики сервера.
+
+        '''
+        with self._stats_lock:
+            return {**self.stats, 'queue_depth': self.events.qsize()}
+
+    def start(self):
+        '''Метод запуска HTTP-сервера в фоновом потоке.
+
+        '''
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='vkbot-callback', daemon=True)
+        self._thread.start()
+        logging.warning('Сервер Callback API запущен на %s:%s', *self.address[:2])
+
+    def shutdown(self):
+        '''Метод остановки HTTP-сервера.
+
+        '''
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+        logging.warning('Сервер Callback API остановлен, статистика: %s', self.get_stats())
+
+    def listen(self):
+        '''Метод-генератор событий message_new.
+
+           Запускает сервер при первом обращении и останавливает при закрытии генератора.
+
+        '''
+        if self._thread is None:
+            self.start()
+        try:
+            while True:
+                yield self.events.get()
+        finally:
+            self.shutdown()
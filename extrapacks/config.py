@@ -16,3 +16,116 @@ DB_PASSWORD = os.getenv('PSQLPASS')
 DB_CONNECTION = 'localhost'
 DB_PORT = '5432'
 DB_NAME = 'VKinder'
+
+# Параметры пула соединений с базой данных: размер, дополнительные соединения
+# сверх размера и время переустановки соединения, секунд
+DB_POOL_SIZE = int(os.getenv('PSQLPOOLSIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('PSQLMAXOVERFLOW', '20'))
+DB_POOL_RECYCLE = int(os.getenv('PSQLPOOLRECYCLE', '1800'))
+
+# Количество потоков-обработчиков событий бота (0 - последовательная обработка)
+BOT_WORKERS = int(os.getenv('VKBOTWORKERS', '0'))
+
+# Прием событий через Callback API: адрес и порт HTTP-сервера (порт 0 - события
+# получаются через Long Poll), строка подтверждения адреса сервера и секретный ключ
+# из настроек сообщества, количество запоминаемых идентификаторов событий для отсева
+# повторных доставок
+CALLBACK_HOST = os.getenv('VKCALLBACKHOST', '0.0.0.0')
+CALLBACK_PORT = int(os.getenv('VKCALLBACKPORT', '0'))
+CALLBACK_CONFIRMATION = os.getenv('VKCALLBACKCONFIRMATION', '')
+CALLBACK_SECRET = os.getenv('VKCALLBACKSECRET', '')
+CALLBACK_DEDUP_SIZE = int(os.getenv('VKCALLBACKDEDUPSIZE', '100000'))
+
+# Подключение к Long Poll серверу: время ожидания событий одним запросом (секунды),
+# начальная и максимальная задержка повтора запроса после ошибки (секунды),
+# количество ошибок подряд, после которого запрашивается новый ключ сервера
+LONGPOLL_WAIT = int(os.getenv('VKLONGPOLLWAIT', '25'))
+LONGPOLL_BACKOFF_BASE = float(os.getenv('VKLONGPOLLBACKOFF', '0.5'))
+LONGPOLL_BACKOFF_MAX = float(os.getenv('VKLONGPOLLBACKOFFMAX', '30'))
+LONGPOLL_REFRESH_AFTER = int(os.getenv('VKLONGPOLLREFRESH', '3'))
+
+# Количество процессов-обработчиков событий бота, между которыми распределяются
+# пользователи (0 - события обрабатываются процессом, получающим их)
+BOT_PROCESSES = int(os.getenv('VKBOTPROCESSES', '0'))
+
+# Размер пула HTTP-соединений и ограничение одновременных запросов к API на один токен
+VK_POOL_SIZE = int(os.getenv('VKPOOLSIZE', '10'))
+VK_MAX_IN_FLIGHT = int(os.getenv('VKMAXINFLIGHT', '10'))
+
+# Ограничение частоты запросов к API (запросов в секунду) для токенов сообщества и пользователя
+VK_GROUP_RPS = float(os.getenv('VKGROUPRPS', '20'))
+VK_USER_RPS = float(os.getenv('VKUSERRPS', '3'))
+
+# Размер партии партнеров, фотографии которых запрашиваются одним запросом "execute" (не более 25)
+PARTNERS_BATCH_SIZE = 25
+
+# Количество готовых карточек партнеров в буфере активного пользователя
+# (0 - фоновая подгрузка отключена) и время неактивности до очистки буфера, секунд
+PREFETCH_SIZE = int(os.getenv('VKPREFETCHSIZE', '0'))
+PREFETCH_IDLE_TIMEOUT = float(os.getenv('VKPREFETCHIDLE', '600'))
+
+# Количество профилей, запрашиваемых за один запрос "users.search"
+SEARCH_PAGE_SIZE = int(os.getenv('VKSEARCHPAGESIZE', '200'))
+
+# Хранилище кэшей: 'local' - память процесса, 'redis://host:port/db' - общий кэш Redis
+CACHE_BACKEND = os.getenv('VKCACHEBACKEND', 'local')
+
+# Ширина возрастных интервалов поиска, лет: границы возраста запроса "users.search"
+# округляются до кратных SEARCH_AGE_BAND, поэтому пользователи с пересекающимися
+# возрастными окнами получают общие страницы результатов поиска, а партнеры
+# со скрытым годом рождения не показываются (0 или 1 - запрос с точным возрастным окном)
+SEARCH_AGE_BAND = int(os.getenv('VKSEARCHAGEBAND', '0'))
+
+# Кэш страниц результатов поиска: максимальное количество страниц и время жизни, секунд
+SEARCH_CACHE_SIZE = int(os.getenv('VKSEARCHCACHESIZE', '1000'))
+SEARCH_CACHE_TTL = float(os.getenv('VKSEARCHCACHETTL', '900'))
+
+# Кэш фотографий партнеров: максимальное количество партнеров и время жизни, секунд
+PHOTOS_CACHE_SIZE = int(os.getenv('VKPHOTOSCACHESIZE', '100000'))
+PHOTOS_CACHE_TTL = float(os.getenv('VKPHOTOSCACHETTL', '3600'))
+
+# Интервал пакетной записи реакций пользователей в базу данных, секунд
+# (0 - каждая реакция записывается сразу)
+REACTIONS_FLUSH_INTERVAL = float(os.getenv('VKREACTIONSFLUSH', '0'))
+
+# Интервал проверки изменения таблицы "genders" для перезагрузки ее копии в памяти, секунд
+GENDERS_RELOAD_INTERVAL = float(os.getenv('VKGENDERSRELOAD', '300'))
+
+# Хранилище состояний пользователей: максимальное количество записей, максимальный суммарный
+# объем записей (количество хранимых карточек и идентификаторов партнеров)
+# и время неактивности пользователя до удаления его записи, секунд
+USER_STATE_MAX_SESSIONS = int(os.getenv('VKUSERSTATESIZE', '10000'))
+USER_STATE_MAX_OBJECTS = int(os.getenv('VKUSERSTATEOBJECTS', '5000000'))
+USER_STATE_IDLE_TIMEOUT = float(os.getenv('VKUSERSTATEIDLE', '1800'))
+
+# Допустимая вероятность ложного срабатывания фильтра зарегистрированных пользователей
+USER_REGISTRY_ERROR_RATE = float(os.getenv('VKREGISTRYERRORRATE', '0.01'))
+
+# Количество избранных партнеров на одной странице сообщения
+FAVORITES_PAGE_SIZE = int(os.getenv('VKFAVORITESPAGESIZE', '10'))
+
+# Очередь исходящих сообщений: отправка фоновым потоком пакетами через execute
+# (1 - включена, 0 - каждое сообщение отправляется синхронно), количество попыток
+# отправки сообщения, начальная и максимальная задержка повторной отправки (секунды)
+OUTBOX_ENABLED = bool(int(os.getenv('VKOUTBOX', '0')))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('VKOUTBOXATTEMPTS', '5'))
+OUTBOX_BACKOFF_BASE = float(os.getenv('VKOUTBOXBACKOFF', '0.5'))
+OUTBOX_BACKOFF_MAX = float(os.getenv('VKOUTBOXBACKOFFMAX', '30'))
+
+# Логгирование: запись журнала в фоновом потоке (1 - включена, 0 - синхронная запись,
+# по умолчанию), максимальная длина записи аргументов и результата функции,
+# доля логгируемых вызовов функций
+LOG_ASYNC = bool(int(os.getenv('VKLOGASYNC', '0')))
+LOG_MAX_LENGTH = int(os.getenv('VKLOGMAXLENGTH', '500'))
+LOG_SAMPLE_RATE = float(os.getenv('VKLOGSAMPLERATE', '1'))
+
+# Файл со списком функций, логгирование которых отключено ('*' - всех функций),
+# и интервал проверки его изменения, секунд
+LOG_CONTROL_FILE = os.getenv('VKLOGCONTROLFILE', 'logging_off.txt')
+LOG_CONTROL_INTERVAL = float(os.getenv('VKLOGCONTROLINTERVAL', '5'))
+
+# Сбор метрик производительности (1 - включен), файл для выгрузки метрик в формате
+# Prometheus (пустая строка - не выгружать) и интервал выгрузки, секунд
+METRICS_ENABLED = bool(int(os.getenv('VKMETRICS', '0')))
+METRICS_FILE = os.getenv('VKMETRICSFILE', '')
+METRICS_EXPORT_INTERVAL = float(os.getenv('VKMETRICSINTERVAL', '15'))
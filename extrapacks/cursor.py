@@ -0,0 +1,103 @@
+'''
+Модуль курсора постраничного поиска партнеров.
+
+'''
+from array import array
+from collections.abc import Callable, Generator
+
+
+class SearchCursor:
+    '''Класс курсора поиска.
+
+       Хранит параметры поиска (params), смещение начала текущей страницы (offset),
+       идентификаторы уже выданных профилей (seen) и смещения страниц, с которых
+       выданы профили (pages). Состояние курсора сохраняется в базе данных
+       в компактном виде (метод to_record), что позволяет продолжить поиск с нужной
+       страницы после перезапуска бота.
+
+    '''
+    __slots__ = ('params', 'offset', 'seen', 'pages', 'page_size', 'limit')
+
+    def __init__(self, params: dict, offset: int=0, seen: set=None,
+                 page_size: int=200, limit: int=1000):
+        '''Конструктор класса.
+
+           page_size - количество профилей, запрашиваемых за один запрос,
+           limit - максимальное количество доступных результатов поиска.
+
+        '''
+        self.params = params
+        self.offset = offset
+        self.seen = seen or set()
+        self.pages = []
+        self.page_size = page_size
+        self.limit = limit
+
+    @staticmethod
+    def pack_ids(ids) -> bytes:
+        '''Метод упаковки идентификаторов в байтовую строку.
+
+        '''
+        return array('Q', sorted(ids)).tobytes()
+
+    @staticmethod
+    def unpack_ids(data: bytes) -> set:
+        '''Метод распаковки идентификаторов из байтовой строки.
+
+        '''
+        ids = array('Q')
+        ids.frombytes(data or b'')
+        return set(ids)
+
+    def to_record(self, exclude: set=frozenset()) -> dict:
+        '''Метод представления курсора в виде записи таблицы "search_cursors".
+
+           exclude - идентификаторы, которые не следует считать просмотренными
+           (например, подгруженные, но еще не показанные пользователю). Сохраняется
+           смещение самой ранней страницы, с которой выданы такие профили, чтобы
+           при продолжении поиска они были выданы повторно.
+
+        '''
+        offset = self.offset
+        if exclude:
+            offset = next((page_offset for page_offset, ids in self.pages
+                           if not ids.isdisjoint(exclude)), offset)
+        return {'params': self.params,
+                'offset': offset,
+                'seen': self.pack_ids(self.seen - exclude)}
+
+    @classmethod
+    def from_record(cls, record: dict, **kwargs):
+        '''Метод восстановления курсора из записи таблицы "search_cursors".
+
+        '''
+        return cls(record['params'], record['offset'], cls.unpack_ids(record['seen']), **kwargs)
+
+    def iter_items(self, fetch: Callable, on_page: Callable=None) -> Generator:
+        '''Метод-генератор профилей, начиная с текущего положения курсора.
+
+           fetch - функция запроса страницы (принимает параметры, возвращает ответ
+           "users.search"), on_page - функция, вызываемая перед выдачей каждой страницы
+           (например, для сохранения курсора).
+
+        '''
+        while self.offset < self.limit:
+            values = dict(self.params, offset=self.offset,
+                          count=min(self.page_size, self.limit - self.offset))
+            response = fetch(values)
+            items = response['items']
+            if on_page is not None:
+                on_page(self)
+
+            page_ids = set()
+            self.pages.append((self.offset, page_ids))
+            for item in items:
+                if item['id'] in self.seen:
+                    continue
+                self.seen.add(item['id'])
+                page_ids.add(item['id'])
+                yield item
+
+            self.offset += len(items)
+            if not items or self.offset >= response['count']:
+                return
@@ -0,0 +1,171 @@
+'''
+Модуль конкурентной обработки событий бота Vk-сообщества.
+
+'''
+from collections import defaultdict, deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+
+
+class LatencyStats:
+    '''Класс накопления статистики времени выполнения обработчика.
+
+       Хранит общее количество вызовов, суммарное и максимальное время выполнения,
+       а также ограниченную выборку последних замеров для расчета перцентилей.
+
+    '''
+    __slots__ = ('count', 'total', 'max', 'samples')
+
+    def __init__(self, sample_size: int=1000):
+        '''Конструктор класса.
+
+        '''
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=sample_size)
+
+    def add(self, duration: float):
+        '''Метод добавления замера времени выполнения.
+
+        '''
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.samples.append(duration)
+
+    def percentile(self, percent: float) -> float:
+        '''Метод расчета перцентиля по выборке последних замеров.
+
+        '''
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+    def as_dict(self) -> dict:
+        '''Метод представления статистики в виде словаря.
+
+        '''
+        return {'count': self.count,
+                'avg': self.total / self.count if self.count else 0.0,
+                'p50': self.percentile(50),
+                'p95': self.percentile(95),
+                'p99': self.percentile(99),
+                'max': self.max}
+
+
+class EventDispatcher:
+    '''Класс распределения событий пользователей по пулу потоков-обработчиков.
+
+       События одного пользователя обрабатываются строго последовательно в порядке
+       поступления, события разных пользователей - параллельно и не блокируют друг друга.
+       Для подбора размера пула предоставляет глубину очереди и время выполнения
+       обработчиков (метод get_stats).
+
+    '''
+    def __init__(self, handler: Callable, workers: int,
+                 key: Callable=lambda event: event.user_id,
+                 label: Callable=lambda event: 'event'):
+        '''Конструктор класса.
+
+           handler - функция-обработчик события,
+           key - функция получения идентификатора пользователя из события,
+           label - функция получения названия обработчика для статистики.
+
+        '''
+        self.handler = handler
+        self.key = key
+        self.label = label
+
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='vkbot-worker')
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._queues = {}
+        self._pending = 0
+        self._latency = defaultdict(LatencyStats)
+        self._closed = False
+
+    @property
+    def queue_depth(self) -> int:
+        '''Количество событий, ожидающих обработки или обрабатываемых в данный момент.
+
+        '''
+        return self._pending
+
+    def submit(self, event):
+        '''Метод постановки события в очередь пользователя.
+
+           Если очередь пользователя была пуста, запускает ее обработку в пуле потоков.
+
+        '''
+        user_id = self.key(event)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Диспетчер событий остановлен')
+            queue = self._queues.setdefault(user_id, deque())
+            queue.append(event)
+            self._pending += 1
+            if len(queue) > 1:
+                return
+        self._executor.submit(self._drain, user_id)
+
+    def _drain(self, user_id: int):
+        '''Метод последовательной обработки очереди событий одного пользователя.
+
+           Событие остается в очереди до окончания обработки, благодаря чему
+           параллельно для одного пользователя работает не более одного потока.
+
+        '''
+        queue = self._queues[user_id]
+        while True:
+            event = queue[0]
+            label = self.label(event)
+            start = time.perf_counter()
+            try:
+                self.handler(event)
+            except Exception:
+                logging.exception('Ошибка обработки события пользователя %s', user_id)
+            duration = time.perf_counter() - start
+
+            with self._lock:
+                self._latency[label].add(duration)
+                queue.popleft()
+                self._pending -= 1
+                if not self._pending:
+                    self._idle.notify_all()
+                if not queue:
+                    del self._queues[user_id]
+                    return
+
+    def wait_idle(self, timeout: float=None) -> bool:
+        '''Метод ожидания окончания обработки всех поставленных в очередь событий.
+
+        '''
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def get_stats(self) -> dict:
+        '''Метод получения статистики работы диспетчера.
+
+        '''
+        with self._lock:
+            return {'queue_depth': self._pending,
+                    'active_users': len(self._queues),
+                    'handlers': {label: stats.as_dict()
+                                 for label, stats in self._latency.items()}}
+
+    def shutdown(self, wait: bool=True):
+        '''Метод остановки диспетчера.
+
+           Новые события не принимаются, поставленные в очередь - обрабатываются.
+
+        '''
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=wait)
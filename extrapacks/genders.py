@@ -0,0 +1,116 @@
+'''
+Модуль определения пола человека по имени без обращения к базе данных.
+
+'''
+from collections.abc import Callable, Iterable
+import logging
+import threading
+import time
+
+
+class GenderLookup:
+    '''Класс таблицы соответствия имени полу в памяти процесса.
+
+       load - функция загрузки таблицы (возвращает словарь имя: пол),
+       version - функция получения версии таблицы (при изменении версии таблица
+       перезагружается), версия проверяется фоновым потоком (метод start)
+       раз в reload_interval секунд. Без запуска фонового потока таблица
+       загружается при первом обращении и не перезагружается.
+       Имена нормализуются так же, как при выборке из таблицы "genders".
+
+    '''
+    def __init__(self, load: Callable, version: Callable=None, reload_interval: float=300):
+        '''Конструктор класса.
+
+        '''
+        self.load = load
+        self.version = version
+        self.reload_interval = reload_interval
+
+        self._names = None
+        self._version = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        '''Метод нормализации имени.
+
+        '''
+        return name.capitalize().replace('ё', 'е')
+
+    def reload(self):
+        '''Метод принудительной загрузки таблицы.
+
+        '''
+        version = self.version() if self.version is not None else None
+        names = {self.normalize(name): sex for name, sex in self.load().items()}
+        with self._lock:
+            self._names = names
+            self._version = version
+
+    def start(self):
+        '''Метод загрузки таблицы и запуска фоновой проверки ее версии.
+
+        '''
+        start = time.perf_counter()
+        self.reload()
+        logging.info('Таблица имен загружена: %s имен, %.3f с', len(self._names),
+                     time.perf_counter() - start)
+        if self.version is None or self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name='vkbot-genders', daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        '''Метод фоновой перезагрузки таблицы при изменении версии.
+
+        '''
+        while not self._stopped.wait(self.reload_interval):
+            try:
+                if self.version() != self._version:
+                    self.reload()
+                    logging.info('Таблица имен перезагружена: %s имен', len(self._names))
+            except Exception:
+                logging.exception('Ошибка проверки версии таблицы имен')
+
+    def stop(self):
+        '''Метод остановки фоновой проверки версии таблицы.
+
+        '''
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _get_names(self) -> dict:
+        '''Метод получения таблицы с загрузкой при первом обращении.
+
+        '''
+        if (names := self._names) is None:
+            self.reload()
+            names = self._names
+        return names
+
+    def get(self, name: str) -> int:
+        '''Метод определения пола по имени (None - имя не найдено).
+
+        '''
+        return self._get_names().get(self.normalize(name))
+
+    def classify(self, profiles: Iterable[dict]) -> list:
+        '''Метод определения пола для страницы профилей (например, ответа "users.search").
+
+           Пол, указанный в профиле (поле "sex" не равно 0), сохраняется,
+           для остальных профилей определяется по полю "first_name".
+
+        '''
+        names = self._get_names()
+        normalize = self.normalize
+        return [profile.get('sex') or names.get(normalize(profile.get('first_name', '')))
+                for profile in profiles]
+
+    def __len__(self) -> int:
+        return len(self._get_names())
@@ -0,0 +1,57 @@
+'''
+Модуль реестра клавиатур бота.
+
+Клавиатура сообщения передается в messages.send строкой JSON. Реестр формирует
+JSON каждой клавиатуры один раз (статические клавиатуры - при регистрации)
+и выдает готовую строку при каждой отправке сообщения.
+
+'''
+from collections.abc import Callable
+import threading
+
+from vk_api.keyboard import VkKeyboard
+
+
+class KeyboardRegistry:
+    '''Класс реестра клавиатур.
+
+       Клавиатура регистрируется под именем функцией build, возвращающей VkKeyboard
+       (или None - сообщение без клавиатуры). Параметризованная клавиатура
+       (build с параметрами) формируется один раз для каждого набора параметров,
+       поэтому параметры должны принимать небольшое количество значений.
+
+    '''
+    def __init__(self):
+        '''Конструктор класса.
+
+        '''
+        self._builders = {}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, build: Callable, *variants: dict):
+        '''Метод регистрации клавиатуры.
+
+           variants - наборы параметров build, JSON для которых формируется сразу
+           (без параметров - JSON статической клавиатуры).
+
+        '''
+        self._builders[name] = build
+        for params in variants or ({},):
+            self.get(name, **params)
+
+    def get(self, name: str, **params) -> str | None:
+        '''Метод получения JSON клавиатуры name с параметрами params.
+
+        '''
+        key = (name, tuple(sorted(params.items())) if params else ())
+        if (keyboard := self._cache.get(key)) is not None or key in self._cache:
+            return keyboard
+        keyboard = self._builders[name](**params)
+        if isinstance(keyboard, VkKeyboard):
+            keyboard = keyboard.get_keyboard()
+        with self._lock:
+            return self._cache.setdefault(key, keyboard)
+
+    def __len__(self) -> int:
+        return len(self._cache)
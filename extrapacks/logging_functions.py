@@ -1,39 +1,207 @@
 '''
 Модуль инициализации логгирования.
 
+При LOG_ASYNC записи журнала передаются через очередь (QueueHandler) фоновому
+потоку (QueueListener), который записывает их в файл progress.log, поэтому
+обработчики событий не ожидают записи на диск.
+
+Аргументы и результаты функций, логгируемых декоратором logging_decorator,
+усекаются до LOG_MAX_LENGTH символов, вызовы логгируются с вероятностью
+LOG_SAMPLE_RATE. Логгирование отдельных функций отключается без перезапуска
+бота: имена функций (или '*' - все функции) перечисляются по одному в строке
+файла LOG_CONTROL_FILE, файл перечитывается при изменении.
+
 '''
+import atexit
+from collections import deque
 import functools
+import itertools
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import threading
+import time
+
+from extrapacks.config import (LOG_ASYNC, LOG_MAX_LENGTH, LOG_SAMPLE_RATE, LOG_CONTROL_FILE,
+                               LOG_CONTROL_INTERVAL)
+
+
+class PayloadRepr:
+    '''Класс ограниченного строкового представления аргументов и результатов функций.
+
+       Для коллекций длиннее max_items выводятся первые max_items элементов
+       и общее количество элементов, генераторы не перебираются. Представление
+       не превышает max_length символов.
+
+    '''
+    containers = (list, tuple, set, frozenset, dict, deque)
+
+    def __init__(self, max_length: int, max_items: int=3):
+        '''Конструктор класса.
+
+        '''
+        self.max_length = max_length
+        self.max_items = max_items
+
+    def _repr_item(self, obj) -> str:
+        '''Метод представления элемента верхнего уровня.
+
+        '''
+        if isinstance(obj, self.containers) and len(obj) > self.max_items:
+            items = obj.items() if isinstance(obj, dict) else obj
+            head = ', '.join(map(repr, itertools.islice(items, self.max_items)))
+            return f'<{type(obj).__name__} из {len(obj)} элементов: {head}, ...>'
+        return repr(obj)
+
+    def repr(self, obj) -> str:
+        '''Метод получения представления объекта.
+
+        '''
+        if isinstance(obj, tuple):
+            result = '(' + ', '.join(map(self._repr_item, obj)) + (',)' if len(obj) == 1 else ')')
+        elif isinstance(obj, dict) and len(obj) <= self.max_items:
+            result = ('{' + ', '.join(f'{key!r}: {self._repr_item(value)}'
+                                     for key, value in obj.items()) + '}')
+        else:
+            result = self._repr_item(obj)
+        if len(result) > self.max_length:
+            result = result[:self.max_length - 3] + '...'
+        return result
+
+
+class LoggingControl:
+    '''Класс управления логгированием функций во время работы бота.
+
+       Список отключенных функций читается из файла path не чаще
+       раза в interval секунд и только при изменении файла.
+
+    '''
+    def __init__(self, path: str, interval: float, sample_rate: float):
+        '''Конструктор класса.
+
+        '''
+        self.path = path
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.disabled = frozenset()
+        self._overrides = {}
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def set_enabled(self, name: str, enabled: bool):
+        '''Метод включения/отключения логгирования функции name из программы.
+
+           Имеет приоритет над файлом управления.
+
+        '''
+        with self._lock:
+            self._overrides[name] = enabled
+            self._rebuild(self._read_names())
+
+    def _read_names(self) -> set:
+        '''Метод чтения имен отключенных функций из файла управления.
+
+        '''
+        try:
+            with open(self.path, encoding='utf-8') as fr:
+                return {line.strip() for line in fr if line.strip() and not line.startswith('#')}
+        except OSError:
+            return set()
+
+    def _rebuild(self, names: set):
+        '''Метод пересчета множества отключенных функций.
+
+        '''
+        for name, enabled in self._overrides.items():
+            if enabled:
+                names.discard(name)
+            else:
+                names.add(name)
+        self.disabled = frozenset(names)
+
+    def refresh(self):
+        '''Метод перечитывания файла управления при его изменении.
+
+        '''
+        now = time.monotonic()
+        if now - self._checked < self.interval:
+            return
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                self._mtime = mtime
+                self._rebuild(self._read_names())
+
+    def is_enabled(self, name: str) -> bool:
+        '''Метод проверки необходимости логгирования вызова функции name.
+
+        '''
+        self.refresh()
+        disabled = self.disabled
+        if name in disabled or '*' in disabled:
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+
+payload_repr = PayloadRepr(LOG_MAX_LENGTH)
+control = LoggingControl(LOG_CONTROL_FILE, LOG_CONTROL_INTERVAL, LOG_SAMPLE_RATE)
 
 
 def logging_init():
     '''Функция инициализации логгирования.
-    
+
+    '''
+    file_handler = logging.FileHandler(os.path.join(os.getcwd(), 'progress.log'),
+                                       mode='a', encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(fmt='%(asctime)s %(levelname)s %(message)s',
+                                                datefmt='%d-%m-%Y %H:%M:%S'))
+    if not LOG_ASYNC:
+        logging.basicConfig(handlers=[file_handler], level=logging.INFO)
+        return
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # запись форматируется обработчиком файла, в очередь передается только сообщение
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(handlers=[queue_handler], level=logging.INFO)
+    listener.start()
+    atexit.register(listener.stop)
+
+
+def set_function_logging(name: str, enabled: bool):
+    '''Функция включения/отключения логгирования функции декоратором logging_decorator.
+
     '''
-    logging.basicConfig(filename=os.path.join(os.getcwd(), 'progress.log'),
-                        filemode='a',
-                        encoding='utf-8',
-                        level=logging.INFO,
-                        format='%(asctime)s %(levelname)s %(message)s',
-                        datefmt='%d-%m-%Y %H:%M:%S')
+    control.set_enabled(name, enabled)
 
 
 def logging_decorator(old_func):
     '''Декоратор для логгирования результатов выполнения функций.
-    
+
     '''
+    name = old_func.__name__
+
     @functools.wraps(old_func)
     def new_func(*args, **kwargs):
-        logging_params = {'old_func': old_func.__name__,
-                        'args': args, 
-                        'kwargs': kwargs,
-                        'spaces': ' ' * 25}
+        if not control.is_enabled(name):
+            return old_func(*args, **kwargs)
+        logging_params = {'old_func': name,
+                          'args': payload_repr.repr(args),
+                          'kwargs': payload_repr.repr(kwargs),
+                          'spaces': ' ' * 25}
         logging.info('Запущена функция %(old_func)s\n%(spaces)sАргументы: %(args)s, %(kwargs)s',
                      logging_params)
         result = old_func(*args, **kwargs)
         if result:
-            logging.info('Результат выполнения: %(result)s', {'result': result})
+            logging.info('Результат выполнения: %(result)s', {'result': payload_repr.repr(result)})
         return result
     return new_func
 
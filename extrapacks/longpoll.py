@@ -0,0 +1,181 @@
+'''
+Модуль устойчивого к сбоям подключения к Long Poll серверу ВКонтакте.
+
+'''
+from collections.abc import Generator
+import logging
+import queue
+import random
+import threading
+
+import requests
+from vk_api.exceptions import VkApiError
+from vk_api.longpoll import VkLongPoll, VkEventType
+
+from extrapacks.callback import RecentIds
+from extrapacks.metrics import increment
+
+
+class ResilientLongPoll(VkLongPoll):
+    '''Класс подключения к Long Poll серверу с восстановлением после сбоев.
+
+       События запрашиваются фоновым потоком и буферизуются в очереди, поэтому
+       опрос сервера не ожидает обработчиков, а обработчики продолжают работу
+       во время переподключения. При ошибках сети и сервера запросы повторяются
+       с экспоненциально растущей задержкой со случайной составляющей (backoff_base,
+       backoff_max), после refresh_after ошибок подряд (и при истечении ключа)
+       запрашиваются новые ключ и адрес сервера с сохранением ts, поэтому события
+       продолжают получаться с последнего полученного номера.
+       Учитывает потерянные (сервер потребовал сбросить ts) и повторно полученные
+       (отсеиваются по идентификатору сообщения) события.
+
+    '''
+    def __init__(self, vk, wait: int=25, backoff_base: float=0.5, backoff_max: float=30.0,
+                 refresh_after: int=3, dedup_size: int=10000, **kwargs):
+        '''Конструктор класса.
+
+        '''
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.refresh_after = refresh_after
+        self.events = queue.SimpleQueue()
+        self.recent = RecentIds(dedup_size)
+        self.failures = 0
+        self.stats = {'events': 0, 'errors': 0, 'reconnects': 0, 'lost': 0, 'replayed': 0}
+        self._stop = threading.Event()
+        self._thread = None
+        super().__init__(vk, wait=wait, **kwargs)
+
+    def _count(self, key: str, value: int=1):
+        '''Метод увеличения счетчика статистики (и одноименной метрики).
+
+        '''
+        self.stats[key] += value
+        increment(f'vkbot_longpoll_{key}_total', value)
+
+    def backoff(self, attempt: int, error: Exception):
+        '''Метод ожидания перед повторной попыткой запроса.
+
+           Задержка: случайная величина от половины до полного значения
+           backoff_base * 2 ** (attempt - 1), но не более backoff_max секунд.
+
+        '''
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        delay = random.uniform(delay / 2, delay)
+        logging.warning('Ошибка Long Poll (попытка %s): %r, повтор через %.2f с',
+                        attempt, error, delay)
+        self._stop.wait(delay)
+
+    def update_longpoll_server(self, update_ts: bool=True):
+        '''Метод получения ключа и адреса Long Poll сервера (при update_ts - и номера
+           последнего события) с повтором запроса до успешного выполнения.
+
+        '''
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                super().update_longpoll_server(update_ts=update_ts)
+            except (requests.RequestException, VkApiError) as error:
+                attempt += 1
+                self._count('errors')
+                self.backoff(attempt, error)
+            else:
+                self._count('reconnects')
+                return
+
+    def is_new(self, raw: list) -> bool:
+        '''Метод проверки, что событие не было получено ранее (для новых сообщений).
+
+        '''
+        if raw[0] == VkEventType.MESSAGE_NEW and not self.recent.add(raw[1]):
+            self._count('replayed')
+            return False
+        return True
+
+    def check(self) -> list:
+        '''Метод получения событий от сервера один раз.
+
+        '''
+        values = {
+            'act': 'a_check',
+            'key': self.key,
+            'ts': self.ts,
+            'wait': self.wait,
+            'mode': self.mode,
+            'version': 3
+        }
+        try:
+            response = self.session.get(self.url, params=values, timeout=self.wait + 10)
+            response.raise_for_status()
+            response = response.json()
+        except (requests.RequestException, ValueError) as error:
+            self.failures += 1
+            self._count('errors')
+            self.backoff(self.failures, error)
+            if self.failures >= self.refresh_after:
+                self.update_longpoll_server(update_ts=False)
+            return []
+        self.failures = 0
+
+        match response.get('failed'):
+            case None:
+                self.ts = response['ts']
+                if self.pts:
+                    self.pts = response['pts']
+                events = [self._parse_event(raw) for raw in response['updates']
+                          if self.is_new(raw)]
+                if self.preload_messages:
+                    self.preload_message_events_data(events)
+                self._count('events', len(events))
+                return events
+            case 1:
+                # история событий устарела или частично утеряна
+                self._count('lost', max(int(response['ts']) - int(self.ts), 0))
+                self.ts = response['ts']
+            case 2:
+                # истек срок действия ключа
+                self.update_longpoll_server(update_ts=False)
+            case 3:
+                # информация утеряна, события до нового ts не будут получены
+                last_ts = self.ts
+                self.update_longpoll_server()
+                self._count('lost', max(int(self.ts) - int(last_ts), 0))
+            case failed:
+                self._count('errors')
+                logging.warning('Неизвестный ответ Long Poll сервера: failed=%s', failed)
+                self.update_longpoll_server(update_ts=False)
+        return []
+
+    def _poll(self):
+        '''Метод фонового опроса сервера.
+
+        '''
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                for event in self.check():
+                    self.events.put(event)
+                attempt = 0
+            except Exception as error:
+                attempt += 1
+                self._count('errors')
+                logging.exception('Ошибка опроса Long Poll сервера')
+                self.backoff(attempt, error)
+
+    def listen(self) -> Generator:
+        '''Метод-генератор событий.
+
+           Запускает фоновый опрос сервера при первом обращении и останавливает
+           при закрытии генератора.
+
+        '''
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, name='vkbot-longpoll',
+                                            daemon=True)
+            self._thread.start()
+        try:
+            while True:
+                yield self.events.get()
+        finally:
+            self._stop.set()
+            logging.warning('Статистика Long Poll: %s', self.stats)
@@ -0,0 +1,320 @@
+'''
+Модуль сбора метрик производительности бота.
+
+Собирает время выполнения обработчиков событий и методов классов Database
+и VkontakteAPI, количество запросов к API по токенам и запросов к базе данных
+(всего и на одно событие). Метрики выгружаются в текстовом формате Prometheus
+(функция export_prometheus) в файл METRICS_FILE.
+
+При METRICS_ENABLED = False методы классов не оборачиваются, а вызовы
+track_event, count_vk_call, observe и increment сводятся к проверке флага.
+
+'''
+from collections import defaultdict
+from collections.abc import Callable
+from contextlib import nullcontext
+import functools
+import logging
+import os
+import threading
+import time
+from types import FunctionType
+
+import sqlalchemy as sq
+
+from extrapacks.config import METRICS_ENABLED, METRICS_FILE, METRICS_EXPORT_INTERVAL
+from extrapacks.dispatcher import LatencyStats
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class MetricsRegistry:
+    '''Класс хранилища метрик.
+
+       Гистограммы (LatencyStats) и счетчики хранятся по имени метрики
+       и набору меток (кортеж пар метка-значение).
+
+    '''
+    def __init__(self):
+        '''Конструктор класса.
+
+        '''
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(LatencyStats)
+        self._counters = defaultdict(int)
+        self._local = threading.local()
+
+    def observe(self, name: str, value: float, **labels):
+        '''Метод добавления значения в гистограмму.
+
+        '''
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._histograms[key].add(value)
+
+    def increment(self, name: str, value: int=1, **labels):
+        '''Метод увеличения счетчика.
+
+        '''
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def _event_counters(self):
+        '''Метод получения счетчиков запросов текущего события потока (None - вне события).
+
+        '''
+        return getattr(self._local, 'event', None)
+
+    def count_db_query(self):
+        '''Метод учета запроса к базе данных.
+
+        '''
+        self.increment('vkbot_db_queries_total')
+        if (event := self._event_counters()) is not None:
+            event['db'] += 1
+
+    def count_vk_call(self, token: str, method: str):
+        '''Метод учета запроса к API ВКонтакте.
+
+        '''
+        self.increment('vkbot_vk_calls_total', token=token, method=method)
+        if (event := self._event_counters()) is not None:
+            event['vk'] += 1
+
+    def track_event(self, handler: str):
+        '''Метод получения контекста обработки события.
+
+           По выходу из контекста записывает время обработки и количество запросов
+           к API и базе данных, выполненных потоком за время обработки.
+
+        '''
+        return EventScope(self, handler)
+
+    def timed(self, name: str) -> Callable:
+        '''Декоратор замера времени выполнения функции.
+
+        '''
+        def decorator(old_func):
+            @functools.wraps(old_func)
+            def new_func(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return old_func(*args, **kwargs)
+                finally:
+                    self.observe('vkbot_function_seconds', time.perf_counter() - start,
+                                 function=name)
+            return new_func
+        return decorator
+
+    def instrument(self, cls, prefix: str=None):
+        '''Метод оборачивания всех публичных методов класса декоратором timed.
+
+        '''
+        prefix = prefix or cls.__name__
+        for name, attr in list(vars(cls).items()):
+            if name.startswith('_'):
+                continue
+            if isinstance(attr, staticmethod):
+                setattr(cls, name, staticmethod(self.timed(f'{prefix}.{name}')(attr.__func__)))
+            elif isinstance(attr, FunctionType):
+                setattr(cls, name, self.timed(f'{prefix}.{name}')(attr))
+
+    def get_stats(self) -> dict:
+        '''Метод получения метрик в виде словаря.
+
+        '''
+        with self._lock:
+            histograms = {key: stats.as_dict() for key, stats in self._histograms.items()}
+            counters = dict(self._counters)
+        return {'histograms': histograms, 'counters': counters}
+
+    @staticmethod
+    def _format_labels(labels: tuple, **extra) -> str:
+        '''Метод формирования меток метрики в формате Prometheus.
+
+        '''
+        pairs = [*labels, *extra.items()]
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+        return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+    def export_prometheus(self) -> str:
+        '''Метод выгрузки метрик в текстовом формате Prometheus.
+
+           Гистограммы выгружаются как summary с квантилями 0.5, 0.95, 0.99.
+
+        '''
+        with self._lock:
+            histograms = sorted(
+                (key, [stats.percentile(quantile * 100) for quantile in QUANTILES],
+                 stats.count, stats.total) for key, stats in self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines = []
+        declared = set()
+        for (name, labels), quantiles, count, total in histograms:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f'# TYPE {name} summary')
+            for quantile, value in zip(QUANTILES, quantiles):
+                lines.append(f'{name}{self._format_labels(labels, quantile=quantile)} {value:.6g}')
+            lines.append(f'{name}_sum{self._format_labels(labels)} {total:.6g}')
+            lines.append(f'{name}_count{self._format_labels(labels)} {count}')
+        for (name, labels), value in counters:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{self._format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_file(self, path: str):
+        '''Метод записи метрик в файл (атомарной заменой файла).
+
+        '''
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as fw:
+            fw.write(self.export_prometheus())
+        os.replace(temp_path, path)
+
+
+class EventScope:
+    '''Класс контекста обработки события.
+
+    '''
+    __slots__ = ('registry', 'handler', 'start', 'previous')
+
+    def __init__(self, registry: MetricsRegistry, handler: str):
+        '''Конструктор класса.
+
+        '''
+        self.registry = registry
+        self.handler = handler
+
+    def __enter__(self):
+        local = self.registry._local
+        self.previous = getattr(local, 'event', None)
+        local.event = {'db': 0, 'vk': 0}
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        duration = time.perf_counter() - self.start
+        local = self.registry._local
+        event, local.event = local.event, self.previous
+        self.registry.observe('vkbot_handler_seconds', duration, handler=self.handler)
+        self.registry.observe('vkbot_db_queries_per_event', event['db'], handler=self.handler)
+        self.registry.observe('vkbot_vk_calls_per_event', event['vk'], handler=self.handler)
+
+
+class MetricsExporter:
+    '''Класс периодической записи метрик в файл в фоновом потоке.
+
+    '''
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float):
+        '''Конструктор класса.
+
+        '''
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='vkbot-metrics', daemon=True)
+
+    def start(self):
+        '''Метод запуска фоновой записи.
+
+        '''
+        self._thread.start()
+
+    def _run(self):
+        '''Метод записи метрик раз в interval секунд.
+
+        '''
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        '''Метод записи метрик в файл.
+
+        '''
+        try:
+            self.registry.write_file(self.path)
+        except OSError:
+            logging.exception('Ошибка записи метрик в файл %s', self.path)
+
+    def stop(self):
+        '''Метод остановки фоновой записи с записью итоговых метрик.
+
+        '''
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.write()
+
+
+metrics = MetricsRegistry()
+
+
+def track_event(handler: str):
+    '''Функция получения контекста обработки события (пустой контекст при отключенных метриках).
+
+    '''
+    return metrics.track_event(handler) if METRICS_ENABLED else nullcontext()
+
+
+def count_vk_call(token: str, method: str):
+    '''Функция учета запроса к API ВКонтакте.
+
+    '''
+    if METRICS_ENABLED:
+        metrics.count_vk_call(token, method)
+
+
+def observe(name: str, value: float, **labels):
+    '''Функция добавления значения в гистограмму.
+
+    '''
+    if METRICS_ENABLED:
+        metrics.observe(name, value, **labels)
+
+
+def increment(name: str, value: int=1, **labels):
+    '''Функция увеличения счетчика.
+
+    '''
+    if METRICS_ENABLED:
+        metrics.increment(name, value, **labels)
+
+
+def instrument(*classes):
+    '''Функция подключения сбора метрик к методам классов.
+
+    '''
+    if METRICS_ENABLED:
+        for cls in classes:
+            metrics.instrument(cls)
+
+
+def instrument_engine(engine):
+    '''Функция подключения подсчета запросов к базе данных движка SQLAlchemy.
+
+    '''
+    if METRICS_ENABLED:
+        sq.event.listen(engine, 'before_cursor_execute', lambda *args: metrics.count_db_query())
+
+
+def start_exporter(suffix: str='') -> MetricsExporter:
+    '''Функция запуска периодической записи метрик в файл METRICS_FILE.
+
+       suffix - окончание имени файла (например, номер процесса-обработчика).
+       Возвращает None, если сбор метрик отключен или файл не задан.
+
+    '''
+    if not (METRICS_ENABLED and METRICS_FILE):
+        return None
+    exporter = MetricsExporter(metrics, METRICS_FILE + suffix, METRICS_EXPORT_INTERVAL)
+    exporter.start()
+    return exporter
@@ -0,0 +1,288 @@
+'''
+Модуль очереди исходящих сообщений бота.
+
+Сообщения пользователям ставятся в очередь и отправляются фоновым потоком
+пакетами до EXECUTE_MAX_CALLS вызовов messages.send в одном запросе execute.
+Каждому сообщению при постановке в очередь присваивается идентификатор random_id,
+который не меняется при повторных отправках, поэтому ВКонтакте не доставит
+сообщение дважды. Отправка при временных ошибках повторяется с растущей задержкой,
+сообщения одному пользователю отправляются в порядке постановки в очередь,
+а несколько ожидающих отправки подряд сообщений пользователю объединяются в одно.
+
+'''
+from collections import deque
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+
+import requests
+from vk_api.exceptions import VkApiError
+
+from extrapacks.dispatcher import LatencyStats
+from extrapacks.metrics import increment, observe
+from extrapacks.ratelimit import request_priority, PRIORITY_USER
+
+
+# максимальное количество вызовов методов API в одном запросе execute
+EXECUTE_MAX_CALLS = 25
+# максимальная длина текста сообщения
+MAX_MESSAGE_LENGTH = 4096
+# разделитель текстов объединенных сообщений
+MERGE_SEPARATOR = '\n\n'
+# коды временных ошибок API, при которых отправка повторяется: неизвестная ошибка,
+# слишком много запросов в секунду, внутренняя ошибка сервера
+RETRY_ERROR_CODES = {1, 6, 10}
+
+
+class OutboundMessage:
+    '''Класс исходящего сообщения.
+
+    '''
+    __slots__ = ('user_id', 'message', 'keyboard', 'attachment', 'random_id',
+                 'attempts', 'retry_at', 'created')
+
+    def __init__(self, user_id: int, message: str, keyboard: str, attachment: str,
+                 random_id: int):
+        '''Конструктор класса.
+
+        '''
+        self.user_id = user_id
+        self.message = message
+        self.keyboard = keyboard
+        self.attachment = attachment
+        self.random_id = random_id
+        self.attempts = 0
+        self.retry_at = 0.0
+        self.created = time.perf_counter()
+
+    def merge(self, other: 'OutboundMessage') -> bool:
+        '''Метод присоединения следующего сообщения пользователю.
+
+           Объединяются сообщения без вложений (в том числе пустых), если у следующего
+           сообщения нет клавиатуры или она совпадает с клавиатурой текущего (клавиатура
+           не может быть заменена или потеряна) и суммарный текст не превышает
+           MAX_MESSAGE_LENGTH символов. Возвращает False, если сообщения нельзя объединить.
+
+        '''
+        if self.attachment is not None or other.attachment is not None:
+            return False
+        if other.keyboard is not None and other.keyboard != self.keyboard:
+            return False
+        message = f'{self.message}{MERGE_SEPARATOR}{other.message}'
+        if len(message) > MAX_MESSAGE_LENGTH:
+            return False
+        self.message = message
+        return True
+
+    def params(self) -> dict:
+        '''Метод получения параметров вызова messages.send.
+
+        '''
+        params = {'user_id': self.user_id, 'message': self.message,
+                  'random_id': self.random_id}
+        if self.keyboard is not None:
+            params['keyboard'] = self.keyboard
+        if self.attachment is not None:
+            params['attachment'] = self.attachment
+        return params
+
+
+def build_execute_code(calls: list[dict], method: str='messages.send') -> str:
+    '''Функция формирования кода execute, вызывающего метод method
+       с каждым набором параметров из calls.
+
+    '''
+    params = json.dumps(calls, ensure_ascii=False, separators=(',', ':'))
+    return (f'var params = {params},result = [],i = 0;'
+            f'while(i < params.length) {{result.push(API.{method}(params[i]));i = i + 1;}}'
+            'return result;')
+
+
+class MessageOutbox:
+    '''Класс очереди исходящих сообщений.
+
+       vk - экземпляр API с токеном сообщества (PooledVkApi), max_attempts - количество
+       попыток отправки сообщения, backoff_base и backoff_max - начальная и максимальная
+       задержка повторной отправки (секунды).
+
+    '''
+    def __init__(self, vk, max_attempts: int=5, backoff_base: float=0.5,
+                 backoff_max: float=30.0):
+        '''Конструктор класса.
+
+        '''
+        self.vk = vk
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # random_id - номер сообщения, отсчитываемый от начала, уникального для экземпляра
+        start = zlib.crc32(f'{time.time_ns()}:{id(self)}'.encode())
+        self._numbers = itertools.count(start)
+        self._queue = deque()
+        self._last = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self.latency = LatencyStats()
+        self.stats = {'queued': 0, 'coalesced': 0, 'sent': 0, 'batches': 0, 'retried': 0,
+                      'failed': 0}
+        self._thread = threading.Thread(target=self._run, name='vkbot-outbox', daemon=True)
+        self._thread.start()
+
+    def _count(self, key: str, value: int=1):
+        '''Метод увеличения счетчика статистики (и одноименной метрики).
+
+        '''
+        with self._stats_lock:
+            self.stats[key] += value
+        increment(f'vkbot_outbox_{key}_total', value)
+
+    def send(self, user_id: int, message: str, keyboard: str=None, attachment: str=None):
+        '''Метод постановки сообщения пользователю в очередь отправки.
+
+           keyboard - клавиатура в формате JSON.
+
+        '''
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('Очередь исходящих сообщений остановлена')
+            item = OutboundMessage(user_id, message, keyboard, attachment,
+                                   next(self._numbers) % 2 ** 31)
+            last = self._last.get(user_id)
+            if last is not None and last.merge(item):
+                self._count('coalesced')
+                return
+            self._queue.append(item)
+            self._last[user_id] = item
+            self._count('queued')
+            self._cond.notify_all()
+
+    def _take_batch(self, now: float) -> tuple[list, float]:
+        '''Метод выбора пакета сообщений, готовых к отправке.
+
+           В пакет попадает не более одного (первого в очереди) сообщения каждого
+           пользователя. Возвращает пакет и время готовности ближайшего из
+           отложенных сообщений (None - таких нет).
+
+        '''
+        batch, remaining, users = [], deque(), set()
+        wake_at = None
+        for item in self._queue:
+            if item.user_id in users:
+                remaining.append(item)
+                continue
+            users.add(item.user_id)
+            if item.retry_at <= now and len(batch) < EXECUTE_MAX_CALLS:
+                batch.append(item)
+                if self._last.get(item.user_id) is item:
+                    del self._last[item.user_id]
+            else:
+                remaining.append(item)
+                if item.retry_at > now:
+                    wake_at = item.retry_at if wake_at is None else min(wake_at, item.retry_at)
+        self._queue = remaining
+        return batch, wake_at
+
+    def _run(self):
+        '''Метод фоновой отправки сообщений.
+
+           Сообщения, поставленные в очередь во время отправки пакета,
+           отправляются следующим пакетом.
+
+        '''
+        while True:
+            with self._cond:
+                while True:
+                    batch, wake_at = self._take_batch(time.monotonic())
+                    if batch or (self._closed and not self._queue):
+                        break
+                    self._cond.wait(None if wake_at is None
+                                    else max(wake_at - time.monotonic(), 0))
+                observe('vkbot_outbox_queue_depth', len(self._queue) + len(batch))
+            if not batch:
+                return
+            self._send_batch(batch)
+
+    def _send_batch(self, batch: list):
+        '''Метод отправки пакета сообщений одним запросом execute.
+
+        '''
+        code = build_execute_code([item.params() for item in batch])
+        try:
+            with request_priority(PRIORITY_USER):
+                response = self.vk.method('execute', {'code': code}, raw=True)
+        except (requests.RequestException, VkApiError) as error:
+            self._retry(batch, repr(error))
+            return
+        self._count('batches')
+
+        retry = []
+        errors = iter(response.get('execute_errors', []))
+        results = response.get('response') or [False] * len(batch)
+        now = time.perf_counter()
+        for item, result in zip(batch, results):
+            if result is not False:
+                self.latency.add(now - item.created)
+                observe('vkbot_outbox_send_seconds', now - item.created)
+                self._count('sent')
+                continue
+            error = next(errors, {})
+            if error.get('error_code') in RETRY_ERROR_CODES:
+                retry.append(item)
+            else:
+                self._count('failed')
+                logging.error('Сообщение пользователю %s не отправлено: %s',
+                              item.user_id, error.get('error_msg'))
+        if retry:
+            self._retry(retry, 'временная ошибка messages.send')
+
+    def _retry(self, items: list, reason: str):
+        '''Метод возврата сообщений в начало очереди для повторной отправки.
+
+           Задержка: случайная величина от половины до полного значения
+           backoff_base * 2 ** (попытка - 1), но не более backoff_max секунд.
+
+        '''
+        retry = []
+        now = time.monotonic()
+        for item in items:
+            item.attempts += 1
+            if item.attempts >= self.max_attempts:
+                self._count('failed')
+                logging.error('Сообщение пользователю %s не отправлено за %s попыток: %s',
+                              item.user_id, item.attempts, reason)
+                continue
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (item.attempts - 1))
+            item.retry_at = now + random.uniform(delay / 2, delay)
+            retry.append(item)
+        if not retry:
+            return
+        self._count('retried', len(retry))
+        logging.warning('Повторная отправка %s сообщений: %s', len(retry), reason)
+        with self._cond:
+            self._queue.extendleft(reversed(retry))
+            self._cond.notify_all()
+
+    def get_stats(self) -> dict:
+        '''Метод получения статистики очереди.
+
+        '''
+        with self._cond:
+            queue_depth = len(self._queue)
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {**stats, 'queue_depth': queue_depth, 'latency': self.latency.as_dict()}
+
+    def close(self):
+        '''Метод отправки оставшихся сообщений и остановки фонового потока.
+
+        '''
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
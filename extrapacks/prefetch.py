@@ -0,0 +1,98 @@
+'''
+Модуль фоновой подгрузки данных для активных пользователей бота.
+
+'''
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+
+from extrapacks.ratelimit import request_priority, PRIORITY_BACKGROUND
+
+
+class Prefetcher:
+    '''Класс фонового пополнения буферов пользователей.
+
+       refill - функция пополнения буфера пользователя (принимает user_id),
+       evict - функция очистки буфера пользователя, неактивного дольше idle_timeout секунд.
+       Запросы к API из фоновых потоков выполняются с наименьшим приоритетом.
+       Для одного пользователя одновременно выполняется не более одного пополнения.
+
+    '''
+    def __init__(self, refill: Callable, evict: Callable, idle_timeout: float,
+                 workers: int=2):
+        '''Конструктор класса.
+
+        '''
+        self.refill = refill
+        self.evict = evict
+        self.idle_timeout = idle_timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='vkbot-prefetch')
+        self._lock = threading.Lock()
+        self._scheduled = set()
+        self._last_seen = {}
+        self._last_eviction = time.monotonic()
+        self.stats = {'scheduled': 0, 'completed': 0, 'failed': 0, 'evicted': 0}
+
+    def touch(self, user_id: int):
+        '''Метод отметки активности пользователя.
+
+        '''
+        with self._lock:
+            self._last_seen[user_id] = time.monotonic()
+
+    def schedule(self, user_id: int):
+        '''Метод постановки пополнения буфера пользователя в очередь.
+
+           Попутно (не чаще раза в idle_timeout) очищает буферы неактивных пользователей.
+
+        '''
+        with self._lock:
+            self._last_seen[user_id] = time.monotonic()
+            if user_id in self._scheduled:
+                return
+            self._scheduled.add(user_id)
+            self.stats['scheduled'] += 1
+        self._executor.submit(self._run, user_id)
+        self.evict_idle()
+
+    def _run(self, user_id: int):
+        '''Метод пополнения буфера пользователя в фоновом потоке.
+
+        '''
+        try:
+            with request_priority(PRIORITY_BACKGROUND):
+                self.refill(user_id)
+            self.stats['completed'] += 1
+        except Exception:
+            self.stats['failed'] += 1
+            logging.exception('Ошибка фоновой подгрузки для пользователя %s', user_id)
+        finally:
+            with self._lock:
+                self._scheduled.discard(user_id)
+
+    def evict_idle(self):
+        '''Метод очистки буферов пользователей, неактивных дольше idle_timeout секунд.
+
+        '''
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_eviction < self.idle_timeout:
+                return
+            self._last_eviction = now
+            idle = [user_id for user_id, last_seen in self._last_seen.items()
+                    if now - last_seen > self.idle_timeout and user_id not in self._scheduled]
+            for user_id in idle:
+                del self._last_seen[user_id]
+            self.stats['evicted'] += len(idle)
+        for user_id in idle:
+            self.evict(user_id)
+
+    def shutdown(self, wait: bool=True):
+        '''Метод остановки фоновой подгрузки.
+
+        '''
+        self._executor.shutdown(wait=wait, cancel_futures=True)
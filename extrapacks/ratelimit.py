@@ -0,0 +1,164 @@
+'''
+Модуль ограничения частоты запросов к API ВКонтакте.
+
+Для каждого токена создается один планировщик, через который проходят все
+запросы с этим токеном. Запросы ожидают своей очереди по приоритету:
+сообщения пользователю - в первую очередь, фоновая подгрузка - в последнюю.
+
+'''
+from collections import defaultdict
+from contextlib import contextmanager
+import heapq
+import itertools
+import threading
+import time
+
+
+# Приоритеты запросов (меньше - важнее)
+PRIORITY_USER = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BACKGROUND = 2
+
+METHOD_PRIORITIES = {
+    'messages.send': PRIORITY_USER,
+}
+
+_context = threading.local()
+
+
+@contextmanager
+def request_priority(priority: int):
+    '''Контекстный менеджер установки приоритета запросов текущего потока.
+
+       Используется, например, для фоновой подгрузки: with request_priority(PRIORITY_BACKGROUND).
+
+    '''
+    previous = getattr(_context, 'priority', None)
+    _context.priority = priority
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+
+def get_priority(method: str) -> int:
+    '''Функция определения приоритета запроса к методу API.
+
+       Приоритет, установленный в потоке через request_priority, важнее приоритета метода.
+
+    '''
+    if (priority := getattr(_context, 'priority', None)) is not None:
+        return priority
+    return METHOD_PRIORITIES.get(method, PRIORITY_DEFAULT)
+
+
+class TokenBucket:
+    '''Класс алгоритма "корзина токенов".
+
+       rate - скорость пополнения (запросов в секунду), capacity - размер корзины
+       (допустимый всплеск запросов).
+
+    '''
+    def __init__(self, rate: float, capacity: float=None):
+        '''Конструктор класса.
+
+        '''
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        '''Метод получения токена.
+
+           Возвращает 0, если токен получен, иначе - время до появления токена в секундах.
+
+        '''
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimitScheduler:
+    '''Класс планировщика запросов одного токена.
+
+       Запросы получают разрешение в порядке приоритета, при равном приоритете -
+       в порядке поступления. Ведет статистику ожидания (метод get_stats).
+
+    '''
+    _schedulers = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, rate: float, capacity: float=None):
+        '''Конструктор класса.
+
+        '''
+        self._bucket = TokenBucket(rate, capacity)
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._counter = itertools.count()
+        self._stats = defaultdict(lambda: {'calls': 0, 'waited': 0,
+                                           'wait_time': 0.0, 'max_wait': 0.0})
+
+    @classmethod
+    def for_token(cls, token: str, rate: float, capacity: float=None):
+        '''Метод получения общего планировщика для токена.
+
+        '''
+        with cls._registry_lock:
+            if token not in cls._schedulers:
+                cls._schedulers[token] = cls(rate, capacity)
+            return cls._schedulers[token]
+
+    def set_rate(self, rate: float):
+        '''Метод изменения скорости пополнения корзины (размер корзины изменяется пропорционально).
+
+        '''
+        with self._cond:
+            bucket = self._bucket
+            bucket.capacity = bucket.capacity * rate / bucket.rate
+            bucket.tokens = min(bucket.tokens, bucket.capacity)
+            bucket.rate = rate
+            self._cond.notify_all()
+
+    def acquire(self, priority: int=PRIORITY_DEFAULT) -> float:
+        '''Метод ожидания разрешения на запрос.
+
+           Возвращает время ожидания в секундах.
+
+        '''
+        start = time.monotonic()
+        entry = (priority, next(self._counter))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            while True:
+                if self._waiters[0] != entry:
+                    self._cond.wait()
+                    continue
+                if not (delay := self._bucket.take()):
+                    break
+                self._cond.wait(delay)
+            heapq.heappop(self._waiters)
+            self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            stats = self._stats[priority]
+            stats['calls'] += 1
+            if waited > 0.001:
+                stats['waited'] += 1
+                stats['wait_time'] += waited
+                stats['max_wait'] = max(stats['max_wait'], waited)
+        return waited
+
+    def get_stats(self) -> dict:
+        '''Метод получения статистики ожидания запросов по приоритетам.
+
+        '''
+        with self._cond:
+            return {'queued': len(self._waiters),
+                    'priorities': {priority: dict(stats)
+                                   for priority, stats in self._stats.items()}}
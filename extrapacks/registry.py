@@ -0,0 +1,172 @@
+'''
+Модуль проверки регистрации пользователей бота без загрузки всех пользователей в память.
+
+'''
+from collections.abc import Callable, Iterable
+import logging
+import math
+import threading
+import time
+
+
+class BloomFilter:
+    '''Класс фильтра Блума для целочисленных идентификаторов.
+
+       Компактное (около 10 бит на элемент при вероятности ложного срабатывания 1%)
+       множество, которое может ошибочно отвечать "есть" для отсутствующего
+       элемента, но никогда не отвечает "нет" для добавленного.
+
+    '''
+    def __init__(self, capacity: int, error_rate: float=0.01):
+        '''Конструктор класса.
+
+           capacity - ожидаемое количество элементов,
+           error_rate - допустимая вероятность ложного срабатывания.
+
+        '''
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @staticmethod
+    def _mix(value: int) -> int:
+        '''Метод перемешивания битов идентификатора (splitmix64).
+
+        '''
+        value = (value + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        return value ^ (value >> 31)
+
+    def _positions(self, item: int):
+        '''Метод-генератор позиций битов элемента (двойное хэширование).
+
+        '''
+        value = self._mix(item)
+        first, second = value & 0xFFFFFFFF, (value >> 32) | 1
+        for index in range(self.hashes):
+            yield (first + index * second) % self.size
+
+    def add(self, item: int):
+        '''Метод добавления элемента.
+
+        '''
+        bits = self.bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, items: Iterable[int]):
+        '''Метод добавления нескольких элементов.
+
+        '''
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: int) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + self.bits.__sizeof__()
+
+
+class UserRegistry:
+    '''Класс проверки регистрации пользователей.
+
+       probe - функция проверки наличия пользователя в базе данных (запрос по первичному
+       ключу), load_ids - функция-генератор идентификаторов всех пользователей,
+       count - функция получения количества пользователей.
+       Фильтр Блума строится в фоновом потоке (метод start) и позволяет без запроса
+       к базе данных отвечать "не зарегистрирован" для новых пользователей.
+       До окончания построения фильтра и при ответе фильтра "есть" выполняется probe.
+
+    '''
+    def __init__(self, probe: Callable, load_ids: Callable, count: Callable,
+                 error_rate: float=0.01, growth: float=1.5):
+        '''Конструктор класса.
+
+           growth - запас емкости фильтра на регистрацию новых пользователей.
+
+        '''
+        self.probe = probe
+        self.load_ids = load_ids
+        self.count = count
+        self.error_rate = error_rate
+        self.growth = growth
+
+        self.filter = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._added = []
+        self._generation = 0
+        self._thread = None
+        self.stats = {'probes': 0, 'filtered': 0, 'build_time': None}
+
+    def start(self):
+        '''Метод запуска построения фильтра в фоновом потоке.
+
+           Повторный вызов перестраивает фильтр (например, если пользователей
+           регистрировал другой процесс): до окончания построения выполняется probe.
+
+        '''
+        with self._lock:
+            self._generation += 1
+            self.filter = None
+            if self._added is None:
+                self._added = []
+            self._ready.clear()
+        self._thread = threading.Thread(target=self._build, args=(self._generation,),
+                                        name='vkbot-registry', daemon=True)
+        self._thread.start()
+
+    def _build(self, generation: int):
+        '''Метод построения фильтра.
+
+        '''
+        start = time.perf_counter()
+        try:
+            bloom = BloomFilter(int(self.count() * self.growth), self.error_rate)
+            bloom.update(self.load_ids())
+        except Exception:
+            logging.exception('Ошибка построения фильтра зарегистрированных пользователей')
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            bloom.update(self._added)
+            self._added = None
+            self.filter = bloom
+        self._ready.set()
+        self.stats['build_time'] = time.perf_counter() - start
+        logging.info('Фильтр зарегистрированных пользователей построен: %s пользователей, '
+                     '%s байт, %.3f с', bloom.count, len(bloom.bits), self.stats['build_time'])
+
+    def wait(self, timeout: float=None) -> bool:
+        '''Метод ожидания окончания построения фильтра.
+
+        '''
+        return self._ready.wait(timeout)
+
+    def add(self, user_id: int):
+        '''Метод отметки регистрации нового пользователя.
+
+        '''
+        with self._lock:
+            if self.filter is None:
+                self._added.append(user_id)
+            else:
+                self.filter.add(user_id)
+
+    def check(self, user_id: int) -> bool:
+        '''Метод проверки регистрации пользователя.
+
+        '''
+        if (bloom := self.filter) is not None and user_id not in bloom:
+            self.stats['filtered'] += 1
+            return False
+        self.stats['probes'] += 1
+        return self.probe(user_id)
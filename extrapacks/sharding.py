@@ -0,0 +1,213 @@
+'''
+Модуль распределения событий бота по нескольким процессам-обработчикам.
+
+Процесс, получающий события (Long Poll или Callback API), распределяет их
+по процессам-обработчикам по хэшу идентификатора пользователя, поэтому
+все события одного пользователя обрабатываются одним процессом со своим
+экземпляром бота (состояния пользователей, кэши, сессии базы данных).
+
+Экземпляр бота процесса-обработчика создается функцией factory и должен
+предоставлять методы start(shard), dispatch(event), release_users(keep),
+set_rate_share(share) и shutdown() (см. VkontakteBot).
+
+'''
+from collections.abc import Callable
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+import zlib
+
+from vk_api.longpoll import Event
+
+
+def shard_of(user_id: int, shards: int) -> int:
+    '''Функция получения номера процесса-обработчика пользователя.
+
+    '''
+    return zlib.crc32(user_id.to_bytes(8, 'little', signed=True)) % shards
+
+
+def run_shard(factory: Callable, index: int, shards: int,
+              inbox: multiprocessing.Queue, acks: multiprocessing.Queue):
+    '''Функция процесса-обработчика событий.
+
+       Сообщения очереди inbox:
+        ('event', raw) - событие Long Poll (список raw);
+        ('rebalance', shards) - изменение количества процессов: состояния пользователей,
+        перешедших к другим процессам, сохраняются в базу данных и удаляются,
+        по окончании в очередь acks передается номер процесса;
+        ('stop',) - остановка процесса.
+
+    '''
+    # остановкой процессов-обработчиков управляет получающий события процесс
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    bot = factory()
+    bot.set_rate_share(1 / shards)
+    bot.start(shard=index)
+    logging.warning('Процесс-обработчик %s из %s запущен', index, shards)
+    try:
+        while (message := inbox.get())[0] != 'stop':
+            match message:
+                case ('event', raw):
+                    try:
+                        bot.dispatch(Event(raw))
+                    except Exception:
+                        logging.exception('Ошибка обработки события процессом-обработчиком %s',
+                                          index)
+                case ('rebalance', shards):
+                    released = bot.release_users(lambda user_id: shard_of(user_id, shards) == index)
+                    bot.set_rate_share(1 / shards)
+                    logging.warning('Процесс-обработчик %s: перераспределение на %s процессов, '
+                                    'передано пользователей: %s', index, shards, released)
+                    acks.put(index)
+    finally:
+        bot.shutdown()
+        logging.warning('Процесс-обработчик %s остановлен', index)
+
+
+class ShardRouter:
+    '''Класс группы процессов-обработчиков событий.
+
+       Процесс-обработчик, завершившийся аварийно, перезапускается с той же
+       очередью событий (проверка не чаще раза в check_interval секунд).
+       Количество процессов изменяется методом resize без потери событий
+       и состояний пользователей.
+
+    '''
+    def __init__(self, factory: Callable, processes: int, check_interval: float=1.0,
+                 stop_timeout: float=60.0):
+        '''Конструктор класса.
+
+           factory - функция создания бота процесса-обработчика (должна сериализоваться
+           pickle: функция или класс уровня модуля, functools.partial).
+
+        '''
+        self.factory = factory
+        self.shards = processes
+        self.check_interval = check_interval
+        self.stop_timeout = stop_timeout
+
+        self._context = multiprocessing.get_context('spawn')
+        self._inboxes = []
+        self._processes = []
+        self._acks = self._context.Queue()
+        self._last_check = time.monotonic()
+        self.stats = {'events': [], 'restarts': 0, 'rebalances': 0}
+
+    def _start_worker(self, index: int):
+        '''Метод запуска процесса-обработчика с номером index.
+
+        '''
+        process = self._context.Process(target=run_shard, name=f'vkbot-shard-{index}',
+                                        args=(self.factory, index, self.shards,
+                                              self._inboxes[index], self._acks))
+        process.start()
+        if index < len(self._processes):
+            self._processes[index] = process
+        else:
+            self._processes.append(process)
+
+    def _add_worker(self):
+        '''Метод добавления процесса-обработчика.
+
+        '''
+        self._inboxes.append(self._context.Queue())
+        self.stats['events'].append(0)
+        self._start_worker(len(self._inboxes) - 1)
+
+    def start(self):
+        '''Метод запуска процессов-обработчиков.
+
+        '''
+        for _ in range(self.shards):
+            self._add_worker()
+
+    def submit(self, event: Event):
+        '''Метод передачи события процессу-обработчику пользователя.
+
+        '''
+        index = shard_of(event.user_id, self.shards)
+        self._inboxes[index].put(('event', event.raw))
+        self.stats['events'][index] += 1
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self.check_workers()
+
+    def check_workers(self):
+        '''Метод перезапуска аварийно завершившихся процессов-обработчиков.
+
+        '''
+        self._last_check = time.monotonic()
+        for index, process in enumerate(self._processes):
+            if not process.is_alive():
+                logging.error('Процесс-обработчик %s завершился (код %s), перезапуск',
+                              index, process.exitcode)
+                self.stats['restarts'] += 1
+                self._start_worker(index)
+
+    def _wait_acks(self, indexes: set):
+        '''Метод ожидания подтверждения перераспределения от процессов indexes.
+
+        '''
+        deadline = time.monotonic() + self.stop_timeout
+        while indexes and time.monotonic() < deadline:
+            try:
+                indexes.discard(self._acks.get(timeout=self.check_interval))
+            except queue.Empty:
+                indexes = {index for index in indexes if self._processes[index].is_alive()}
+        if indexes:
+            logging.error('Процессы-обработчики %s не подтвердили перераспределение', indexes)
+
+    def resize(self, processes: int):
+        '''Метод изменения количества процессов-обработчиков.
+
+           Вызывается из процесса, получающего события, поэтому на время
+           перераспределения новые события не поступают. Текущие процессы обрабатывают
+           полученные ранее события и сохраняют состояния перешедших к другим
+           процессам пользователей, после чего запускаются новые процессы
+           (при уменьшении количества - останавливаются лишние).
+
+        '''
+        if processes == self.shards or processes < 1:
+            return
+        old = self.shards
+        for inbox in self._inboxes:
+            inbox.put(('rebalance', processes))
+        self._wait_acks(set(range(old)))
+
+        self.shards = processes
+        for _ in range(old, processes):
+            self._add_worker()
+        for index in range(processes, old):
+            self._inboxes[index].put(('stop',))
+            self._join_worker(index)
+        del self._inboxes[processes:]
+        del self._processes[processes:]
+        del self.stats['events'][processes:]
+        self.stats['rebalances'] += 1
+        logging.warning('Количество процессов-обработчиков изменено: %s -> %s', old, processes)
+
+    def _join_worker(self, index: int):
+        '''Метод ожидания остановки процесса-обработчика (принудительная остановка
+           по истечении stop_timeout секунд).
+
+        '''
+        process = self._processes[index]
+        process.join(self.stop_timeout)
+        if process.is_alive():
+            logging.error('Процесс-обработчик %s не остановлен за %s с', index, self.stop_timeout)
+            process.terminate()
+            process.join()
+
+    def shutdown(self):
+        '''Метод остановки всех процессов-обработчиков.
+
+           Каждый процесс обрабатывает полученные события, сохраняет состояния
+           пользователей и статистику.
+
+        '''
+        for inbox in self._inboxes:
+            inbox.put(('stop',))
+        for index in range(len(self._processes)):
+            self._join_worker(index)
@@ -0,0 +1,220 @@
+'''
+Модуль хранения состояния пользователей бота в памяти процесса.
+
+'''
+from collections import OrderedDict
+from collections.abc import Callable
+import itertools
+import logging
+import threading
+import time
+
+
+class UserSession:
+    '''Класс записи состояния пользователя.
+
+       Хранит курсор и генератор поиска партнеров, возрастное окно поиска
+       (age_range - границы возраста партнеров пользователя), буфер готовых карточек,
+       отображаемого партнера, множество игнорируемых партнеров и положение
+       в списке избранных партнеров. Любое поле,
+       кроме user_id и lock, может отсутствовать (None) и восстанавливается
+       из базы данных при следующем обращении.
+
+    '''
+    __slots__ = ('user_id', 'registered', 'search_cursor', 'all_partners', 'age_range', 'cards',
+                 'current_partner', 'ignored', 'favorites_pages', 'last_seen', 'lock')
+
+    def __init__(self, user_id: int):
+        '''Конструктор класса.
+
+        '''
+        self.user_id = user_id
+        self.registered = False
+        self.search_cursor = None
+        self.all_partners = None
+        self.age_range = None
+        self.cards = None
+        self.current_partner = None
+        self.ignored = None
+        self.favorites_pages = None
+        self.last_seen = time.monotonic()
+        self.lock = threading.RLock()
+
+    def clear_search(self):
+        '''Метод очистки результатов поиска партнеров.
+
+        '''
+        self.search_cursor = None
+        self.all_partners = None
+        self.age_range = None
+        self.cards = None
+
+    def weight(self) -> int:
+        '''Метод оценки объема записи в количестве хранимых объектов.
+
+           Учитываются карточки, игнорируемые и просмотренные партнеры,
+           а также страница результатов поиска, удерживаемая генератором.
+
+        '''
+        result = 1 + len(self.cards or ()) + len(self.ignored or ())
+        if self.search_cursor is not None:
+            result += len(self.search_cursor.seen)
+            if self.all_partners is not None:
+                result += self.search_cursor.page_size
+        return result
+
+
+class UserStateStore:
+    '''Класс ограниченного хранилища состояний пользователей.
+
+       Хранит не более max_sessions записей суммарным объемом не более max_objects
+       (UserSession.weight) и удаляет записи пользователей, неактивных дольше
+       idle_timeout секунд. При переполнении удаляются давно не использовавшиеся
+       записи (LRU). Перед удалением запись передается функции on_evict
+       (например, для сохранения курсора поиска). Записи, заблокированные
+       обработчиком в момент очистки, не удаляются.
+
+       Отображаемый пользователю партнер (current_partner) удаленной записи
+       сохраняется (не более max_retained последних) и восстанавливается
+       в новой записи пользователя, чтобы реакция на уже показанную карточку
+       не терялась.
+
+    '''
+    def __init__(self, max_sessions: int, max_objects: int, idle_timeout: float,
+                 on_evict: Callable=None, check_interval: float=1.0,
+                 max_retained: int=None):
+        '''Конструктор класса.
+
+        '''
+        self.max_sessions = max_sessions
+        self.max_objects = max_objects
+        self.idle_timeout = idle_timeout
+        self.on_evict = on_evict
+        self.check_interval = check_interval
+        self.max_retained = max_sessions * 10 if max_retained is None else max_retained
+
+        self._sessions = OrderedDict()
+        self._retained = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self.stats = {'created': 0, 'evicted': 0}
+
+    def get(self, user_id: int) -> UserSession:
+        '''Метод получения записи пользователя (None - записи нет).
+
+        '''
+        with self._lock:
+            if (session := self._sessions.get(user_id)) is not None:
+                self._sessions.move_to_end(user_id)
+                session.last_seen = time.monotonic()
+            return session
+
+    def get_or_create(self, user_id: int) -> UserSession:
+        '''Метод получения записи пользователя с созданием пустой записи при ее отсутствии.
+
+        '''
+        if (session := self.get(user_id)) is not None:
+            return session
+        with self._lock:
+            if (session := self._sessions.get(user_id)) is None:
+                session = self._sessions[user_id] = UserSession(user_id)
+                session.current_partner = self._retained.pop(user_id, None)
+                self.stats['created'] += 1
+        self.trim()
+        return session
+
+    def discard(self, user_id: int):
+        '''Метод удаления записи пользователя без вызова on_evict.
+
+        '''
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._sessions))
+
+    def _select_victims(self, force: bool) -> list:
+        '''Метод отбора записей для удаления (вызывается под блокировкой хранилища).
+
+           Записи просматриваются от давно не использовавшихся к недавним.
+
+        '''
+        now = time.monotonic()
+        count = len(self._sessions)
+        total = sum(session.weight() for session in self._sessions.values()) if force else 0
+        victims = []
+        # порядок записей совпадает с порядком последнего обращения,
+        # поэтому просмотр прекращается на первой записи, которую удалять не нужно;
+        # запись последнего обратившегося пользователя не удаляется
+        for session in itertools.islice(self._sessions.values(), count - 1):
+            overflow = count > self.max_sessions or (force and total > self.max_objects)
+            idle = force and now - session.last_seen > self.idle_timeout
+            if not (overflow or idle):
+                break
+            if not session.lock.acquire(blocking=False):
+                continue
+            victims.append(session)
+            count -= 1
+            if force:
+                total -= session.weight()
+        for session in victims:
+            del self._sessions[session.user_id]
+            self._retain(session)
+        return victims
+
+    def _retain(self, session: UserSession):
+        '''Метод сохранения отображаемого партнера удаляемой записи
+           (вызывается под блокировкой хранилища).
+
+        '''
+        if session.current_partner is None or not self.max_retained:
+            return
+        self._retained[session.user_id] = session.current_partner
+        self._retained.move_to_end(session.user_id)
+        while len(self._retained) > self.max_retained:
+            self._retained.popitem(last=False)
+
+    def trim(self, force: bool=False):
+        '''Метод удаления лишних записей.
+
+           Ограничение количества записей проверяется при каждом вызове, ограничение
+           объема и время неактивности - не чаще раза в check_interval секунд
+           (или при force=True).
+
+        '''
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_check >= self.check_interval:
+                force = True
+            if force:
+                self._last_check = now
+            if not force and len(self._sessions) <= self.max_sessions:
+                return
+            victims = self._select_victims(force)
+            self.stats['evicted'] += len(victims)
+
+        for session in victims:
+            try:
+                if self.on_evict is not None:
+                    self.on_evict(session)
+            except Exception:
+                logging.exception('Ошибка при удалении состояния пользователя %s',
+                                  session.user_id)
+            finally:
+                session.lock.release()
+
+    def get_stats(self) -> dict:
+        '''Метод получения статистики хранилища.
+
+        '''
+        with self._lock:
+            return {**self.stats, 'sessions': len(self._sessions),
+                    'retained': len(self._retained),
+                    'objects': sum(session.weight() for session in self._sessions.values())}
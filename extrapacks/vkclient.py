@@ -0,0 +1,150 @@
+'''
+Модуль клиентов API ВКонтакте с пулом HTTP-соединений.
+
+'''
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+import vk_api
+from vk_api.exceptions import ApiError, ApiHttpError, Captcha, CAPTCHA_ERROR_CODE
+
+from extrapacks.config import VK_POOL_SIZE, VK_MAX_IN_FLIGHT, VK_USER_RPS
+from extrapacks.metrics import count_vk_call
+from extrapacks.ratelimit import RateLimitScheduler, get_priority
+
+
+def create_session(pool_size: int=VK_POOL_SIZE) -> requests.Session:
+    '''Функция создания HTTP-сессии с пулом keep-alive соединений.
+
+    '''
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+    return session
+
+
+class PooledVkApi(vk_api.VkApi):
+    '''Класс для работы с API ВКонтакте через общий пул соединений токена.
+
+       В отличие от vk_api.VkApi не удерживает блокировку на время HTTP-запроса:
+       частота запросов ограничивается общим для токена планировщиком RateLimitScheduler
+       (не более rps запросов в секунду, с учетом приоритета метода), сами запросы
+       выполняются параллельно, но не более max_in_flight одновременно на токен.
+       Все экземпляры с одним токеном используют одну HTTP-сессию: pool_size
+       и max_in_flight задаются первым экземпляром токена, отличающиеся
+       значения последующих экземпляров не применяются (с предупреждением в журнале).
+
+    '''
+    _sessions = {}
+    _semaphores = {}
+    _pool_settings = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, token: str, rps: float=VK_USER_RPS, pool_size: int=VK_POOL_SIZE,
+                 max_in_flight: int=VK_MAX_IN_FLIGHT, **kwargs):
+        '''Конструктор класса.
+
+        '''
+        with PooledVkApi._registry_lock:
+            if token not in PooledVkApi._sessions:
+                PooledVkApi._sessions[token] = create_session(pool_size)
+                PooledVkApi._semaphores[token] = threading.BoundedSemaphore(max_in_flight)
+                PooledVkApi._pool_settings[token] = (pool_size, max_in_flight)
+            elif (settings := PooledVkApi._pool_settings[token]) != (pool_size, max_in_flight):
+                logging.warning('Пул соединений токена ...%s уже создан с pool_size=%s, '
+                                'max_in_flight=%s: значения pool_size=%s, max_in_flight=%s '
+                                'не применены', token[-4:], *settings, pool_size, max_in_flight)
+            session = PooledVkApi._sessions[token]
+            self.in_flight = PooledVkApi._semaphores[token]
+        self.scheduler = RateLimitScheduler.for_token(token, rps)
+        # метка токена для метрик (без раскрытия самого токена)
+        self.token_label = f'...{token[-4:]}' if token else 'none'
+        super().__init__(token=token, session=session, **kwargs)
+
+    def method(self, method: str, values: dict=None, captcha_sid=None,
+               captcha_key=None, raw: bool=False):
+        '''Метод вызова метода API.
+
+           Обработка ошибок аналогична vk_api.VkApi.method.
+
+        '''
+        values = values.copy() if values else {}
+        values.setdefault('v', self.api_version)
+        if self.token:
+            values['access_token'] = self.token['access_token']
+        if captcha_sid and captcha_key:
+            values['captcha_sid'] = captcha_sid
+            values['captcha_key'] = captcha_key
+
+        self.scheduler.acquire(get_priority(method))
+        count_vk_call(self.token_label, method)
+        with self.in_flight:
+            response = self.http.post('https://api.vk.com/method/' + method, values,
+                                      headers={'Cookie': ''})
+
+        if not response.ok:
+            error = ApiHttpError(self, method, values, raw, response)
+            if (response := self.http_handler(error)) is not None:
+                return response
+            raise error
+
+        response = response.json()
+        if 'error' in response:
+            error = ApiError(self, method, values, raw, response['error'])
+            if error.code in self.error_handlers:
+                if error.code == CAPTCHA_ERROR_CODE:
+                    error = Captcha(self, error.error['captcha_sid'], self.method,
+                                    (method,), {'values': values, 'raw': raw},
+                                    error.error['captcha_img'])
+                if (response := self.error_handlers[error.code](error)) is not None:
+                    return response
+            raise error
+
+        return response if raw else response['response']
+
+
+class AsyncVkClient:
+    '''Класс асинхронного клиента API ВКонтакте.
+
+       Выполняет запросы экземпляра PooledVkApi в пуле потоков, количество
+       одновременных запросов ограничено max_in_flight.
+
+    '''
+    def __init__(self, vk: PooledVkApi, max_in_flight: int=VK_MAX_IN_FLIGHT):
+        '''Конструктор класса.
+
+        '''
+        self.vk = vk
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight,
+                                            thread_name_prefix='vkapi-async')
+
+    async def method(self, method: str, values: dict=None, raw: bool=False):
+        '''Метод асинхронного вызова метода API.
+
+        '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(self.vk.method, method, values, raw=raw))
+
+    async def gather(self, calls: Iterable[tuple[str, dict]]) -> list:
+        '''Метод параллельного вызова нескольких методов API.
+
+           calls - последовательность пар (название метода, параметры).
+
+        '''
+        return await asyncio.gather(*(self.method(method, values)
+                                      for method, values in calls))
+
+    def close(self):
+        '''Метод остановки пула потоков клиента.
+
+        '''
+        self._executor.shutdown(wait=True)
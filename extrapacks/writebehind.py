@@ -0,0 +1,111 @@
+'''
+Модуль отложенной пакетной записи в базу данных.
+
+'''
+from collections.abc import Callable
+import logging
+import threading
+import time
+
+
+class WriteBehindBuffer:
+    '''Класс буфера отложенной записи.
+
+       Накапливает записи от всех пользователей и раз в interval секунд
+       (или при накоплении max_batch записей) передает их пакетом функции flush,
+       которая записывает пакет одной транзакцией. При ошибке записи пакета
+       записи повторяются по одной, чтобы ошибочная запись не привела к потере
+       остальных.
+
+    '''
+    def __init__(self, flush: Callable, interval: float, max_batch: int=500):
+        '''Конструктор класса.
+
+        '''
+        self.flush_func = flush
+        self.interval = interval
+        self.max_batch = max_batch
+
+        self._items = []
+        self._cond = threading.Condition()
+        self._flushing = False
+        self._closed = False
+        self.stats = {'items': 0, 'batches': 0, 'failed': 0}
+        self._thread = threading.Thread(target=self._run, name='vkbot-writebehind',
+                                        daemon=True)
+        self._thread.start()
+
+    def add(self, item):
+        '''Метод добавления записи в буфер.
+
+        '''
+        with self._cond:
+            self._items.append(item)
+            if len(self._items) >= self.max_batch:
+                self._cond.notify_all()
+
+    def _run(self):
+        '''Метод фоновой записи накопленных записей.
+
+        '''
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or len(self._items) >= self.max_batch,
+                                    timeout=self.interval)
+                closed = self._closed
+            self._write()
+            if closed:
+                return
+
+    def _write(self):
+        '''Метод записи накопленного пакета.
+
+        '''
+        with self._cond:
+            self._cond.wait_for(lambda: not self._flushing)
+            items, self._items = self._items, []
+            self._flushing = True
+        try:
+            if items:
+                self._write_batch(items)
+        finally:
+            with self._cond:
+                self._flushing = False
+                self._cond.notify_all()
+
+    def _write_batch(self, items: list):
+        '''Метод записи пакета с повтором по одной записи при ошибке.
+
+        '''
+        start = time.perf_counter()
+        try:
+            self.flush_func(items)
+        except Exception:
+            logging.exception('Ошибка пакетной записи, запись по одной')
+            for item in items:
+                try:
+                    self.flush_func([item])
+                except Exception:
+                    self.stats['failed'] += 1
+                    logging.exception('Ошибка записи %s', item)
+        self.stats['items'] += len(items)
+        self.stats['batches'] += 1
+        logging.info('Записан пакет из %s записей за %.3f с', len(items),
+                     time.perf_counter() - start)
+
+    def flush(self):
+        '''Метод немедленной записи всех накопленных записей.
+
+           Используется перед чтением данных, которые могут находиться в буфере.
+
+        '''
+        self._write()
+
+    def close(self):
+        '''Метод записи оставшихся записей и остановки фонового потока.
+
+        '''
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
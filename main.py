@@ -3,30 +3,74 @@
 и его взаимодействия с базой данных PostgreSQL.
 
 '''
-from collections.abc import Generator
+from collections import deque
+from collections.abc import Callable, Generator
+from contextlib import closing
 from datetime import datetime
 from random import randrange
 import logging
+import threading
 
-import vk_api
-from vk_api.longpoll import VkLongPoll, VkEventType, Event
+import sqlalchemy as sq
+from sqlalchemy.dialects.postgresql import insert, aggregate_order_by
+from vk_api.longpoll import VkEventType, Event
 from vk_api.keyboard import VkKeyboard, VkKeyboardColor
-from vk_api.tools import VkTools
-
-from extrapacks.config import VKGROUP_TOKEN, VKUSER_TOKEN
+from vk_api.requests_pool import vk_request_one_param_pool
+
+from extrapacks.config import (VKGROUP_TOKEN, VKUSER_TOKEN, BOT_WORKERS, BOT_PROCESSES,
+                               VK_GROUP_RPS, VK_USER_RPS, CALLBACK_HOST, CALLBACK_PORT,
+                               CALLBACK_CONFIRMATION, CALLBACK_SECRET, CALLBACK_DEDUP_SIZE,
+                               LONGPOLL_WAIT, LONGPOLL_BACKOFF_BASE, LONGPOLL_BACKOFF_MAX,
+                               LONGPOLL_REFRESH_AFTER,
+                               PARTNERS_BATCH_SIZE, PREFETCH_SIZE, PREFETCH_IDLE_TIMEOUT,
+                               SEARCH_PAGE_SIZE, SEARCH_AGE_BAND, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL,
+                               PHOTOS_CACHE_SIZE, PHOTOS_CACHE_TTL, REACTIONS_FLUSH_INTERVAL,
+                               GENDERS_RELOAD_INTERVAL, USER_STATE_MAX_SESSIONS,
+                               USER_STATE_MAX_OBJECTS, USER_STATE_IDLE_TIMEOUT,
+                               USER_REGISTRY_ERROR_RATE, FAVORITES_PAGE_SIZE, OUTBOX_ENABLED,
+                               OUTBOX_MAX_ATTEMPTS, OUTBOX_BACKOFF_BASE, OUTBOX_BACKOFF_MAX)
+from extrapacks.cache import create_cache
+from extrapacks.callback import CallbackServer
+from extrapacks.cursor import SearchCursor
+from extrapacks.dispatcher import EventDispatcher
+from extrapacks.genders import GenderLookup
+from extrapacks.keyboards import KeyboardRegistry
+from extrapacks.longpoll import ResilientLongPoll
 from extrapacks.logging_functions import logging_decorator
-from models import Genders, Users, Partners, UsersPartners, DatabaseConfig
+from extrapacks.metrics import track_event, instrument, instrument_engine, start_exporter
+from extrapacks.outbox import MessageOutbox
+from extrapacks.prefetch import Prefetcher
+from extrapacks.registry import UserRegistry
+from extrapacks.sharding import ShardRouter
+from extrapacks.userstate import UserSession, UserStateStore
+from extrapacks.vkclient import PooledVkApi
+from extrapacks.writebehind import WriteBehindBuffer
+from models import Genders, Users, Partners, UsersPartners, SearchCursors, DatabaseConfig
+
+
+def create_event_source(create_longpoll: Callable):
+    '''Функция создания источника событий бота: сервера Callback API при CALLBACK_PORT > 0,
+       иначе - подключения к Long Poll серверу функцией create_longpoll.
+
+    '''
+    if CALLBACK_PORT:
+        return CallbackServer(CALLBACK_HOST, CALLBACK_PORT, confirmation=CALLBACK_CONFIRMATION,
+                              secret=CALLBACK_SECRET, dedup_size=CALLBACK_DEDUP_SIZE)
+    return create_longpoll()
 
 
 class Database:
     '''Статический класс для взаимодействия с базой данных PostgreSQL.
 
        Для работы с базой данных в файл config.py необходимо ввести параметры подключения.
+       Каждая функция выполняется в отдельной единице работы с сессией своего потока,
+       поэтому функции класса можно вызывать одновременно из нескольких потоков.
     
     '''
-    session = DatabaseConfig.Session()
+    session = DatabaseConfig.ScopedSession
 
     @logging_decorator
+    @DatabaseConfig.unit_of_work
     @staticmethod
     def get_gender(name: str) -> int:
         '''Функция выборки пола человека, соответствующего его имени из таблицы "genders".
@@ -39,19 +83,69 @@ class Database:
 
 
     @logging_decorator
+    @DatabaseConfig.unit_of_work
     @staticmethod
-    def get_users() -> dict:
-        '''Функция выборки идентификаторов всех пользователей из таблицы "users".
+    def get_genders() -> dict:
+        '''Функция выборки всей таблицы "genders" в виде словаря имя: пол.
+
+        '''
+        result = Database.session.query(Genders.name, Genders.sex).all()
+        return dict(result)
+
+
+    @logging_decorator
+    @DatabaseConfig.unit_of_work
+    @staticmethod
+    def get_genders_version() -> str:
+        '''Функция получения версии таблицы "genders" (хэш ее содержимого).
+
+        '''
+        row = Genders.name + '-' + sq.cast(Genders.sex, sq.String)
+        content = sq.func.string_agg(row, aggregate_order_by(sq.literal_column("','"), Genders.name))
+        result = Database.session.query(sq.func.md5(content)).scalar()
+        return result
+
+
+    @logging_decorator
+    @DatabaseConfig.unit_of_work
+    @staticmethod
+    def count_users() -> int:
+        '''Функция подсчета количества пользователей в таблице "users".
 
-           Используется для заполнения словаря users_state 
-           после перезапуска программы.
-        
         '''
-        result = {id.id_user: {} for id in Database.session.query(Users.id_user).all()}
+        result = Database.session.query(sq.func.count(Users.id_user)).scalar()
         return result
 
 
+    @staticmethod
+    def iter_user_ids(batch_size: int=50000) -> Generator:
+        '''Функция-генератор идентификаторов всех пользователей из таблицы "users".
+
+           Идентификаторы читаются с сервера порциями по batch_size штук
+           (серверный курсор), поэтому вся таблица в память не загружается.
+
+        '''
+        with DatabaseConfig.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=batch_size).\
+                execute(sq.select(Users.id_user))
+            for (user_id,) in result:
+                yield user_id
+
+
     @logging_decorator
+    @DatabaseConfig.unit_of_work
+    @staticmethod
+    def check_user(user_id: int) -> bool:
+        '''Функция проверки наличия пользователя в таблице "users" (запрос по первичному ключу).
+
+        '''
+        result = Database.session.query(Users.id_user).\
+            filter(Users.id_user == user_id).first()
+        return result is not None
+
+
+    @logging_decorator
+    @DatabaseConfig.unit_of_work
     @staticmethod
     def get_user_info(user_id: int) -> dict:
         '''Функция выборки всей информации о пользователе из таблицы "users".
@@ -62,6 +156,7 @@ class Database:
         return {column: getattr(result, column) for column in result.__table__.c.keys()}
 
     @logging_decorator
+    @DatabaseConfig.unit_of_work
     @staticmethod
     def upload_user_info(user_info: dict):
         '''Функция записи информации о пользователе в таблицу "users".
@@ -73,6 +168,7 @@ class Database:
 
 
     @logging_decorator
+    @DatabaseConfig.unit_of_work
     @staticmethod
     def upload_relationship(user_id: int, partner_id: int, ignore: bool=False):
         '''Функция добавления отношения между существующим пользователем и 
@@ -85,32 +181,53 @@ class Database:
 
 
     @logging_decorator
+    @DatabaseConfig.unit_of_work
     @staticmethod
     def upload_partner_info(user_id: int, partner_info: dict, ignore: bool=False):
-        '''Функция записи информации о партнере в таблицы "users" и "users_partners".
+        '''Функция записи информации о партнере в таблицы "partners" и "users_partners".
         
         '''
-        partner_id = partner_info['id']
+        Database.upload_partners_info([(user_id, partner_info, ignore)])
 
-        if Database.check_prkey_in_partners(partner_id):
-            if Database.check_prkey_in_users_partners(user_id, partner_id):
-                return
-            Database.upload_relationship(user_id, partner_id, ignore=ignore)
-            return
 
-        partner_info ={
-            'id_partner': partner_id,
-            'link': f'https://vk.com/id{partner_id}',
-            'first_name': partner_info['first_name'],
-            'last_name': partner_info['last_name']
-        }
-        model = Partners(**partner_info)
-        model.users_partners = [UsersPartners(id_user=user_id, ignore=ignore)]
-        Database.session.add(model)
+    @logging_decorator
+    @DatabaseConfig.unit_of_work
+    @staticmethod
+    def upload_partners_info(reactions: list):
+        '''Функция пакетной записи реакций пользователей на партнеров в таблицы
+           "partners" и "users_partners".
+
+           reactions - список кортежей (user_id, partner_info, ignore). Записи добавляются
+           запросами INSERT ... ON CONFLICT DO NOTHING (существующие партнеры и отношения
+           не изменяются) одной транзакцией.
+        
+        '''
+        partners = {}
+        relationships = {}
+        for user_id, partner_info, ignore in reactions:
+            partner_id = partner_info['id']
+            partners[partner_id] = {
+                'id_partner': partner_id,
+                'link': f'https://vk.com/id{partner_id}',
+                'first_name': partner_info['first_name'],
+                'last_name': partner_info['last_name']
+            }
+            relationships.setdefault((user_id, partner_id), {
+                'id_user': user_id,
+                'id_partner': partner_id,
+                'ignore': ignore
+            })
+
+        Database.session.execute(insert(Partners).values(list(partners.values())).\
+            on_conflict_do_nothing(index_elements=[Partners.id_partner]))
+        Database.session.execute(insert(UsersPartners).values(list(relationships.values())).\
+            on_conflict_do_nothing(index_elements=[UsersPartners.id_user,
+                                                   UsersPartners.id_partner]))
         Database.session.commit()
 
 
     @logging_decorator
+    @DatabaseConfig.unit_of_work
     @staticmethod
     def check_ignore(user_id: int, partner_id: int) -> bool:
         '''Функция проверки наличия флага ignore в таблице "users_partners".
@@ -123,6 +240,23 @@ class Database:
 
 
     @logging_decorator
+    @DatabaseConfig.unit_of_work
+    @staticmethod
+    def get_ignored_partners(user_id: int) -> set:
+        '''Функция выборки идентификаторов всех партнеров пользователя с флагом ignore
+           из таблицы "users_partners".
+
+           Используется для фильтрации результатов поиска одним запросом вместо
+           проверки каждого партнера функцией check_ignore.
+
+        '''
+        result = Database.session.query(UsersPartners.id_partner).\
+            filter(UsersPartners.id_user == user_id, UsersPartners.ignore == True).all()
+        return {row.id_partner for row in result}
+
+
+    @logging_decorator
+    @DatabaseConfig.unit_of_work
     @staticmethod
     def check_prkey_in_partners(partner_id: int) -> bool:
         '''Функция проверки наличия записи о партнере в таблице "partners".
@@ -134,6 +268,7 @@ class Database:
 
 
     @logging_decorator
+    @DatabaseConfig.unit_of_work
     @staticmethod
     def check_prkey_in_users_partners(user_id: int, partner_id: int) -> bool:
         '''Функция проверки наличия записи о пользователе и партнере в таблице "users_partners".
@@ -146,15 +281,63 @@ class Database:
 
 
     @logging_decorator
+    @DatabaseConfig.unit_of_work
+    @staticmethod
+    def get_search_cursor(user_id: int) -> dict | None:
+        '''Функция выборки сохраненного курсора поиска пользователя из таблицы "search_cursors".
+        
+        '''
+        result = Database.session.query(SearchCursors).\
+            filter(SearchCursors.id_user == user_id).scalar()
+        if result is None:
+            return None
+        return {column: getattr(result, column) for column in result.__table__.c.keys()}
+
+
+    @logging_decorator
+    @DatabaseConfig.unit_of_work
+    @staticmethod
+    def save_search_cursor(user_id: int, cursor_info: dict):
+        '''Функция записи (обновления) курсора поиска пользователя в таблицу "search_cursors".
+        
+        '''
+        model = SearchCursors(id_user=user_id, **cursor_info)
+        Database.session.merge(model)
+        Database.session.commit()
+
+
+    @logging_decorator
+    @DatabaseConfig.unit_of_work
     @staticmethod
-    def get_favorite_partners(user_id: int) -> list:
+    def delete_search_cursor(user_id: int):
+        '''Функция удаления сохраненного курсора поиска пользователя из таблицы "search_cursors".
+        
+        '''
+        Database.session.query(SearchCursors).\
+            filter(SearchCursors.id_user == user_id).delete()
+        Database.session.commit()
+
+
+    @logging_decorator
+    @DatabaseConfig.unit_of_work
+    @staticmethod
+    def get_favorite_partners(user_id: int, after: int=None, limit: int=None) -> list:
         '''Функция выборки информации об избранных партнерах пользователя из таблицы "partners".
 
+           Партнеры упорядочены по идентификатору. Для постраничной выборки передается
+           идентификатор последнего партнера предыдущей страницы (after) и размер страницы
+           (limit): запрос читает из частичного индекса ix_users_partners_favorites
+           только строки запрошенной страницы.
+
         '''
-        result = Database.session.query(Partners).\
-            with_entities(Partners.first_name, Partners.last_name, Partners.link).\
+        query = Database.session.query(Partners).\
+            with_entities(Partners.id_partner, Partners.first_name, Partners.last_name,
+                          Partners.link).\
             join(UsersPartners.partners).\
-            filter(UsersPartners.id_user == user_id, UsersPartners.ignore == False).all()
+            filter(UsersPartners.id_user == user_id, UsersPartners.ignore == False)
+        if after is not None:
+            query = query.filter(UsersPartners.id_partner > after)
+        result = query.order_by(UsersPartners.id_partner).limit(limit).all()
         return result
 
 
@@ -167,6 +350,9 @@ class Buttons:
          PRIMARY - синяя/белая
        SECONDARY - белая/серая
 
+       Клавиатуры формируются методами build_..._keyboard, их JSON хранится
+       в реестре keyboards и выдается методами get_..._keyboard.
+
     '''
     # button (кнопки с текстом)
     start_searching_label = 'Начать поиск \U0001F495'
@@ -197,13 +383,57 @@ class Buttons:
     update = {'label': update_label,
               'color': VkKeyboardColor.SECONDARY}
 
+    favorites_prev_label = '\U000025C0 Назад'
+    favorites_prev = {'label': favorites_prev_label,
+                      'color': VkKeyboardColor.SECONDARY}
+
+    favorites_next_label = 'Еще \U000025B6'
+    favorites_next = {'label': favorites_next_label,
+                      'color': VkKeyboardColor.SECONDARY}
+
     # openlink_button (кнопки с ссылкой)
     github_link = {'label': 'Репозиторий в GitHub \U0001F40D',
                    'link': 'https://github.com/avsav1n/VKinder_cw'}
 
 
     @staticmethod
-    def get_main_navigation_keyboard() -> VkKeyboard:
+    def build_start_searching_keyboard() -> VkKeyboard:
+        '''Метод формирования кнопки начала поиска.
+
+        '''
+        keyboard = VkKeyboard(one_time=True)
+        keyboard.add_button(**Buttons.start_searching)
+        return keyboard
+
+    @staticmethod
+    def build_repeat_keyboard() -> VkKeyboard:
+        '''Метод формирования кнопки повтора поиска.
+
+        '''
+        keyboard = VkKeyboard(one_time=True)
+        keyboard.add_button(**Buttons.repeat)
+        return keyboard
+
+    @staticmethod
+    def build_update_keyboard() -> VkKeyboard:
+        '''Метод формирования кнопки поиска сначала.
+
+        '''
+        keyboard = VkKeyboard(one_time=True)
+        keyboard.add_button(**Buttons.update)
+        return keyboard
+
+    @staticmethod
+    def build_github_link_keyboard() -> VkKeyboard:
+        '''Метод формирования кнопки ссылки на репозиторий.
+
+        '''
+        keyboard = VkKeyboard(inline=True)
+        keyboard.add_openlink_button(**Buttons.github_link)
+        return keyboard
+
+    @staticmethod
+    def build_main_navigation_keyboard() -> VkKeyboard:
         '''Метод формирования основных навигационных кнопок.
         
         '''
@@ -215,7 +445,7 @@ class Buttons:
         return keyboard
 
     @staticmethod
-    def get_inline_reactions_keyboard() -> VkKeyboard:
+    def build_inline_reactions_keyboard() -> VkKeyboard:
         '''Метод формирования кнопок реакций на предлагаемых партнеров.
         
         '''
@@ -224,23 +454,123 @@ class Buttons:
         keyboard.add_button(**Buttons.like)
         return keyboard
 
+    @staticmethod
+    def build_inline_favorites_keyboard(has_prev: bool, has_next: bool) -> VkKeyboard:
+        '''Метод формирования кнопок перелистывания страниц избранных партнеров.
 
-class VkontakteAPI(vk_api.VkApi):
+           Возвращает None, если перелистывать некуда.
+
+        '''
+        if not (has_prev or has_next):
+            return None
+        keyboard = VkKeyboard(inline=True)
+        if has_prev:
+            keyboard.add_button(**Buttons.favorites_prev)
+        if has_next:
+            keyboard.add_button(**Buttons.favorites_next)
+        return keyboard
+
+    @staticmethod
+    def get_keyboard(name: str, **params) -> str:
+        '''Метод получения JSON клавиатуры из реестра keyboards.
+
+           name - имя клавиатуры (окончание имени метода build_..._keyboard).
+
+        '''
+        return keyboards.get(name, **params)
+
+    @staticmethod
+    def get_main_navigation_keyboard() -> str:
+        '''Метод получения JSON основных навигационных кнопок.
+
+        '''
+        return keyboards.get('main_navigation')
+
+    @staticmethod
+    def get_inline_reactions_keyboard() -> str:
+        '''Метод получения JSON кнопок реакций на предлагаемых партнеров.
+
+        '''
+        return keyboards.get('inline_reactions')
+
+    @staticmethod
+    def get_inline_favorites_keyboard(has_prev: bool, has_next: bool) -> str:
+        '''Метод получения JSON кнопок перелистывания страниц избранных партнеров.
+
+           Возвращает None, если перелистывать некуда.
+
+        '''
+        return keyboards.get('inline_favorites', has_prev=has_prev, has_next=has_next)
+
+
+# JSON клавиатур формируется один раз при импорте модуля
+keyboards = KeyboardRegistry()
+keyboards.register('start_searching', Buttons.build_start_searching_keyboard)
+keyboards.register('repeat', Buttons.build_repeat_keyboard)
+keyboards.register('update', Buttons.build_update_keyboard)
+keyboards.register('github_link', Buttons.build_github_link_keyboard)
+keyboards.register('main_navigation', Buttons.build_main_navigation_keyboard)
+keyboards.register('inline_reactions', Buttons.build_inline_reactions_keyboard)
+keyboards.register('inline_favorites', Buttons.build_inline_favorites_keyboard,
+                   *({'has_prev': has_prev, 'has_next': has_next}
+                     for has_prev in (False, True) for has_next in (False, True)))
+
+
+class VkontakteAPI(PooledVkApi):
     '''Класс для работы с API ВКонтакте.
 
        Для подключения к API необходимо в файл config.py ввести имеющийся токен сообщества.
+       Запросы с токеном сообщества и токеном пользователя выполняются через пулы
+       соединений и планировщики частоты запросов своих токенов.
+
+       Страницы результатов поиска "users.search" кэшируются в общем для всех
+       пользователей кэше search_cache по параметрам поиска (пол, город, возраст),
+       выбранные фотографии партнеров - в кэше photos_cache.
 
     '''
+    search_cache = create_cache('search', maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+    photos_cache = create_cache('photos', maxsize=PHOTOS_CACHE_SIZE, ttl=PHOTOS_CACHE_TTL)
+
     def __init__(self, token: str):
         '''Конструктор класса.
 
         '''
-        super().__init__(token=token)
-        self.api_user_token = vk_api.VkApi(token=VKUSER_TOKEN)
-        self.user_state = {}
+        super().__init__(token=token, rps=VK_GROUP_RPS)
+        self.api_user_token = PooledVkApi(token=VKUSER_TOKEN)
+        self.user_state = UserStateStore(max_sessions=USER_STATE_MAX_SESSIONS,
+                                         max_objects=USER_STATE_MAX_OBJECTS,
+                                         idle_timeout=USER_STATE_IDLE_TIMEOUT,
+                                         on_evict=self.save_session_cursor)
+        self.registry = UserRegistry(probe=Database.check_user,
+                                     load_ids=Database.iter_user_ids,
+                                     count=Database.count_users,
+                                     error_rate=USER_REGISTRY_ERROR_RATE)
+
+        self.prefetcher = None
+        if PREFETCH_SIZE:
+            self.prefetcher = Prefetcher(refill=self.refill_partner_cards,
+                                         evict=self.evict_partner_cards,
+                                         idle_timeout=PREFETCH_IDLE_TIMEOUT)
 
         # 1 - female, 2 - male
         self.invert_genders = {1: 2, 2: 1}
+        self.genders = GenderLookup(load=Database.get_genders,
+                                    version=Database.get_genders_version,
+                                    reload_interval=GENDERS_RELOAD_INTERVAL)
+
+
+    @staticmethod
+    def get_age(bdate: str) -> int | None:
+        '''Метод вычисления возраста по дате рождения профиля (формат 'Д.М.ГГГГ').
+
+           Возвращает None, если дата рождения или год рождения скрыты.
+
+        '''
+        if not bdate or bdate.count('.') != 2:
+            return None
+        bdate = datetime.strptime(bdate, '%d.%m.%Y')
+        today = datetime.now()
+        return today.year - bdate.year - ((today.month, today.day) < (bdate.month, bdate.day))
 
 
     @logging_decorator
@@ -252,14 +582,11 @@ class VkontakteAPI(vk_api.VkApi):
         '''
         response = self.method('users.get', {'user_ids': user_id,
                                              'fields': 'city, bdate, sex'})[0]
-        if (bdate := response.get('bdate')):
-            bdate = datetime.strptime(bdate, '%d.%m.%Y')
-            age = (datetime.now().year - bdate.year -
-               ((datetime.now().month, datetime.now().day) < (bdate.month, bdate.day)))
+        age = self.get_age(response.get('bdate'))
 
         sex = response.get('sex')
         if sex == 0: # API возвращает 0 если пол не указан
-            sex = Database.get_gender(response['first_name'])
+            sex = self.genders.get(response['first_name'])
 
         if (city := response.get('city')):
             city = city['id']
@@ -274,25 +601,101 @@ class VkontakteAPI(vk_api.VkApi):
 
 
     @logging_decorator
-    def find_all_partners(self, user_info: dict) -> Generator:
+    def find_all_partners(self, user_info: dict, resume: bool=False) -> Generator:
         '''Метод поиска партнеров.
         
-           Запрос к API осуществляется методом "users.search".
+           Запрос к API осуществляется методом "users.search" постранично, положение
+           поиска хранится в курсоре SearchCursor. При resume=True поиск продолжается
+           с сохраненного в базе данных курсора (если параметры поиска не изменились).
 
         '''
+        age_from, age_to = user_info['age'] - 5, user_info['age'] + 5
         params = {
             'sex': self.invert_genders[user_info['sex']],
             'city': user_info['id_city'],
-            'age_from': user_info['age'] - 5,
-            'age_to': user_info['age'] + 5,
+            'age_from': age_from,
+            'age_to': age_to,
             'status': 6, # в активном поиске
             'has_photo': 1,
         }
-        all_partners = VkTools(self.api_user_token).\
-                                get_all_iter('users.search',
-                                max_count=1000, values=params)
+        age_range = None
+        if SEARCH_AGE_BAND > 1:
+            # возрастное окно пользователя расширяется до границ интервалов SEARCH_AGE_BAND,
+            # точное окно применяется к результатам поиска в collect_candidates
+            age_range = (age_from, age_to)
+            params.update(age_from=age_from // SEARCH_AGE_BAND * SEARCH_AGE_BAND,
+                          age_to=-(-age_to // SEARCH_AGE_BAND) * SEARCH_AGE_BAND,
+                          fields='bdate')
         user_id = user_info['id_user']
-        self.user_state[user_id]['all_partners'] = all_partners
+
+        cursor = None
+        if resume and (cursor_info := Database.get_search_cursor(user_id)):
+            if cursor_info['params'] == params:
+                cursor = SearchCursor.from_record(cursor_info, page_size=SEARCH_PAGE_SIZE)
+        if cursor is None:
+            cursor = SearchCursor(params, page_size=SEARCH_PAGE_SIZE)
+
+        def save_cursor(cursor: SearchCursor):
+            if cursor.offset or cursor.seen:
+                Database.save_search_cursor(user_id, cursor.to_record())
+
+        all_partners = cursor.iter_items(fetch=self.search_users, on_page=save_cursor)
+        session = self.user_state.get_or_create(user_id)
+        with session.lock:
+            session.search_cursor = cursor
+            session.all_partners = all_partners
+            session.age_range = age_range
+            session.cards = deque()
+
+
+    def search_users(self, params: dict) -> dict:
+        '''Метод запроса страницы результатов поиска "users.search".
+
+           Результаты кэшируются в search_cache: пользователи с одинаковыми параметрами
+           поиска (пол, город, возрастной интервал, страница) получают страницу из кэша,
+           игнорируемые партнеры и партнеры вне точного возрастного окна каждого
+           пользователя отфильтровываются уже после получения страницы (collect_candidates).
+
+        '''
+        key = tuple(sorted(params.items()))
+        if (response := self.search_cache.get(key)) is None:
+            response = self.api_user_token.method('users.search', params)
+            self.search_cache.set(key, response)
+        return response
+
+
+    def save_search_cursor(self, user_id: int):
+        '''Метод сохранения курсора поиска пользователя в базу данных.
+
+           Подгруженные, но еще не показанные пользователю партнеры
+           не считаются просмотренными.
+
+        '''
+        if (session := self.user_state.get(user_id)) is not None:
+            self.save_session_cursor(session)
+
+
+    @staticmethod
+    def save_session_cursor(session: UserSession):
+        '''Метод сохранения курсора поиска из записи состояния пользователя.
+
+           Вызывается также при удалении записи из хранилища user_state.
+
+        '''
+        with session.lock:
+            if (cursor := session.search_cursor) is None:
+                return
+            buffered = {card['id'] for card in session.cards or ()}
+            Database.save_search_cursor(session.user_id, cursor.to_record(exclude=buffered))
+
+
+    @staticmethod
+    def select_top_photos(photos_info: list) -> list:
+        '''Метод выбора идентификаторов 3-х фотографий партнера с наибольшим количеством лайков.
+
+        '''
+        photos_info = sorted(photos_info, key=lambda x: x['likes']['count'])[-3:]
+        return [photo['id'] for photo in photos_info]
 
 
     @logging_decorator
@@ -300,48 +703,184 @@ class VkontakteAPI(vk_api.VkApi):
         '''Метод запроса и обработки фотографий партнера.
         
         '''
-        params = {
-            'owner_id': partner_id,
-            'album_id': 'profile',
-            'extended': '1'
-        }
-        photos_info = self.api_user_token.method('photos.get', params)
-        photos_info = sorted(photos_info['items'], key=lambda x: x['likes']['count'])[-3:]
-        photos_id = (photo['id'] for photo in photos_info)
+        if (photos_id := self.photos_cache.get(partner_id)) is None:
+            params = {
+                'owner_id': partner_id,
+                'album_id': 'profile',
+                'extended': '1'
+            }
+            photos_info = self.api_user_token.method('photos.get', params)
+            photos_id = self.select_top_photos(photos_info['items'])
+            self.photos_cache.set(partner_id, photos_id)
 
-        return photos_id
+        return (photo_id for photo_id in photos_id)
 
 
     @logging_decorator
-    def get_partner(self, user_id: int):
-        '''Метод обработки инфомации о следующем партнере из генератора find_all_partners.
+    def get_partners_photos(self, partners_id: list) -> dict:
+        '''Метод пакетного запроса и обработки фотографий нескольких партнеров.
+
+           Фотографии запрашиваются только для партнеров, отсутствующих в кэше photos_cache.
+           Запросы "photos.get" объединяются по 25 в один запрос к методу "execute",
+           выбор фотографий осуществляется локально. Для партнеров, фотографии которых
+           получить не удалось (например, закрытый профиль), возвращается пустой список.
 
-           Для временного хранения данных о просматриваемом партнере для последующего 
-           взаимодействия с ними, выгружает всю собранную информацию в словарь user_state.
-        
         '''
-        while True:
-            try:
-                partner_info = next(self.user_state[user_id]['all_partners'])
-            except KeyError:
-                user_info = Database.get_user_info(user_id)
-                self.find_all_partners(user_info)
-                partner_info = next(self.user_state[user_id]['all_partners'])
+        photos_id = self.photos_cache.get_many(partners_id)
+        if missing := [partner_id for partner_id in partners_id if partner_id not in photos_id]:
+            params = {
+                'album_id': 'profile',
+                'extended': '1'
+            }
+            photos_info, _ = vk_request_one_param_pool(self.api_user_token, 'photos.get',
+                                                       key='owner_id', values=missing,
+                                                       default_values=params)
+            fetched = {partner_id: self.select_top_photos(photos_info[partner_id]['items'])
+                       if partner_id in photos_info else []
+                       for partner_id in missing}
+            self.photos_cache.set_many(fetched)
+            photos_id.update(fetched)
+        return {partner_id: photos_id[partner_id] for partner_id in partners_id}
+
 
+    @logging_decorator
+    def collect_candidates(self, user_id: int, count: int=PARTNERS_BATCH_SIZE) -> list:
+        '''Метод отбора очередной партии (не более count) подходящих партнеров
+           из генератора find_all_partners.
+
+        '''
+        ignored = self.get_ignored_partners(user_id)
+        session = self.user_state.get_or_create(user_id)
+        age_range = session.age_range
+        candidates = []
+        for partner_info in session.all_partners:
             if not (partner_info['first_name'].isalpha() and
                     partner_info['last_name'].isalpha()):
                 continue
 
-            partner_id = partner_info['id']
-            if not Database.check_ignore(user_id, partner_id):
+            if partner_info['id'] in ignored:
+                continue
+
+            # возраст партнеров со скрытым годом рождения нельзя проверить
+            if age_range is not None:
+                age = self.get_age(partner_info.get('bdate'))
+                if age is None or not age_range[0] <= age <= age_range[1]:
+                    continue
+
+            candidates.append({key: value for key, value in partner_info.items()
+                               if key in ('id', 'first_name', 'last_name')})
+            if len(candidates) == count:
                 break
+        return candidates
+
+
+    def get_ignored_partners(self, user_id: int) -> set:
+        '''Метод получения множества игнорируемых пользователем партнеров.
+
+           Множество загружается из базы данных при первом обращении и хранится в записи
+           состояния пользователя, при реакции 'Дизлайк' пополняется методом add_ignored_partner.
+
+        '''
+        session = self.user_state.get_or_create(user_id)
+        if (ignored := session.ignored) is None:
+            ignored = session.ignored = Database.get_ignored_partners(user_id)
+        return ignored
+
+
+    def add_ignored_partner(self, user_id: int, partner_id: int):
+        '''Метод добавления партнера в множество игнорируемых пользователем партнеров.
+
+        '''
+        self.get_ignored_partners(user_id).add(partner_id)
+
+
+    @staticmethod
+    def build_partner_card(partner_info: dict, photos_id: list) -> dict:
+        '''Метод формирования карточки партнера, готовой к отправке пользователю.
+
+        '''
+        partner_id = partner_info['id']
+        card = dict(partner_info)
+        card['message'] = (f'{partner_info['first_name']} {partner_info['last_name']}\n'
+                           f'https://vk.com/id{partner_id}')
+        card['attachment'] = ','.join(f'photo{partner_id}_{photo_id}' for photo_id in photos_id)
+        return card
+
+
+    def get_user_lock(self, user_id: int) -> threading.RLock:
+        '''Метод получения блокировки поиска пользователя.
+
+           Исключает одновременное обращение к генератору find_all_partners
+           обработчика сообщений и фоновой подгрузки.
+
+        '''
+        return self.user_state.get_or_create(user_id).lock
+
+
+    @logging_decorator
+    def refill_partner_cards(self, user_id: int, size: int=PREFETCH_SIZE):
+        '''Метод пополнения буфера готовых карточек партнеров пользователя до size штук.
+
+           Фотографии всей партии запрашиваются одним запросом (get_partners_photos).
+
+        '''
+        session = self.user_state.get_or_create(user_id)
+        with session.lock:
+            if session.all_partners is None:
+                user_info = Database.get_user_info(user_id)
+                self.find_all_partners(user_info, resume=True)
+
+            cards = session.cards
+            if len(cards) >= size:
+                return
+            partners_info = self.collect_candidates(user_id, max(size - len(cards),
+                                                                 PARTNERS_BATCH_SIZE))
+            photos_id = self.get_partners_photos([partner['id'] for partner in partners_info])
+            for partner_info in partners_info:
+                cards.append(self.build_partner_card(partner_info, photos_id[partner_info['id']]))
+
+
+    def evict_partner_cards(self, user_id: int):
+        '''Метод очистки буфера карточек и результатов поиска неактивного пользователя.
+
+        '''
+        if (session := self.user_state.get(user_id)) is None:
+            return
+        with session.lock:
+            self.save_session_cursor(session)
+            session.clear_search()
 
-        photos_id = self.get_partner_photos(partner_id)
 
-        partner_info = {key: value for key, value in partner_info.items()
-                        if key in ('id', 'first_name', 'last_name')}
-        partner_info['photos_id'] = photos_id
-        self.user_state[user_id]['current_partner'] = partner_info
+    @logging_decorator
+    def get_partner(self, user_id: int) -> bool:
+        '''Метод получения карточки следующего партнера из буфера пользователя.
+
+           При пустом буфере пополняет его синхронно, при включенной фоновой подгрузке
+           (PREFETCH_SIZE > 0) - поддерживает в буфере готовые карточки заранее.
+           Для временного хранения данных о просматриваемом партнере для последующего
+           взаимодействия с ними, выгружает всю собранную информацию в запись состояния
+           пользователя (current_partner).
+           Если подходящих партнеров больше нет, удаляет результаты поиска
+           и сохраненный курсор (следующий поиск начнется сначала) и возвращает False.
+        
+        '''
+        session = self.user_state.get_or_create(user_id)
+        with session.lock:
+            if not session.cards:
+                self.refill_partner_cards(user_id, size=1)
+            cards = session.cards
+            if not cards:
+                session.current_partner = None
+                session.clear_search()
+                Database.delete_search_cursor(user_id)
+                return False
+            session.current_partner = cards.popleft()
+
+        if self.prefetcher is not None:
+            self.prefetcher.touch(user_id)
+            if len(cards) <= PREFETCH_SIZE // 2:
+                self.prefetcher.schedule(user_id)
+        return True
 
 
 class VkontakteBot(VkontakteAPI):
@@ -355,37 +894,173 @@ class VkontakteBot(VkontakteAPI):
 
         '''
         super().__init__(token=token)
+        self.dispatcher = None
+        self.exporter = None
+
+        self.reactions_buffer = None
+        if REACTIONS_FLUSH_INTERVAL:
+            self.reactions_buffer = WriteBehindBuffer(Database.upload_partners_info,
+                                                      interval=REACTIONS_FLUSH_INTERVAL)
+
+        self.outbox = None
+        if OUTBOX_ENABLED:
+            self.outbox = MessageOutbox(self, max_attempts=OUTBOX_MAX_ATTEMPTS,
+                                        backoff_base=OUTBOX_BACKOFF_BASE,
+                                        backoff_max=OUTBOX_BACKOFF_MAX)
 
 
     def __call__(self):
-        '''Метод активации опроса серверов ВКонтакте на наличие новых сообщений.
+        '''Метод активации опроса серверов ВКонтакте на наличие новых сообщений
+           (при CALLBACK_PORT > 0 - приема уведомлений Callback API).
 
-        '''
-        longpoll = VkLongPoll(self)
+           При BOT_WORKERS > 0 события обрабатываются конкурентно пулом потоков
+           (с сохранением порядка событий каждого пользователя), иначе - последовательно.
 
-        self.user_state.update(Database.get_users())
+        '''
+        source = create_event_source(self.create_longpoll)
+        self.start()
 
         print('Bot is running...')
         logging.warning('Бот Vk-сообщества запущен')
 
-        for event in longpoll.listen():
-            if event.type == VkEventType.MESSAGE_NEW and event.to_me:
-                if event.text == 'Стоп':
-                    print('Bot stopped from chat.')
-                    logging.warning('Бот Vk-сообщества остановлен из чата\n')
-                    break
+        with closing(source.listen()) as events:
+            for event in events:
+                if event.type == VkEventType.MESSAGE_NEW and event.to_me:
+                    if event.text == 'Стоп':
+                        print('Bot stopped from chat.')
+                        logging.warning('Бот Vk-сообщества остановлен из чата\n')
+                        break
+                    self.dispatch(event)
+
+        self.shutdown()
+
+
+    def start(self, shard: int=None):
+        '''Метод запуска фоновых служб бота: пула потоков-обработчиков, построения
+           фильтра зарегистрированных пользователей, загрузки и проверки версии
+           таблицы имен и выгрузки метрик.
+
+           shard - номер процесса-обработчика (ShardedBot), метрики процесса
+           выгружаются в отдельный файл.
+
+        '''
+        if BOT_WORKERS:
+            self.dispatcher = EventDispatcher(self.start_handling, workers=BOT_WORKERS,
+                                              label=self.get_event_label)
+        self.registry.start()
+        self.genders.start()
+        self.exporter = start_exporter(suffix='' if shard is None else f'.{shard}')
+
+
+    def dispatch(self, event: Event):
+        '''Метод передачи события обработчику (в пул потоков при BOT_WORKERS > 0).
+
+        '''
+        if self.dispatcher is None:
+            try:
                 self.start_handling(event)
+            except Exception:
+                # ошибка обработки одного события не останавливает бота
+                logging.exception('Ошибка обработки события пользователя %s', event.user_id)
+        else:
+            self.dispatcher.submit(event)
+
+
+    def shutdown(self):
+        '''Метод остановки бота: обработки полученных событий, сохранения состояний
+           пользователей, записи реакций и статистики.
+
+        '''
+        if self.dispatcher is not None:
+            self.dispatcher.shutdown()
+            logging.warning('Статистика обработчиков: %s', self.dispatcher.get_stats())
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+            logging.warning('Статистика фоновой подгрузки: %s', self.prefetcher.stats)
+        self.genders.stop()
+
+        for user_id in list(self.user_state):
+            self.save_search_cursor(user_id)
+        if self.reactions_buffer is not None:
+            self.reactions_buffer.close()
+            logging.warning('Статистика записи реакций: %s', self.reactions_buffer.stats)
+        if self.outbox is not None:
+            self.outbox.close()
+            logging.warning('Статистика отправки сообщений: %s', self.outbox.get_stats())
+        logging.warning('Статистика ожидания запросов к API: сообщество %s, пользователь %s',
+                        self.scheduler.get_stats(), self.api_user_token.scheduler.get_stats())
+        logging.warning('Статистика кэшей: поиск %s, фотографии %s',
+                        self.search_cache.get_stats(), self.photos_cache.get_stats())
+        logging.warning('Статистика состояний пользователей: %s, проверки регистрации: %s',
+                        self.user_state.get_stats(), self.registry.stats)
+        if self.exporter is not None:
+            self.exporter.stop()
+            logging.warning('Метрики записаны в файл %s', self.exporter.path)
+
+        Database.session.remove()
+
+
+    def release_users(self, keep: Callable) -> int:
+        '''Метод передачи пользователей другому процессу-обработчику (ShardedBot).
+
+           Дожидается обработки полученных событий, записывает отложенные реакции,
+           сохраняет курсоры поиска и удаляет состояния пользователей, для которых
+           keep(user_id) ложно. Фильтр зарегистрированных пользователей перестраивается,
+           так как часть пользователей могла быть зарегистрирована другими процессами.
+           Возвращает количество переданных пользователей.
 
-        Database.session.close()
+        '''
+        if self.dispatcher is not None:
+            self.dispatcher.wait_idle()
+        if self.reactions_buffer is not None:
+            self.reactions_buffer.flush()
+
+        released = 0
+        for user_id in list(self.user_state):
+            if keep(user_id) or (session := self.user_state.get(user_id)) is None:
+                continue
+            with session.lock:
+                self.save_session_cursor(session)
+                self.user_state.discard(user_id)
+            released += 1
+        self.registry.start()
+        return released
+
+
+    def set_rate_share(self, share: float):
+        '''Метод установки доли ограничений частоты запросов к API,
+           доступной боту (ограничения делятся между процессами-обработчиками).
+
+        '''
+        self.scheduler.set_rate(VK_GROUP_RPS * share)
+        self.api_user_token.scheduler.set_rate(VK_USER_RPS * share)
+
+
+    def create_longpoll(self) -> ResilientLongPoll:
+        '''Метод подключения к Long Poll серверу сообщества (с переподключением
+           после сбоев и продолжением получения событий с последнего полученного).
+
+        '''
+        return ResilientLongPoll(self, wait=LONGPOLL_WAIT, backoff_base=LONGPOLL_BACKOFF_BASE,
+                                 backoff_max=LONGPOLL_BACKOFF_MAX,
+                                 refresh_after=LONGPOLL_REFRESH_AFTER)
 
 
     def send_message(self, user_id: int, message: str,
-                     keyboard: VkKeyboard=None, attachment: str=None):
+                     keyboard: VkKeyboard | str=None, attachment: str=None):
         '''Метод отправки сообщений в чат пользователю.
 
+           keyboard - клавиатура или ее JSON (Buttons.get_keyboard).
+
+           При OUTBOX_ENABLED сообщение ставится в очередь исходящих сообщений outbox
+           и отправляется фоновым потоком.
+
         '''
-        if keyboard is not None:
+        if isinstance(keyboard, VkKeyboard):
             keyboard = keyboard.get_keyboard()
+        if self.outbox is not None:
+            self.outbox.send(user_id, message, keyboard=keyboard, attachment=attachment)
+            return
         self.method('messages.send', {'user_id': user_id,
                                       'message': message, 
                                       'keyboard': keyboard,
@@ -393,26 +1068,66 @@ class VkontakteBot(VkontakteAPI):
                                       'random_id': randrange(10 ** 7)})
 
 
-    def show_favorite_partners(self, user_id: int):
-        '''Функция-обработчик сообщения 'Показать понравившихся'.
+    def save_reaction(self, user_id: int, partner_info: dict, ignore: bool=False):
+        '''Метод записи реакции пользователя на партнера в базу данных.
 
-           Выводит пользователю всех понравившихся ранее ему партнеров.
+           При REACTIONS_FLUSH_INTERVAL > 0 реакции записываются пакетами
+           через буфер отложенной записи reactions_buffer.
+
+        '''
+        if self.reactions_buffer is None:
+            Database.upload_partner_info(user_id, partner_info, ignore)
+        else:
+            self.reactions_buffer.add((user_id, partner_info, ignore))
+
+
+    def show_favorite_partners(self, user_id: int, step: int=0):
+        '''Функция-обработчик сообщений 'Показать понравившихся', 'Назад', 'Еще'.
+
+           Выводит пользователю понравившихся ранее ему партнеров одним сообщением
+           по FAVORITES_PAGE_SIZE партнеров на странице с кнопками перелистывания.
+           step: 0 - первая страница, 1 - следующая, -1 - предыдущая.
+           Положение в списке хранится в записи состояния пользователя (favorites_pages):
+           идентификаторы последних партнеров предыдущих страниц и текущей страницы.
         
         '''
-        favorite_partners = Database.get_favorite_partners(user_id)
+        if self.reactions_buffer is not None:
+            self.reactions_buffer.flush()
+
+        session = self.user_state.get_or_create(user_id)
+        with session.lock:
+            pages = session.favorites_pages
+            if step == 0 or pages is None:
+                pages = [None, None]
+            elif step > 0 and pages[-1] is not None:
+                pages = pages + [None]
+            elif step < 0 and len(pages) > 2:
+                pages = pages[:-1]
+            after = pages[-2]
+
+            favorite_partners = Database.get_favorite_partners(user_id, after=after,
+                                                               limit=FAVORITES_PAGE_SIZE + 1)
+            if not favorite_partners and after is not None:
+                session.favorites_pages = None
+                self.show_favorite_partners(user_id)
+                return
+            has_next = len(favorite_partners) > FAVORITES_PAGE_SIZE
+            favorite_partners = favorite_partners[:FAVORITES_PAGE_SIZE]
+            pages[-1] = favorite_partners[-1].id_partner if has_next else None
+            session.favorites_pages = pages
+
         if not favorite_partners:
             self.show_if_favorite_partners_empty(user_id)
             return
 
-        message = 'Вам понравились следующие люди \U0001F60A'
-
-        keyboard = Buttons.get_main_navigation_keyboard()
+        first = (len(pages) - 2) * FAVORITES_PAGE_SIZE + 1
+        lines = [f'{number}. {partner.first_name} {partner.last_name}\n{partner.link}'
+                 for number, partner in enumerate(favorite_partners, first)]
+        message = '\n'.join(['Вам понравились следующие люди \U0001F60A', *lines])
+        keyboard = Buttons.get_inline_favorites_keyboard(has_prev=after is not None,
+                                                         has_next=has_next)
         self.send_message(user_id, message=message, keyboard=keyboard)
 
-        for partner in favorite_partners:
-            message = f'{partner.first_name} {partner.last_name}\n{partner.link}'
-            self.send_message(user_id, message=message, keyboard=keyboard)
-
 
     def show_if_favorite_partners_empty(self, user_id: int):
         '''Метод отправки в чат пользователю предупреждения, что его список 
@@ -434,8 +1149,7 @@ class VkontakteBot(VkontakteAPI):
                    'в Вашем профиле недостаточно \U0000274C данных для осуществления '
                    'корретного поиска партнера. Пожалуйста, укажите минимально необходимую '
                    'информацию (пол, город, дату рождения) и повторите попытку! \U0001F575')
-        keyboard = VkKeyboard(one_time=True)
-        keyboard.add_button(**Buttons.repeat)
+        keyboard = Buttons.get_keyboard('repeat')
         self.send_message(user_id, message=message, keyboard=keyboard)
 
 
@@ -445,13 +1159,35 @@ class VkontakteBot(VkontakteAPI):
         '''
         message = ('Доброго времени суток! \U0001F44B\n'
                    'Я - бот \U0001F916 сообщества поиска своей второй половины \U0001F48F')
-        keyboard = VkKeyboard(inline=True)
-        keyboard.add_openlink_button(**Buttons.github_link)
+        keyboard = Buttons.get_keyboard('github_link')
         self.send_message(user_id, message=message, keyboard=keyboard)
 
         self.greeting_handling(user_id)
 
 
+    def show_partners_exhausted(self, user_id: int):
+        '''Метод отправки в чат пользователю предупреждения, что подходящие
+           партнеры закончились.
+
+        '''
+        message = ('К сожалению, партнеры закончились \U0001F614\n'
+                   'Вы просмотрели всех подходящих людей, '
+                   'можно начать поиск сначала \U0001F504')
+        keyboard = Buttons.get_keyboard('update')
+        self.send_message(user_id, message=message, keyboard=keyboard)
+
+
+    def show_reaction_not_saved(self, user_id: int):
+        '''Метод отправки в чат пользователю предупреждения, что реакцию не удалось
+           отнести к партнеру (карточка партнера, на которую отвечает пользователь,
+           не найдена).
+
+        '''
+        message = ('Не удалось определить, к кому относится Ваша реакция \U0001F914\n'
+                   'Пожалуйста, оцените следующую анкету')
+        self.send_message(user_id, message=message)
+
+
     def reaction_like_handling(self, user_id: int):
         '''Функция-обработчик реакции 'Лайк' пользователя на отображаемого партнера.
 
@@ -459,7 +1195,10 @@ class VkontakteBot(VkontakteAPI):
            флагом ignore=False. Фактически осуществляется добавления партнера в избранное.
         
         '''
-        Database.upload_partner_info(user_id, self.user_state[user_id]['current_partner'])
+        if (partner_info := self.user_state.get_or_create(user_id).current_partner) is None:
+            self.show_reaction_not_saved(user_id)
+        else:
+            self.save_reaction(user_id, partner_info)
         self.show_found_people(user_id)
 
 
@@ -471,7 +1210,11 @@ class VkontakteBot(VkontakteAPI):
            при поиске.
         
         '''
-        Database.upload_partner_info(user_id, self.user_state[user_id]['current_partner'], True)
+        if (partner_info := self.user_state.get_or_create(user_id).current_partner) is None:
+            self.show_reaction_not_saved(user_id)
+        else:
+            self.save_reaction(user_id, partner_info, True)
+            self.add_ignored_partner(user_id, partner_info['id'])
         self.show_found_people(user_id)
 
 
@@ -481,21 +1224,23 @@ class VkontakteBot(VkontakteAPI):
            Обрабатывает информацию о пользователе и формирует интерфейс взаимодействия.
         
         '''
-        if user_id not in self.user_state:
-            user_info = super().get_user_info(user_id)
-            if not all(user_info.values()):
-                self.show_not_enought_profile_info(user_id)
-                return
-            Database.upload_user_info(user_info)
-            self.user_state[user_id] = {}
+        session = self.user_state.get_or_create(user_id)
+        if not session.registered:
+            if not self.registry.check(user_id):
+                user_info = super().get_user_info(user_id)
+                if not all(user_info.values()):
+                    self.show_not_enought_profile_info(user_id)
+                    return
+                Database.upload_user_info(user_info)
+                self.registry.add(user_id)
+            session.registered = True
 
         message = ('Для того, чтобы начать поиск нажмите на кнопочку ниже \U0001F447'
                    'Поиск будет осуществлен по таким параметрам как\n'
                    'пол (куда же без него?), город и возраст \U0001F50E.\n'
                    'Для чистоты поиска, пожалуйста, убедитесь что в Вашем профиле ' 
                    'указаны данные параметры \U0001F64F\nНачнем же? \U0001F942')
-        keyboard = VkKeyboard(one_time=True)
-        keyboard.add_button(**Buttons.start_searching)
+        keyboard = Buttons.get_keyboard('start_searching')
         self.send_message(user_id, message=message, keyboard=keyboard)
 
 
@@ -506,20 +1251,14 @@ class VkontakteBot(VkontakteAPI):
            при условии что ранее выполнен поиск всех подходящих партнеров find_all_partners.
 
         '''
-        super().get_partner(user_id)
-
-        partner_id = self.user_state[user_id]['current_partner']['id']
-        message = (f'{self.user_state[user_id]['current_partner']['first_name']} '
-                   f'{self.user_state[user_id]['current_partner']['last_name']}\n'
-                   f'https://vk.com/id{partner_id}')
+        if not super().get_partner(user_id):
+            self.show_partners_exhausted(user_id)
+            return
 
+        partner_card = self.user_state.get_or_create(user_id).current_partner
         keyboard = Buttons.get_inline_reactions_keyboard()
-
-        attachment = ''
-        for photo_id in self.user_state[user_id]['current_partner']['photos_id']:
-            attachment += f'photo{partner_id}_{photo_id},'
-
-        self.send_message(user_id, message=message, keyboard=keyboard, attachment=attachment)
+        self.send_message(user_id, message=partner_card['message'], keyboard=keyboard,
+                          attachment=partner_card['attachment'])
 
 
     def start_searching_handling(self, user_id: int):
@@ -539,47 +1278,126 @@ class VkontakteBot(VkontakteAPI):
         self.show_found_people(user_id)
 
 
+    @staticmethod
+    def get_event_label(event: Event) -> str:
+        '''Метод получения названия команды события для статистики обработчиков.
+
+        '''
+        commands = ('Начать', Buttons.start_searching_label, Buttons.update_label,
+                    Buttons.repeat_label, Buttons.next_partner_label, Buttons.like_label,
+                    Buttons.dislike_label, Buttons.favorites_label,
+                    Buttons.favorites_prev_label, Buttons.favorites_next_label)
+        return event.text if event.text in commands else 'unknown'
+
+
     def start_handling(self, event: Event):
         '''Основная функция-обработчик сообщений пользователя.
         
         '''
         user_id = event.user_id
-        match event.text:
-            case 'Начать':
-                self.show_greeting(user_id)
+        with track_event(self.get_event_label(event)):
+            match event.text:
+                case 'Начать':
+                    self.show_greeting(user_id)
 
-            case Buttons.start_searching_label:
-                logging.info('Получена команда %s', Buttons.start_searching_label)
-                self.start_searching_handling(user_id)
+                case Buttons.start_searching_label:
+                    logging.info('Получена команда %s', Buttons.start_searching_label)
+                    self.start_searching_handling(user_id)
 
-            case Buttons.update_label:
-                logging.info('Получена команда %s', Buttons.update_label)
-                self.start_searching_handling(user_id)
+                case Buttons.update_label:
+                    logging.info('Получена команда %s', Buttons.update_label)
+                    self.start_searching_handling(user_id)
 
-            case Buttons.repeat_label:
-                logging.info('Получена команда %s', Buttons.repeat_label)
-                self.greeting_handling(user_id)
+                case Buttons.repeat_label:
+                    logging.info('Получена команда %s', Buttons.repeat_label)
+                    self.greeting_handling(user_id)
 
-            case Buttons.next_partner_label:
-                logging.info('Получена команда %s', Buttons.next_partner_label)
-                self.show_found_people(user_id)
+                case Buttons.next_partner_label:
+                    logging.info('Получена команда %s', Buttons.next_partner_label)
+                    self.show_found_people(user_id)
 
-            case Buttons.like_label:
-                logging.info('Получена команда %s', Buttons.like_label)
-                self.reaction_like_handling(user_id)
+                case Buttons.like_label:
+                    logging.info('Получена команда %s', Buttons.like_label)
+                    self.reaction_like_handling(user_id)
 
-            case Buttons.dislike_label:
-                logging.info('Получена команда %s', Buttons.dislike_label)
-                self.reaction_dislike_handling(user_id)
+                case Buttons.dislike_label:
+                    logging.info('Получена команда %s', Buttons.dislike_label)
+                    self.reaction_dislike_handling(user_id)
 
-            case Buttons.favorites_label:
-                logging.info('Получена команда %s', Buttons.favorites_label)
-                self.show_favorite_partners(user_id)
+                case Buttons.favorites_label:
+                    logging.info('Получена команда %s', Buttons.favorites_label)
+                    self.show_favorite_partners(user_id)
+
+                case Buttons.favorites_prev_label:
+                    logging.info('Получена команда %s', Buttons.favorites_prev_label)
+                    self.show_favorite_partners(user_id, step=-1)
 
-            case _:
-                self.send_message(user_id, 'Такой команды не знаю! \U0001F937')
+                case Buttons.favorites_next_label:
+                    logging.info('Получена команда %s', Buttons.favorites_next_label)
+                    self.show_favorite_partners(user_id, step=1)
+
+                case _:
+                    self.send_message(user_id, 'Такой команды не знаю! \U0001F937')
+
+
+class ShardedBot:
+    '''Класс запуска бота в нескольких процессах.
+
+       Процесс ShardedBot получает события от Long Poll сервера и распределяет их
+       по BOT_PROCESSES процессам-обработчикам по идентификатору пользователя
+       (extrapacks.sharding), каждый процесс-обработчик работает со своим экземпляром
+       бота, созданным функцией factory. Команда 'Стоп' останавливает все процессы.
+
+    '''
+    def __init__(self, processes: int=BOT_PROCESSES, token: str=VKGROUP_TOKEN,
+                 factory: Callable=VkontakteBot):
+        '''Конструктор класса.
+
+        '''
+        self.api = PooledVkApi(token=token, rps=VK_GROUP_RPS)
+        self.router = ShardRouter(factory, processes)
+
+
+    def create_longpoll(self) -> ResilientLongPoll:
+        '''Метод подключения к Long Poll серверу сообщества (с переподключением
+           после сбоев и продолжением получения событий с последнего полученного).
+
+        '''
+        return ResilientLongPoll(self.api, wait=LONGPOLL_WAIT, backoff_base=LONGPOLL_BACKOFF_BASE,
+                                 backoff_max=LONGPOLL_BACKOFF_MAX,
+                                 refresh_after=LONGPOLL_REFRESH_AFTER)
+
+
+    def __call__(self):
+        '''Метод запуска процессов-обработчиков и опроса серверов ВКонтакте
+           (при CALLBACK_PORT > 0 - приема уведомлений Callback API).
+
+        '''
+        source = create_event_source(self.create_longpoll)
+        self.router.start()
+
+        print(f'Bot is running ({self.router.shards} processes)...')
+        logging.warning('Бот Vk-сообщества запущен, процессов-обработчиков: %s',
+                        self.router.shards)
+        try:
+            with closing(source.listen()) as events:
+                for event in events:
+                    if event.type == VkEventType.MESSAGE_NEW and event.to_me:
+                        if event.text == 'Стоп':
+                            print('Bot stopped from chat.')
+                            logging.warning('Бот Vk-сообщества остановлен из чата\n')
+                            break
+                        self.router.submit(event)
+        finally:
+            self.router.shutdown()
+            logging.warning('Статистика процессов-обработчиков: %s', self.router.stats)
+
+
+# сбор метрик времени выполнения методов и запросов к базе данных (при METRICS_ENABLED)
+instrument(Database, VkontakteAPI)
+instrument_engine(DatabaseConfig.engine)
 
 
 if __name__ == '__main__':
-    api_group_token = VkontakteBot()
+    api_group_token = ShardedBot() if BOT_PROCESSES else VkontakteBot()
     api_group_token()
@@ -2,20 +2,62 @@
 Модуль описания моделей таблиц базы данных.
 
 '''
+from collections.abc import Generator, Iterable
+import functools
+import itertools
+import logging
+import threading
+import time
+
 import sqlalchemy as sq
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker, scoped_session
 
-from extrapacks.config import DB_DRIVER, DB_LOGIN, DB_PASSWORD, DB_CONNECTION, DB_PORT, DB_NAME
+from extrapacks.config import (DB_DRIVER, DB_LOGIN, DB_PASSWORD, DB_CONNECTION, DB_PORT, DB_NAME,
+                               DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE)
 
 
 class DatabaseConfig:
     '''Класс подготовки базы данных к работе.
 
+       ScopedSession - потокобезопасный реестр сессий: каждый поток работает
+       со своей сессией, которая закрывается по окончании единицы работы (unit_of_work).
+
     '''
     Base = declarative_base()
     DSN = f'{DB_DRIVER}://{DB_LOGIN}:{DB_PASSWORD}@{DB_CONNECTION}:{DB_PORT}/{DB_NAME}'
-    engine = sq.create_engine(DSN)
+    engine = sq.create_engine(DSN,
+                              pool_size=DB_POOL_SIZE,
+                              max_overflow=DB_MAX_OVERFLOW,
+                              pool_pre_ping=True,
+                              pool_recycle=DB_POOL_RECYCLE)
     Session = sessionmaker(engine)
+    ScopedSession = scoped_session(Session)
+    _local = threading.local()
+
+    @classmethod
+    def unit_of_work(cls, old_func):
+        '''Декоратор выполнения функции в рамках единицы работы с сессией потока.
+
+           При ошибке откатывает транзакцию, по окончании внешнего вызова закрывает
+           сессию потока (возвращает соединение в пул и очищает identity map).
+           Вложенные вызовы используют сессию внешнего вызова.
+
+        '''
+        @functools.wraps(old_func)
+        def new_func(*args, **kwargs):
+            depth = getattr(cls._local, 'depth', 0)
+            cls._local.depth = depth + 1
+            try:
+                return old_func(*args, **kwargs)
+            except Exception:
+                cls.ScopedSession.rollback()
+                raise
+            finally:
+                cls._local.depth = depth
+                if not depth:
+                    cls.ScopedSession.remove()
+        return new_func
 
     @classmethod
     def create_table(cls):
@@ -23,6 +65,10 @@ class DatabaseConfig:
 
         '''
         cls.Base.metadata.create_all(cls.engine)
+        # индексы, добавленные в модели после создания таблиц
+        for table in cls.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(cls.engine, checkfirst=True)
 
     @classmethod
     def delete_table(cls):
@@ -32,19 +78,60 @@ class DatabaseConfig:
         cls.Base.metadata.drop_all(cls.engine)
 
     @classmethod
-    def filling_out_gender(cls):
+    def bulk_upsert(cls, model, rows: Iterable[dict], batch_size: int=5000) -> int:
+        '''Функция пакетной загрузки справочных данных в таблицу модели model.
+
+           Записи передаются многострочными запросами INSERT ... ON CONFLICT DO UPDATE
+           по batch_size записей, поэтому загрузку можно безопасно повторять:
+           существующие записи обновляются, дубликаты в данных не вызывают ошибок.
+           Строки читаются из rows по мере загрузки (rows может быть генератором).
+           Возвращает количество загруженных записей.
+
+        '''
+        keys = [column.name for column in model.__table__.primary_key]
+        statement = insert(model)
+        update = {column.name: statement.excluded[column.name]
+                  for column in model.__table__.c if column.name not in keys}
+        statement = statement.on_conflict_do_update(index_elements=keys, set_=update)
+
+        count = 0
+        start = time.perf_counter()
+        with cls.Session() as session:
+            for batch in itertools.batched(rows, batch_size):
+                # повторная запись ключа в одном запросе ON CONFLICT DO UPDATE недопустима
+                batch = {tuple(row[key] for key in keys): row for row in batch}
+                session.execute(statement, list(batch.values()))
+                session.commit()
+                count += len(batch)
+
+        elapsed = time.perf_counter() - start
+        logging.info('Загружено %s записей в таблицу "%s" за %.3f с (%.0f записей/с)',
+                     count, model.__tablename__, elapsed, count / elapsed if elapsed else 0)
+        return count
+
+    @staticmethod
+    def read_genders(path: str) -> Generator:
+        '''Функция-генератор записей таблицы "genders" из файла формата "имя-пол".
+
+           Имена нормализуются так же, как при выборке пола по имени.
+
+        '''
+        with open(path, encoding='utf-8') as fr:
+            for line in fr:
+                if not (line := line.strip()):
+                    continue
+                name, sex = line.rsplit('-', 1)
+                yield {'name': name.capitalize().replace('ё', 'е'), 'sex': int(sex)}
+
+    @classmethod
+    def filling_out_gender(cls, path: str='data/names.txt') -> int:
         '''Функция заполнения таблицы "gender".
 
-           Заполнение осуществляется из файла data/names.txt.
+           Заполнение осуществляется из файла data/names.txt, повторное
+           заполнение обновляет существующие записи.
         
         '''
-        with cls.Session() as session:
-            with open('data/names.txt', encoding='utf-8') as fr:
-                for line in fr:
-                    name, sex = line.rstrip().split('-')
-                    model = Genders(name=name, sex=sex)
-                    session.add(model)
-            session.commit()
+        return cls.bulk_upsert(Genders, cls.read_genders(path))
 
 
 class Users(DatabaseConfig.Base):
@@ -62,6 +149,7 @@ class Users(DatabaseConfig.Base):
     sex = sq.Column(sq.SmallInteger, sq.CheckConstraint("sex = 1 or sex = 2", name='check_sex'))
 
     users_partners = relationship('UsersPartners', back_populates='users', cascade='all, delete-orphan')
+    search_cursors = relationship('SearchCursors', back_populates='users', cascade='all, delete-orphan')
 
 
 class Partners(DatabaseConfig.Base):
@@ -85,6 +173,8 @@ class UsersPartners(DatabaseConfig.Base):
     '''Модель таблицы "users_partners".
        
        Связующая таблица между "users" и "partners".
+       Частичный индекс ix_users_partners_favorites содержит только избранных партнеров
+       (ignore = False) и используется для постраничной выборки избранного.
 
     '''
     __tablename__ = 'users_partners'
@@ -93,11 +183,31 @@ class UsersPartners(DatabaseConfig.Base):
     id_partner = sq.Column(sq.BigInteger, sq.ForeignKey(Partners.id_partner))
     ignore = sq.Column(sq.Boolean, default=False)
     sq.PrimaryKeyConstraint(id_user, id_partner)
+    sq.Index('ix_users_partners_favorites', id_user, id_partner,
+             postgresql_where=(ignore == False))
 
     partners = relationship('Partners', back_populates='users_partners')
     users = relationship('Users', back_populates='users_partners')
 
 
+class SearchCursors(DatabaseConfig.Base):
+    '''Модель таблицы "search_cursors".
+
+       Хранит состояние поиска партнеров пользователя: параметры запроса "users.search",
+       смещение текущей страницы и упакованные идентификаторы просмотренных профилей.
+       По принципу один к одному связана с таблицей "users".
+
+    '''
+    __tablename__ = 'search_cursors'
+
+    id_user = sq.Column(sq.BigInteger, sq.ForeignKey(Users.id_user), primary_key=True)
+    params = sq.Column(sq.JSON, nullable=False)
+    offset = sq.Column(sq.Integer, nullable=False, default=0)
+    seen = sq.Column(sq.LargeBinary, nullable=False, default=b'')
+
+    users = relationship('Users', back_populates='search_cursors')
+
+
 class Genders(DatabaseConfig.Base):
     '''Модель таблицы "genders".
     
@@ -0,0 +1,422 @@
+'''
+Модуль локального HTTP-сервера, имитирующего API ВКонтакте.
+
+Используется в тестах и бенчмарках вместо https://api.vk.com.
+Кроме методов API сервер имитирует Long Poll сервер сообщества (адрес
+https://api.vk.com/longpoll): входящие сообщения пользователей добавляются
+методом push_message, ответы бота пользователю ожидаются методом wait_replies,
+сбои Long Poll сервера имитируются методом inject_longpoll_faults.
+
+'''
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+import json
+import re
+import threading
+import time
+import zlib
+
+from requests.adapters import HTTPAdapter
+
+from extrapacks.outbox import MERGE_SEPARATOR
+
+
+class RedirectAdapter(HTTPAdapter):
+    '''Транспортный адаптер requests, перенаправляющий запросы к API на локальный сервер.
+
+    '''
+    def __init__(self, base_url: str, **kwargs):
+        '''Конструктор класса.
+
+        '''
+        self.base_url = base_url
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        '''Метод отправки запроса с подменой адреса сервера.
+
+        '''
+        request.url = request.url.replace('https://api.vk.com', self.base_url, 1)
+        return super().send(request, **kwargs)
+
+
+class FakeVkHandler(BaseHTTPRequestHandler):
+    '''Обработчик HTTP-запросов к локальному серверу API.
+
+    '''
+    protocol_version = 'HTTP/1.1'
+    wbufsize = 65536
+
+    def do_POST(self):
+        '''Метод обработки POST-запроса к методу API.
+
+        '''
+        length = int(self.headers.get('Content-Length', 0))
+        values = dict(parse_qsl(self.rfile.read(length).decode('utf-8')))
+        method = urlsplit(self.path).path.rsplit('/', 1)[-1]
+        self.send_json(self.server.fake.call(method, values))
+
+    def do_GET(self):
+        '''Метод обработки GET-запроса к Long Poll серверу.
+
+        '''
+        url = urlsplit(self.path)
+        values = dict(parse_qsl(url.query))
+        if url.path.rstrip('/') != '/longpoll' or values.get('act') != 'a_check':
+            self.send_error(404)
+            return
+        match self.server.fake.longpoll_check(values):
+            case None:
+                # обрыв соединения без ответа
+                self.close_connection = True
+            case int(status):
+                self.send_error(status)
+            case response:
+                self.send_json(response)
+
+    def send_json(self, data: dict):
+        '''Метод отправки ответа в формате JSON.
+
+        '''
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        '''Метод отключения вывода журнала запросов в консоль.
+
+        '''
+
+
+class FakeVkServer:
+    '''Класс локального сервера API ВКонтакте.
+
+       Реализует методы users.get, users.search, photos.get, messages.send,
+       messages.getLongPollServer, execute (пакеты запросов vk_request_one_param_pool
+       и extrapacks.outbox.build_execute_code) и Long Poll сервер. Ответы детерминированы: профиль пользователя и результаты
+       поиска вычисляются по идентификатору и параметрам запроса.
+       Позволяет задать задержку ответа (latency) и подсчитывает количество вызовов
+       каждого метода и максимальное количество одновременно обрабатываемых запросов.
+       Ошибки вызовов методов имитируются методом inject_errors.
+
+    '''
+    # количество результатов поиска для одного набора параметров
+    search_total = 1000
+    # начало диапазона идентификаторов найденных партнеров
+    search_id_start = 1500000000
+    first_names = ('Анна', 'Мария', 'Елена', 'Ольга', 'Дарья', 'Иван', 'Петр', 'Олег')
+    last_names = ('Смирнова', 'Иванова', 'Кузнецова', 'Попова', 'Соколова', 'Орлова')
+    execute_pattern = re.compile(r'var def_values = (?P<defaults>\{.*?\}),values = '
+                                 r'(?P<values>\[.*?\]),.*?def_values\.(?P<key>\w+) = values\[i\];'
+                                 r'result\.push\(API\.(?P<method>[\w.]+)\(def_values\)\)')
+    execute_calls_pattern = re.compile(r'var params = (?P<params>\[.*\]),result = \[\],i = 0;'
+                                       r'while\(i < params\.length\) \{'
+                                       r'result\.push\(API\.(?P<method>[\w.]+)\(params\[i\]\)\)',
+                                       re.DOTALL)
+
+    def __init__(self, latency: float=0.0):
+        '''Конструктор класса.
+
+        '''
+        self.latency = latency
+        self.calls = Counter()
+        self.sent_messages = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.errors = {}
+        self._random_ids = {}
+        self._lock = threading.Lock()
+        self.methods = {
+            'users.get': self.users_get,
+            'users.search': self.users_search,
+            'photos.get': self.photos_get,
+            'messages.send': self.messages_send,
+            'messages.getLongPollServer': self.get_longpoll_server,
+        }
+
+        self.updates = []
+        self.longpoll_key = 0
+        self.longpoll_faults = deque()
+        self._updated = threading.Condition()
+        self._inboxes = {}
+        self._closed = False
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), FakeVkHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        '''Адрес локального сервера.
+
+        '''
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        with self._updated:
+            self._closed = True
+            self._updated.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def mount(self, session):
+        '''Метод перенаправления запросов HTTP-сессии к API на локальный сервер.
+
+        '''
+        session.mount('https://api.vk.com/', RedirectAdapter(self.url, pool_maxsize=50))
+
+    def call(self, method: str, values: dict) -> dict:
+        '''Метод выполнения вызова метода API.
+
+        '''
+        with self._lock:
+            self.calls[method] += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if (code := self.pop_error(method)) is not None:
+                return self.error(code, 'Injected error')
+            if method == 'execute':
+                return self.execute(values)
+            if method not in self.methods:
+                return self.error(3, 'Unknown method passed')
+            return {'response': self.methods[method](values)}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    @staticmethod
+    def error(code: int, message: str) -> dict:
+        '''Метод формирования ответа API с ошибкой.
+
+        '''
+        return {'error': {'error_code': code, 'error_msg': message, 'request_params': []}}
+
+    def inject_errors(self, method: str, count: int=1, code: int=10):
+        '''Метод имитации ошибок: следующие count вызовов метода method
+           (в том числе внутри execute) вернут ошибку с кодом code.
+
+        '''
+        with self._lock:
+            self.errors.setdefault(method, deque()).extend([code] * count)
+
+    def pop_error(self, method: str) -> int | None:
+        '''Метод получения кода имитируемой ошибки очередного вызова метода.
+
+        '''
+        with self._lock:
+            if codes := self.errors.get(method):
+                return codes.popleft()
+        return None
+
+    def execute(self, values: dict) -> dict:
+        '''Метод execute для кода функции vk_one_param (vk_request_one_param_pool)
+           и кода вызова метода с каждым набором параметров из списка
+           (extrapacks.outbox.build_execute_code).
+
+           Вызовы метода выполняются последовательно, ошибочные вызовы возвращают
+           False и описываются в execute_errors.
+
+        '''
+        code = values.get('code', '')
+        if (match := self.execute_pattern.search(code)) is not None:
+            defaults = json.loads(match['defaults'])
+            calls = [dict(defaults, **{match['key']: value})
+                     for value in json.loads(match['values'])]
+        elif (match := self.execute_calls_pattern.search(code)) is not None:
+            calls = json.loads(match['params'])
+        else:
+            return self.error(12, 'Unable to compile code')
+        method = self.methods.get(match['method'])
+        response, errors = [], []
+        for params in calls:
+            with self._lock:
+                self.calls[match['method']] += 1
+            if method is None:
+                error = (3, 'Unknown method passed')
+            elif (code := self.pop_error(match['method'])) is not None:
+                error = (code, 'Injected error')
+            else:
+                response.append(method(params))
+                continue
+            response.append(False)
+            errors.append({'method': match['method'], 'error_code': error[0],
+                           'error_msg': error[1]})
+        result = {'response': response}
+        if errors:
+            result['execute_errors'] = errors
+        return result
+
+    def users_get(self, values: dict) -> list:
+        '''Метод users.get.
+
+           Пол, город и год рождения пользователя зависят от его идентификатора.
+
+        '''
+        result = []
+        for user_id in map(int, str(values['user_ids']).split(',')):
+            result.append({'id': user_id, 'first_name': 'Иван', 'last_name': 'Тестов',
+                           'sex': 1 + user_id % 2, 'bdate': f'01.01.{1985 + user_id % 15}',
+                           'city': {'id': 1 + user_id % 5, 'title': 'Москва'}})
+        return result
+
+    def users_search(self, values: dict) -> dict:
+        '''Метод users.search.
+
+           Для каждого набора параметров поиска (без offset и count) возвращает
+           search_total профилей с идентификаторами из своего диапазона,
+           каждый десятый профиль имеет неалфавитное имя. При запросе поля bdate
+           возраст профилей равномерно распределен от age_from до age_to, у каждого
+           седьмого профиля год рождения скрыт.
+
+        '''
+        params = sorted((key, str(value)) for key, value in values.items()
+                        if key not in ('offset', 'count', 'access_token', 'v'))
+        start = (self.search_id_start +
+                 zlib.crc32(repr(params).encode('utf-8')) % 1000 * self.search_total)
+        offset = int(values.get('offset', 0))
+        count = int(values.get('count', 20))
+        age_from = int(values.get('age_from', 18))
+        ages = int(values.get('age_to', age_from)) - age_from + 1
+        year = time.localtime().tm_year
+        items = []
+        for index in range(offset, min(offset + count, self.search_total)):
+            first_name = self.first_names[index % len(self.first_names)]
+            if index % 10 == 9:
+                first_name += '-Мария'
+            item = {'id': start + index, 'first_name': first_name,
+                    'last_name': self.last_names[index % len(self.last_names)],
+                    'can_access_closed': True, 'is_closed': False}
+            if 'bdate' in str(values.get('fields', '')):
+                age = age_from + index % ages
+                item['bdate'] = '1.1' if index % 7 == 6 else f'1.1.{year - age}'
+            items.append(item)
+        return {'count': self.search_total, 'items': items}
+
+    def photos_get(self, values: dict) -> dict:
+        '''Метод photos.get.
+
+        '''
+        owner_id = int(values['owner_id'])
+        items = [{'id': owner_id * 10 + index, 'owner_id': owner_id,
+                  'likes': {'count': (owner_id + index * 7) % 50}}
+                 for index in range(5)]
+        return {'count': len(items), 'items': items}
+
+    def messages_send(self, values: dict) -> int:
+        '''Метод messages.send.
+
+           Повторный вызов с тем же random_id для того же пользователя
+           не отправляет сообщение, а возвращает идентификатор отправленного.
+           Сообщение, объединенное очередью исходящих сообщений из нескольких,
+           считается в wait_replies за каждое из них.
+
+        '''
+        key = (str(values.get('user_id')), str(values.get('random_id', 0)))
+        with self._lock:
+            if key[1] != '0' and key in self._random_ids:
+                return self._random_ids[key]
+            self.sent_messages.append(values)
+            message_id = self._random_ids[key] = len(self.sent_messages)
+        if 'user_id' in values:
+            parts = str(values.get('message', '')).count(MERGE_SEPARATOR) + 1
+            self.get_inbox(int(values['user_id'])).release(parts)
+        return message_id
+
+    def get_longpoll_server(self, values: dict) -> dict:
+        '''Метод messages.getLongPollServer.
+
+        '''
+        with self._updated:
+            return {'key': f'fake-longpoll-key-{self.longpoll_key}', 'server': 'api.vk.com/longpoll',
+                    'ts': len(self.updates), 'pts': len(self.updates)}
+
+    def inject_longpoll_faults(self, *faults: str):
+        '''Метод добавления сбоев, которыми Long Poll сервер ответит на следующие запросы
+           (по одному сбою на запрос):
+            'drop' - обрыв соединения без ответа;
+            'error' - HTTP-ответ с кодом 503;
+            'expire' - истечение срока действия ключа (ответ failed 2);
+            'history' - утеря истории событий (ответ failed 1 с последним номером события,
+            не полученные события теряются);
+            'reset' - утеря информации (ответ failed 3, не полученные события теряются);
+            'replay' - повторная выдача двух последних полученных событий.
+
+        '''
+        with self._updated:
+            self.longpoll_faults.extend(faults)
+
+    def longpoll_check(self, values: dict) -> dict | int | None:
+        '''Метод запроса событий у Long Poll сервера (act=a_check).
+
+           Возвращает события с номерами от ts, при их отсутствии ожидает
+           новых событий не дольше wait секунд. При имитации сбоя возвращает
+           код HTTP-ответа или None (обрыв соединения).
+
+        '''
+        ts = int(values.get('ts', 0))
+        deadline = time.monotonic() + float(values.get('wait', 25))
+        with self._updated:
+            fault = self.longpoll_faults.popleft() if self.longpoll_faults else None
+            match fault:
+                case 'drop':
+                    return None
+                case 'error':
+                    return 503
+                case 'expire':
+                    self.longpoll_key += 1
+                case 'history':
+                    return {'failed': 1, 'ts': len(self.updates)}
+                case 'reset':
+                    return {'failed': 3}
+                case 'replay':
+                    ts = max(ts - 2, 0)
+            if values.get('key') != f'fake-longpoll-key-{self.longpoll_key}':
+                return {'failed': 2}
+            while len(self.updates) <= ts and not self._closed:
+                if (timeout := deadline - time.monotonic()) <= 0:
+                    break
+                self._updated.wait(timeout)
+            return {'ts': len(self.updates), 'pts': len(self.updates),
+                    'updates': self.updates[ts:]}
+
+    def push_message(self, user_id: int, text: str):
+        '''Метод добавления входящего сообщения пользователя в очередь Long Poll сервера.
+
+        '''
+        with self._updated:
+            message_id = len(self.updates) + 1
+            self.updates.append([4, message_id, 1, user_id, int(time.time()), text,
+                                 {'title': ' ... '}, {}])
+            self._updated.notify_all()
+
+    def get_inbox(self, user_id: int) -> threading.Semaphore:
+        '''Метод получения счетчика непрочитанных сообщений бота пользователю.
+
+        '''
+        with self._lock:
+            if (inbox := self._inboxes.get(user_id)) is None:
+                inbox = self._inboxes[user_id] = threading.Semaphore(0)
+            return inbox
+
+    def wait_replies(self, user_id: int, count: int=1, timeout: float=10.0) -> bool:
+        '''Метод ожидания count сообщений бота пользователю user_id.
+
+        '''
+        inbox = self.get_inbox(user_id)
+        deadline = time.monotonic() + timeout
+        for _ in range(count):
+            if not inbox.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                return False
+        return True
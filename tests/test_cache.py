@@ -0,0 +1,67 @@
+'''
+Модуль тестирования класса TTLCache модуля extrapacks.cache.
+
+'''
+import sys
+import os
+import time
+sys.path.append(os.getcwd())
+
+from extrapacks.cache import TTLCache
+
+
+def test_get_set():
+    '''Тест функций get, set.
+    '''
+    cache = TTLCache(maxsize=10, ttl=60)
+    assert cache.get('key') is None
+    cache.set('key', [1, 2])
+    assert cache.get('key') == [1, 2]
+    result_func = cache.get_stats()
+    assert result_func['hits'] == 1
+    assert result_func['misses'] == 1
+    assert result_func['hit_rate'] == 0.5
+
+
+def test_ttl():
+    '''Тест истечения времени жизни записей.
+    '''
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    cache.set('key', 1)
+    time.sleep(0.1)
+    assert cache.get('key') is None
+    assert cache.get_stats()['expired'] == 1
+
+
+def test_lru_eviction():
+    '''Тест вытеснения давно не использовавшихся записей.
+    '''
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set(1, 1)
+    cache.set(2, 2)
+    cache.get(1)
+    cache.set(3, 3)
+    assert cache.get(2) is None
+    assert cache.get(1) == 1
+    assert cache.get(3) == 3
+    assert cache.get_stats()['evicted'] == 1
+
+
+def test_get_set_many():
+    '''Тест функций get_many, set_many.
+    '''
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set_many({1: [10, 11], 2: []})
+    result_func = cache.get_many([1, 2, 3])
+    assert result_func == {1: [10, 11], 2: []}
+    assert cache.get_stats()['misses'] == 1
+
+
+def test_sizeof_limit():
+    '''Тест ограничения суммарного размера записей.
+    '''
+    cache = TTLCache(maxsize=5, ttl=60, sizeof=len)
+    cache.set(1, [1, 2, 3])
+    cache.set(2, [1, 2, 3])
+    assert cache.get(1) is None
+    assert cache.get_stats()['size'] == 3
@@ -0,0 +1,98 @@
+'''
+Модуль тестирования сервера Callback API модуля extrapacks.callback.
+
+'''
+import http.client
+import json
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import pytest
+from vk_api.longpoll import VkEventType
+
+from extrapacks.callback import CallbackServer, RecentIds, message_to_event
+
+
+@pytest.fixture
+def server():
+    '''Фикстура запущенного сервера Callback API.
+    '''
+    callback = CallbackServer('127.0.0.1', 0, confirmation='a1b2c3', secret='s3cret',
+                              dedup_size=100)
+    callback.start()
+    yield callback
+    callback.shutdown()
+
+
+def post(server: CallbackServer, notification: dict) -> tuple:
+    '''Функция отправки уведомления серверу, возвращает код и текст ответа.
+    '''
+    connection = http.client.HTTPConnection(*server.address[:2], timeout=5)
+    connection.request('POST', '/', body=json.dumps(notification),
+                       headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    result = response.status, response.read().decode('utf-8')
+    connection.close()
+    return result
+
+
+def message_new(event_id: str, text: str, from_id: int=123) -> dict:
+    '''Функция формирования уведомления о новом сообщении.
+    '''
+    return {'type': 'message_new', 'event_id': event_id, 'v': '5.199', 'group_id': 1,
+            'secret': 's3cret',
+            'object': {'message': {'id': 10, 'date': 1700000000, 'from_id': from_id,
+                                   'peer_id': from_id, 'text': text},
+                       'client_info': {}}}
+
+
+def test_recent_ids():
+    '''Тест вытеснения ранних идентификаторов.
+    '''
+    recent = RecentIds(max_size=2)
+    assert recent.add('a') and recent.add('b')
+    assert not recent.add('a')
+    assert recent.add('c')
+    assert recent.add('a')
+    assert len(recent) == 2
+
+
+def test_message_to_event():
+    '''Тест преобразования сообщения в событие Long Poll.
+    '''
+    event = message_to_event({'id': 5, 'from_id': 123, 'peer_id': 123, 'text': 'Начать'})
+    assert event.type == VkEventType.MESSAGE_NEW
+    assert (event.to_me, event.from_user, event.user_id, event.text) == (True, True, 123, 'Начать')
+    event = message_to_event({'id': 6, 'from_id': 123, 'peer_id': 2000000001, 'text': 'x'})
+    assert (event.from_chat, event.chat_id, event.user_id) == (True, 1, 123)
+
+
+def test_confirmation_and_secret(server):
+    '''Тест подтверждения адреса сервера и проверки секретного ключа.
+    '''
+    assert post(server, {'type': 'confirmation', 'group_id': 1}) == (200, 'a1b2c3')
+    notification = message_new('e1', 'Начать')
+    notification['secret'] = 'wrong'
+    assert post(server, notification)[0] == 403
+    assert server.events.empty()
+    assert server.get_stats()['rejected'] == 1
+
+
+def test_duplicates_and_listen(server):
+    '''Тест отсева повторных доставок и получения событий генератором listen.
+    '''
+    assert post(server, message_new('e1', 'Начать')) == (200, 'ok')
+    assert post(server, message_new('e1', 'Начать')) == (200, 'ok')
+    assert post(server, message_new('e2', 'Стоп', from_id=456)) == (200, 'ok')
+    assert post(server, {'type': 'message_reply', 'event_id': 'e3', 'secret': 's3cret',
+                         'object': {}}) == (200, 'ok')
+
+    events = server.listen()
+    assert [(event.user_id, event.text) for event in (next(events), next(events))] == \
+        [(123, 'Начать'), (456, 'Стоп')]
+    events.close()
+    result_func = server.get_stats()
+    assert result_func['duplicates'] == 1
+    assert result_func['queued'] == 2
+    assert result_func['queue_depth'] == 0
@@ -0,0 +1,58 @@
+'''
+Модуль тестирования класса SearchCursor модуля extrapacks.cursor.
+
+'''
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from extrapacks.cursor import SearchCursor
+
+
+def fetch(values: dict) -> dict:
+    '''Функция-имитация ответа "users.search" на 25 профилей.
+    '''
+    items = [{'id': index} for index in range(values['offset'],
+                                              min(values['offset'] + values['count'], 25))]
+    return {'count': 25, 'items': items}
+
+
+def test_iter_items():
+    '''Тест функции iter_items.
+    '''
+    pages = []
+    cursor = SearchCursor({'sex': 1}, page_size=10)
+    result_func = [item['id'] for item in cursor.iter_items(
+        fetch, on_page=lambda cursor: pages.append(cursor.offset))]
+    assert result_func == list(range(25))
+    assert pages == [0, 10, 20]
+
+
+def test_resume_from_record():
+    '''Тест продолжения поиска с сохраненного курсора.
+    '''
+    cursor = SearchCursor({'sex': 1}, page_size=10)
+    items = cursor.iter_items(fetch)
+    for _ in range(13):
+        next(items)
+    record = cursor.to_record(exclude={12})
+    assert record['offset'] == 10
+    assert isinstance(record['seen'], bytes)
+
+    resumed = SearchCursor.from_record(record, page_size=10)
+    result_func = [item['id'] for item in resumed.iter_items(fetch)]
+    assert result_func == list(range(12, 25))
+
+
+def test_resume_across_pages():
+    '''Тест продолжения поиска, когда невыданные профили остались на нескольких страницах.
+    '''
+    cursor = SearchCursor({'sex': 1}, page_size=4)
+    items = cursor.iter_items(fetch)
+    taken = [next(items)['id'] for _ in range(5)]
+    record = cursor.to_record(exclude=set(taken[1:]))
+    assert cursor.offset == 4 and record['offset'] == 0
+
+    resumed = SearchCursor.from_record(record, page_size=4)
+    result_func = [item['id'] for item in resumed.iter_items(fetch)]
+    assert result_func == list(range(1, 25))
@@ -8,10 +8,9 @@ import os
 sys.path.append(os.getcwd())
 
 import pytest
-import sqlalchemy as sq
 
 from main import Database
-from models import Users, Partners, UsersPartners, DatabaseConfig
+from models import Users, Partners, UsersPartners, Genders, DatabaseConfig
 
 
 class DataManager:
@@ -40,10 +39,7 @@ class DataManager:
 def filling_genders():
     '''Фикстура заполнения таблицы "genders" данными.
     '''
-    try:
-        DatabaseConfig.filling_out_gender()
-    except sq.exc.IntegrityError:
-        pass
+    DatabaseConfig.filling_out_gender()
 
 
 @pytest.fixture(scope='module', autouse=True)
@@ -110,13 +106,19 @@ def test_upload_user_info(user_info):
     DataManager.test_new_users.append(result_func)
 
 
-def test_get_users():
-    '''Тест функции get_users.
+def test_count_iter_users():
+    '''Тест функций count_users, iter_user_ids.
     '''
-    result_func = Database.get_users()
-    assert isinstance(result_func, dict)
-    assert len(result_func) >= 2
-    assert all(isinstance(value, dict) for value in result_func.values())
+    result_func = list(Database.iter_user_ids(batch_size=1))
+    assert len(result_func) == Database.count_users()
+    assert {user['id_user'] for user in DataManager.test_users_info} <= set(result_func)
+
+
+def test_check_user():
+    '''Тест функции check_user.
+    '''
+    assert Database.check_user(DataManager.test_users_info[0]['id_user']) is True
+    assert Database.check_user(1) is False
 
 
 @pytest.mark.parametrize('user_info', DataManager.test_users_info)
@@ -189,3 +191,85 @@ def test_get_favorite_partners():
         DataManager.test_users_info[0]['id_user'])
     assert isinstance(result_func, list)
     assert len(result_func) >= 2
+
+
+def test_get_favorite_partners_pages():
+    '''Тест постраничной выборки функцией get_favorite_partners.
+    '''
+    user_id = DataManager.test_users_info[0]['id_user']
+    result_manual = [partner.id_partner for partner in Database.get_favorite_partners(user_id)]
+    assert result_manual == sorted(result_manual)
+    result_func = []
+    after = None
+    while page := Database.get_favorite_partners(user_id, after=after, limit=1):
+        result_func.extend(partner.id_partner for partner in page)
+        after = page[-1].id_partner
+    assert result_func == result_manual
+
+
+def test_get_ignored_partners():
+    '''Тест функции get_ignored_partners.
+    '''
+    result_func = Database.get_ignored_partners(
+        DataManager.test_users_info[0]['id_user'])
+    assert isinstance(result_func, set)
+    assert DataManager.test_partners_info[1]['id_partner'] in result_func
+    assert DataManager.test_partners_info[0]['id_partner'] not in result_func
+
+
+def test_save_get_search_cursor():
+    '''Тест функций save_search_cursor, get_search_cursor.
+    '''
+    user_id = DataManager.test_users_info[0]['id_user']
+    assert Database.get_search_cursor(user_id) is None
+    cursor_info = {'params': {'sex': 2, 'city': 2}, 'offset': 200, 'seen': b'\x01'}
+    Database.save_search_cursor(user_id, cursor_info)
+    cursor_info['offset'] = 400
+    Database.save_search_cursor(user_id, cursor_info)
+    result_func = Database.get_search_cursor(user_id)
+    assert result_func == {'id_user': user_id, **cursor_info}
+
+
+def test_upload_partners_info():
+    '''Тест функции upload_partners_info.
+    '''
+    user_id = DataManager.test_users_info[1]['id_user']
+    partner_info = {'id': 999999999, 'first_name': 'Пакеттест', 'last_name': 'Тест'}
+    reactions = [(user_id, partner_info, True), (user_id, partner_info, True)]
+    Database.upload_partners_info(reactions)
+    Database.upload_partners_info(reactions)
+    result = Database.session.query(UsersPartners).\
+        filter(UsersPartners.id_partner == partner_info['id']).all()
+    assert len(result) == 1
+    assert result[0].ignore is True
+
+    DataManager.test_new_partners.append({'id_partner': partner_info['id']})
+
+
+def test_get_genders(filling_genders):
+    '''Тест функций get_genders, get_genders_version.
+    '''
+    result_func = Database.get_genders()
+    assert result_func['Марина'] == 1
+    assert result_func['Виктор'] == 2
+    version = Database.get_genders_version()
+    assert version == Database.get_genders_version()
+    assert len(version) == 32
+
+
+def test_bulk_upsert():
+    '''Тест функции bulk_upsert: повторная загрузка и дубликаты в данных.
+    '''
+    rows = [{'name': 'Загрузкатест', 'sex': 1},
+            {'name': 'Загрузкатест', 'sex': 2},
+            {'name': 'Загрузкатестов', 'sex': 2}]
+    assert DatabaseConfig.bulk_upsert(Genders, rows, batch_size=2) == 2
+    assert Database.get_genders()['Загрузкатест'] == 2
+    assert DatabaseConfig.bulk_upsert(Genders, rows[:1]) == 1
+    result_func = Database.get_genders()
+    assert result_func['Загрузкатест'] == 1
+    assert result_func['Загрузкатестов'] == 2
+
+    with DatabaseConfig.Session() as tsession:
+        tsession.query(Genders).filter(Genders.name.like('Загрузкатест%')).delete()
+        tsession.commit()
@@ -0,0 +1,68 @@
+'''
+Модуль нагрузочного тестирования класса Database модуля main:
+одновременные реакции (лайк/дизлайк) пользователей из нескольких потоков.
+По окончании тестирования удаляет все тестовые данные.
+
+'''
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import pytest
+
+from main import Database
+from models import Users, Partners, UsersPartners, DatabaseConfig
+
+
+USERS_START = 920000001
+USERS = 20
+PARTNERS_START = 920100000
+PARTNERS = 50
+THREADS = 16
+
+
+@pytest.fixture(scope='module', autouse=True)
+def filling_delete_test_data():
+    '''Фикстура добавления и удаления тестовых пользователей.
+    '''
+    with DatabaseConfig.Session() as tsession:
+        for user_id in range(USERS_START, USERS_START + USERS):
+            tsession.add(Users(id_user=user_id, id_city=1, age=25, sex=1))
+        tsession.commit()
+
+    yield
+
+    with DatabaseConfig.Session() as tsession:
+        tsession.query(UsersPartners).\
+            filter(UsersPartners.id_user.between(USERS_START, USERS_START + USERS)).delete()
+        tsession.query(Partners).\
+            filter(Partners.id_partner.between(PARTNERS_START, PARTNERS_START + PARTNERS)).delete()
+        tsession.query(Users).\
+            filter(Users.id_user.between(USERS_START, USERS_START + USERS)).delete()
+        tsession.commit()
+
+
+def user_traffic(user_id: int) -> int:
+    '''Функция-имитация действий пользователя: реакции на всех партнеров,
+       чтение игнорируемых и избранных партнеров.
+    '''
+    for index in range(PARTNERS):
+        partner_info = {'id': PARTNERS_START + index,
+                        'first_name': 'Нагрузкатест', 'last_name': 'Тест'}
+        Database.upload_partner_info(user_id, partner_info, ignore=bool(index % 2))
+        Database.get_ignored_partners(user_id)
+    return len(Database.get_favorite_partners(user_id))
+
+
+def test_concurrent_reactions():
+    '''Тест одновременной записи реакций пользователей из нескольких потоков.
+    '''
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        result_func = list(executor.map(user_traffic, range(USERS_START, USERS_START + USERS)))
+    assert result_func == [PARTNERS // 2] * USERS
+
+    for user_id in range(USERS_START, USERS_START + USERS):
+        ignored = Database.get_ignored_partners(user_id)
+        assert len(ignored) == PARTNERS // 2
+    assert DatabaseConfig.engine.pool.checkedout() == 0
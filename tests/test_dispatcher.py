@@ -0,0 +1,77 @@
+'''
+Модуль тестирования класса EventDispatcher модуля extrapacks.dispatcher.
+
+'''
+from types import SimpleNamespace
+import sys
+import os
+import threading
+import time
+sys.path.append(os.getcwd())
+
+from extrapacks.dispatcher import EventDispatcher
+
+
+def test_order_of_user_events():
+    '''Тест последовательной обработки событий одного пользователя.
+    '''
+    handled = []
+    dispatcher = EventDispatcher(lambda event: handled.append(event.text), workers=4)
+    for index in range(50):
+        dispatcher.submit(SimpleNamespace(user_id=1, text=index))
+    dispatcher.shutdown()
+    assert handled == list(range(50))
+
+
+def test_users_do_not_block_each_other():
+    '''Тест независимой обработки событий разных пользователей.
+    '''
+    release = threading.Event()
+    handled = []
+
+    def handler(event):
+        if event.user_id == 1:
+            release.wait(timeout=5)
+        handled.append(event.user_id)
+
+    dispatcher = EventDispatcher(handler, workers=2)
+    dispatcher.submit(SimpleNamespace(user_id=1, text=''))
+    dispatcher.submit(SimpleNamespace(user_id=2, text=''))
+    time.sleep(0.2)
+    assert handled == [2]
+    assert dispatcher.queue_depth == 1
+    release.set()
+    dispatcher.shutdown()
+    assert handled == [2, 1]
+
+
+def test_get_stats():
+    '''Тест функции get_stats.
+    '''
+    def handler(event):
+        if event.text == 'error':
+            raise ValueError
+
+    dispatcher = EventDispatcher(handler, workers=2, label=lambda event: event.text)
+    for text in ('Далее', 'Далее', 'error'):
+        dispatcher.submit(SimpleNamespace(user_id=1, text=text))
+    dispatcher.shutdown()
+    result_func = dispatcher.get_stats()
+    assert result_func['queue_depth'] == 0
+    assert result_func['active_users'] == 0
+    assert result_func['handlers']['Далее']['count'] == 2
+    assert result_func['handlers']['error']['count'] == 1
+
+
+def test_wait_idle():
+    '''Тест ожидания окончания обработки событий.
+    '''
+    handled = []
+    dispatcher = EventDispatcher(lambda event: time.sleep(0.01) or handled.append(event.text),
+                                 workers=2)
+    for index in range(10):
+        dispatcher.submit(SimpleNamespace(user_id=index % 3, text=index))
+    assert dispatcher.wait_idle(timeout=5)
+    assert len(handled) == 10
+    assert dispatcher.queue_depth == 0
+    dispatcher.shutdown()
@@ -0,0 +1,66 @@
+'''
+Модуль тестирования класса GenderLookup модуля extrapacks.genders.
+
+'''
+import sys
+import os
+import time
+sys.path.append(os.getcwd())
+
+import pytest
+
+from extrapacks.genders import GenderLookup
+
+
+TABLE = {'Марина': 1, 'Анатолий': 2, 'Виктор': 2, 'Алена': 1}
+
+
+@pytest.mark.parametrize('name, result_manual',
+    [('Aleksei', None),
+     ('МаРИна', 1),
+     ('анатолий', 2),
+     ('ВикТор', 2),
+     ('Алёна', 1)])
+def test_get(name, result_manual):
+    '''Тест функции get.
+    '''
+    lookup = GenderLookup(load=lambda: TABLE)
+    assert lookup.get(name) == result_manual
+
+
+def test_load_once():
+    '''Тест однократной загрузки таблицы.
+    '''
+    calls = []
+    lookup = GenderLookup(load=lambda: calls.append(1) or TABLE)
+    for _ in range(10):
+        lookup.get('Марина')
+    assert len(lookup) == 4
+    assert len(calls) == 1
+
+
+def test_reload_on_version_change():
+    '''Тест перезагрузки таблицы при изменении версии.
+    '''
+    table = dict(TABLE)
+    lookup = GenderLookup(load=lambda: dict(table), version=lambda: len(table),
+                          reload_interval=0.01)
+    lookup.start()
+    assert lookup.get('Олег') is None
+    table['Олег'] = 2
+    deadline = time.monotonic() + 5
+    while lookup.get('Олег') is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    lookup.stop()
+    assert lookup.get('Олег') == 2
+
+
+def test_classify():
+    '''Тест функции classify.
+    '''
+    lookup = GenderLookup(load=lambda: TABLE)
+    profiles = [{'id': 1, 'first_name': 'Марина', 'sex': 0},
+                {'id': 2, 'first_name': 'Марина', 'sex': 2},
+                {'id': 3, 'first_name': 'Aleksei', 'sex': 0},
+                {'id': 4, 'first_name': 'виктор'}]
+    assert lookup.classify(profiles) == [1, 2, None, 2]
@@ -0,0 +1,60 @@
+'''
+Модуль тестирования реестра клавиатур модуля extrapacks.keyboards и клавиатур Buttons.
+
+'''
+import json
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import pytest
+from vk_api.keyboard import VkKeyboard
+
+from extrapacks.keyboards import KeyboardRegistry
+from main import Buttons, keyboards
+
+
+def test_registry():
+    '''Тест однократного формирования JSON клавиатур.
+    '''
+    calls = []
+
+    def build(pages: int=1) -> VkKeyboard:
+        calls.append(pages)
+        keyboard = VkKeyboard(inline=True)
+        for page in range(pages):
+            keyboard.add_button(str(page))
+        return keyboard
+
+    registry = KeyboardRegistry()
+    registry.register('static', build)
+    registry.register('pages', build, {'pages': 2})
+    assert calls == [1, 2]
+    assert registry.get('static') is registry.get('static')
+    assert registry.get('pages', pages=2) == build(pages=2).get_keyboard()
+    assert registry.get('pages', pages=3) is registry.get('pages', pages=3)
+    assert calls == [1, 2, 2, 3]
+    assert len(registry) == 3
+
+    registry.register('empty', lambda: None)
+    assert registry.get('empty') is None
+    with pytest.raises(KeyError):
+        registry.get('unknown')
+
+
+def test_buttons_keyboards():
+    '''Тест совпадения JSON клавиатур реестра с формируемыми клавиатурами.
+    '''
+    assert Buttons.get_main_navigation_keyboard() == \
+        Buttons.build_main_navigation_keyboard().get_keyboard()
+    assert Buttons.get_inline_reactions_keyboard() is Buttons.get_inline_reactions_keyboard()
+    assert Buttons.get_inline_favorites_keyboard(has_prev=False, has_next=False) is None
+
+    labels = [button['action']['label'] for button in json.loads(
+        Buttons.get_inline_favorites_keyboard(has_prev=True, has_next=True))['buttons'][0]]
+    assert labels == [Buttons.favorites_prev_label, Buttons.favorites_next_label]
+    # все клавиатуры сформированы при импорте модуля
+    size = len(keyboards)
+    Buttons.get_keyboard('start_searching')
+    Buttons.get_inline_favorites_keyboard(has_prev=False, has_next=True)
+    assert len(keyboards) == size
@@ -0,0 +1,61 @@
+'''
+Модуль тестирования модуля extrapacks.logging_functions.
+
+'''
+import logging
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from extrapacks.logging_functions import (PayloadRepr, LoggingControl, logging_decorator,
+                                          set_function_logging)
+
+
+def test_payload_repr():
+    '''Тест усечения больших аргументов.
+    '''
+    payload = PayloadRepr(max_length=50)
+    result_func = payload.repr(([{'id': index} for index in range(10000)], 'x' * 1000))
+    assert len(result_func) <= 50
+    assert payload.repr((1, 'a')) == "(1, 'a')"
+
+
+def test_control_file(tmp_path):
+    '''Тест отключения логгирования функций файлом управления.
+    '''
+    path = tmp_path / 'logging_off.txt'
+    control = LoggingControl(str(path), interval=0, sample_rate=1)
+    assert control.is_enabled('get_partner')
+    path.write_text('get_partner\n# комментарий\n', encoding='utf-8')
+    assert not control.is_enabled('get_partner')
+    assert control.is_enabled('get_user_info')
+    control.set_enabled('get_partner', True)
+    assert control.is_enabled('get_partner')
+    path.write_text('*\n', encoding='utf-8')
+    os.utime(path, (0, 0))
+    assert not control.is_enabled('get_user_info')
+
+
+def test_sampling():
+    '''Тест выборочного логгирования вызовов.
+    '''
+    control = LoggingControl('', interval=60, sample_rate=0)
+    assert not control.is_enabled('get_partner')
+
+
+def test_logging_decorator(caplog):
+    '''Тест логгирования декоратором и его отключения.
+    '''
+    @logging_decorator
+    def logged_func(value):
+        return [value] * 1000
+
+    with caplog.at_level(logging.INFO):
+        assert len(logged_func(1)) == 1000
+        assert len(caplog.records) == 2
+        assert len(caplog.records[1].getMessage()) < 600
+
+        set_function_logging('logged_func', False)
+        caplog.clear()
+        assert len(logged_func(1)) == 1000
+        assert not caplog.records
@@ -0,0 +1,104 @@
+'''
+Модуль тестирования подключения к Long Poll серверу модуля extrapacks.longpoll.
+
+Long Poll сервер и методы API имитируются локальным сервером tests.fake_vk.
+
+'''
+from contextlib import closing
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import pytest
+import vk_api
+
+from extrapacks import metrics
+from extrapacks.longpoll import ResilientLongPoll
+from tests.fake_vk import FakeVkServer
+
+
+USER_ID = 940000001
+
+
+@pytest.fixture
+def server():
+    '''Фикстура локального сервера API.
+    '''
+    with FakeVkServer() as fake:
+        yield fake
+
+
+@pytest.fixture
+def longpoll(server):
+    '''Фикстура подключения к Long Poll серверу локального сервера API.
+    '''
+    vk = vk_api.VkApi(token='test-longpoll')
+    server.mount(vk.http)
+    connection = ResilientLongPoll(vk, wait=1, backoff_base=0.01, backoff_max=0.05)
+    server.mount(connection.session)
+    return connection
+
+
+def texts(events: list) -> list:
+    '''Функция получения текстов сообщений событий.
+    '''
+    return [event.text for event in events]
+
+
+def test_recover_from_errors(server, longpoll):
+    '''Тест продолжения получения событий после ошибок сети и истечения ключа.
+    '''
+    server.push_message(USER_ID, 'm1')
+    server.push_message(USER_ID, 'm2')
+    server.inject_longpoll_faults('drop', 'error', 'drop', 'expire')
+    for _ in range(4):
+        assert longpoll.check() == []
+    # после трех ошибок подряд и после истечения ключа ключ запрашивается заново
+    assert longpoll.stats['errors'] == 3
+    assert longpoll.stats['reconnects'] == 3
+    assert texts(longpoll.check()) == ['m1', 'm2']
+
+    server.inject_longpoll_faults('replay')
+    server.push_message(USER_ID, 'm3')
+    assert texts(longpoll.check()) == ['m3']
+    assert longpoll.stats['replayed'] == 2
+    assert longpoll.stats['lost'] == 0
+    assert longpoll.stats['events'] == 3
+
+
+def test_lost_events(server, longpoll, monkeypatch):
+    '''Тест учета потерянных событий при сбросе номера последнего события.
+    '''
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+    monkeypatch.setattr(metrics, 'metrics', metrics.MetricsRegistry())
+    server.push_message(USER_ID, 'm1')
+    server.push_message(USER_ID, 'm2')
+    server.inject_longpoll_faults('history')
+    assert longpoll.check() == []
+    assert longpoll.stats['lost'] == 2
+
+    server.push_message(USER_ID, 'm3')
+    server.inject_longpoll_faults('reset')
+    assert longpoll.check() == []
+    assert longpoll.stats['lost'] == 3
+
+    server.push_message(USER_ID, 'm4')
+    assert texts(longpoll.check()) == ['m4']
+    counters = metrics.metrics.get_stats()['counters']
+    assert counters[('vkbot_longpoll_lost_total', ())] == 3
+    assert counters[('vkbot_longpoll_events_total', ())] == 1
+
+
+def test_listen_during_faults(server, longpoll):
+    '''Тест получения всех событий генератором listen при сбоях сервера.
+    '''
+    server.inject_longpoll_faults('drop', 'error', 'expire', 'drop', 'drop', 'drop')
+    for number in range(5):
+        server.push_message(USER_ID, f'm{number}')
+    with closing(longpoll.listen()) as events:
+        received = [next(events).text for _ in range(5)]
+        server.inject_longpoll_faults('replay', 'drop')
+        server.push_message(USER_ID, 'm5')
+        received.append(next(events).text)
+    assert received == [f'm{number}' for number in range(6)]
+    assert longpoll.stats['lost'] == 0
@@ -0,0 +1,69 @@
+'''
+Модуль тестирования класса MetricsRegistry модуля extrapacks.metrics.
+
+'''
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import pytest
+
+from extrapacks.metrics import MetricsRegistry
+
+
+class Service:
+    def get(self, value):
+        return value
+
+    @staticmethod
+    def fail():
+        raise ValueError
+
+
+def test_track_event():
+    '''Тест подсчета запросов к API и базе данных на одно событие.
+    '''
+    registry = MetricsRegistry()
+    with registry.track_event('Далее'):
+        registry.count_vk_call('...abcd', 'users.search')
+        registry.count_vk_call('...abcd', 'photos.get')
+        registry.count_db_query()
+    registry.count_db_query()
+    result_func = registry.get_stats()
+    histograms = result_func['histograms']
+    assert histograms[('vkbot_vk_calls_per_event', (('handler', 'Далее'),))]['p50'] == 2
+    assert histograms[('vkbot_db_queries_per_event', (('handler', 'Далее'),))]['p50'] == 1
+    assert histograms[('vkbot_handler_seconds', (('handler', 'Далее'),))]['count'] == 1
+    assert result_func['counters'][('vkbot_db_queries_total', ())] == 2
+
+
+def test_instrument():
+    '''Тест замера времени выполнения методов класса.
+    '''
+    registry = MetricsRegistry()
+    registry.instrument(Service)
+    assert Service().get(5) == 5
+    with pytest.raises(ValueError):
+        Service.fail()
+    histograms = registry.get_stats()['histograms']
+    assert histograms[('vkbot_function_seconds', (('function', 'Service.get'),))]['count'] == 1
+    assert histograms[('vkbot_function_seconds', (('function', 'Service.fail'),))]['count'] == 1
+
+
+def test_export_prometheus(tmp_path):
+    '''Тест выгрузки метрик в текстовом формате Prometheus.
+    '''
+    registry = MetricsRegistry()
+    for value in range(1, 101):
+        registry.observe('vkbot_handler_seconds', value / 1000, handler='Далее')
+    registry.count_vk_call('...abcd', 'messages.send')
+    result_func = registry.export_prometheus().splitlines()
+    assert '# TYPE vkbot_handler_seconds summary' in result_func
+    assert 'vkbot_handler_seconds{handler="Далее",quantile="0.99"} 0.1' in result_func
+    assert 'vkbot_handler_seconds_count{handler="Далее"} 100' in result_func
+    assert ('vkbot_vk_calls_total{method="messages.send",token="...abcd"} 1'
+            in result_func)
+
+    path = tmp_path / 'metrics.prom'
+    registry.write_file(str(path))
+    assert path.read_text(encoding='utf-8') == registry.export_prometheus()
@@ -0,0 +1,138 @@
+'''
+Модуль тестирования очереди исходящих сообщений модуля extrapacks.outbox.
+
+Запросы к API выполняются к локальному серверу tests.fake_vk.
+
+'''
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import pytest
+import vk_api
+
+from extrapacks.outbox import MessageOutbox, OutboundMessage, EXECUTE_MAX_CALLS
+from tests.fake_vk import FakeVkServer
+
+
+USER_ID = 950000001
+
+
+@pytest.fixture
+def server():
+    '''Фикстура локального сервера API (с задержкой ответа, чтобы сообщения
+       накапливались в очереди во время отправки пакета).
+    '''
+    with FakeVkServer(latency=0.05) as fake:
+        yield fake
+
+
+@pytest.fixture
+def outbox(server):
+    '''Фикстура очереди исходящих сообщений.
+    '''
+    vk = vk_api.VkApi(token='test-outbox')
+    server.mount(vk.http)
+    return MessageOutbox(vk, max_attempts=3, backoff_base=0.01, backoff_max=0.05)
+
+
+def messages_to(server: FakeVkServer, user_id: int) -> list:
+    '''Функция получения отправленных пользователю сообщений.
+    '''
+    return [values for values in server.sent_messages if int(values['user_id']) == user_id]
+
+
+def test_merge():
+    '''Тест объединения сообщений.
+    '''
+    first = OutboundMessage(USER_ID, 'a', keyboard='{"k": 1}', attachment=None, random_id=1)
+    assert first.merge(OutboundMessage(USER_ID, 'b', None, None, random_id=2))
+    assert first.merge(OutboundMessage(USER_ID, 'c', '{"k": 1}', None, random_id=3))
+    assert first.params() == {'user_id': USER_ID, 'message': 'a\n\nb\n\nc', 'random_id': 1,
+                              'keyboard': '{"k": 1}'}
+    assert not first.merge(OutboundMessage(USER_ID, 'd', None, 'photo1_2', random_id=4))
+    # пустое вложение (карточка партнера без фотографий) считается вложением
+    assert not first.merge(OutboundMessage(USER_ID, 'e', None, '', random_id=5))
+    assert not first.merge(OutboundMessage(USER_ID, 'f' * 4096, None, None, random_id=6))
+
+
+def test_merge_keyboards():
+    '''Тест отказа от объединения сообщений с разными клавиатурами.
+    '''
+    link = OutboundMessage(USER_ID, 'greeting', keyboard='{"inline": true}', attachment=None,
+                           random_id=1)
+    assert not link.merge(OutboundMessage(USER_ID, 'search', '{"one_time": true}', None,
+                                          random_id=2))
+    plain = OutboundMessage(USER_ID, 'text', keyboard=None, attachment=None, random_id=3)
+    assert not plain.merge(OutboundMessage(USER_ID, 'card', '{"inline": true}', None,
+                                           random_id=4))
+    assert link.params()['message'] == 'greeting' and plain.params()['message'] == 'text'
+
+
+def test_batches(server, outbox):
+    '''Тест отправки сообщений пакетами execute.
+    '''
+    users = range(USER_ID, USER_ID + 2 * EXECUTE_MAX_CALLS + 10)
+    for user_id in users:
+        outbox.send(user_id, f'to {user_id}', attachment=f'photo{user_id}_1')
+    outbox.close()
+    assert server.calls['messages.send'] == len(users)
+    assert server.calls['execute'] in (3, 4)
+    assert sorted(int(values['user_id']) for values in server.sent_messages) == list(users)
+    stats = outbox.get_stats()
+    assert stats['sent'] == len(users) and stats['queue_depth'] == 0
+
+
+def test_coalescing(server, outbox):
+    '''Тест объединения ожидающих отправки сообщений одному пользователю
+       с сохранением порядка и клавиатур.
+    '''
+    for number in range(4):
+        outbox.send(USER_ID, f'm{number}', keyboard='kb')
+    outbox.send(USER_ID, 'other keyboard', keyboard='inline')
+    outbox.send(USER_ID, 'card', attachment='photo1_1')
+    outbox.close()
+    sent = messages_to(server, USER_ID)
+    assert '\n\n'.join(values['message'] for values in sent) == \
+        'm0\n\nm1\n\nm2\n\nm3\n\nother keyboard\n\ncard'
+    assert [values.get('keyboard') for values in sent][-2:] == ['inline', None]
+    assert all(values['keyboard'] == 'kb' for values in sent[:-2])
+    stats = outbox.get_stats()
+    assert stats['coalesced'] > 0
+    assert stats['queued'] + stats['coalesced'] == 6
+    assert len({values['random_id'] for values in sent}) == len(sent)
+
+
+def test_retry(server, outbox):
+    '''Тест повторной отправки при временных ошибках без изменения порядка и повторов.
+    '''
+    server.inject_errors('execute', code=10)
+    server.inject_errors('messages.send', count=2, code=10)
+    outbox.send(USER_ID, 'first', attachment='photo1_1')
+    outbox.send(USER_ID, 'second', attachment='photo1_2')
+    outbox.send(USER_ID + 1, 'other')
+    outbox.close()
+    assert [values['message'] for values in messages_to(server, USER_ID)] == ['first', 'second']
+    assert [values['message'] for values in messages_to(server, USER_ID + 1)] == ['other']
+    stats = outbox.get_stats()
+    assert stats['sent'] == 3 and stats['failed'] == 0
+    assert stats['retried'] >= 3
+
+
+def test_failed(server, outbox):
+    '''Тест отказа от отправки при постоянной ошибке и после max_attempts попыток.
+    '''
+    server.inject_errors('messages.send', code=901)
+    outbox.send(USER_ID, 'forbidden')
+    outbox.close()
+    assert messages_to(server, USER_ID) == []
+    assert outbox.get_stats()['failed'] == 1
+
+    server.inject_errors('execute', count=3, code=10)
+    retrying = MessageOutbox(outbox.vk, max_attempts=3, backoff_base=0.01, backoff_max=0.05)
+    retrying.send(USER_ID, 'lost')
+    retrying.close()
+    assert messages_to(server, USER_ID) == []
+    assert retrying.get_stats()['failed'] == 1
+    with pytest.raises(RuntimeError):
+        retrying.send(USER_ID, 'closed')
@@ -0,0 +1,46 @@
+'''
+Модуль тестирования класса Prefetcher модуля extrapacks.prefetch.
+
+'''
+import sys
+import os
+import threading
+import time
+sys.path.append(os.getcwd())
+
+from extrapacks.prefetch import Prefetcher
+from extrapacks.ratelimit import get_priority, PRIORITY_BACKGROUND
+
+
+def test_schedule():
+    '''Тест функции schedule.
+    '''
+    release = threading.Event()
+    refilled = []
+
+    def refill(user_id):
+        release.wait(timeout=5)
+        refilled.append((user_id, get_priority('photos.get')))
+
+    prefetcher = Prefetcher(refill, evict=lambda user_id: None, idle_timeout=600)
+    for _ in range(3):
+        prefetcher.schedule(1)
+    release.set()
+    prefetcher.shutdown()
+    assert refilled == [(1, PRIORITY_BACKGROUND)]
+    assert prefetcher.stats['completed'] == 1
+
+
+def test_evict_idle():
+    '''Тест функции evict_idle.
+    '''
+    evicted = []
+    prefetcher = Prefetcher(refill=lambda user_id: None, evict=evicted.append,
+                            idle_timeout=0.1)
+    prefetcher.touch(1)
+    time.sleep(0.15)
+    prefetcher.touch(2)
+    prefetcher.evict_idle()
+    prefetcher.shutdown()
+    assert evicted == [1]
+    assert prefetcher.stats['evicted'] == 1
@@ -0,0 +1,58 @@
+'''
+Модуль тестирования планировщика запросов модуля extrapacks.ratelimit.
+
+'''
+import sys
+import os
+import threading
+import time
+sys.path.append(os.getcwd())
+
+from extrapacks.ratelimit import (RateLimitScheduler, request_priority, get_priority,
+                                  PRIORITY_USER, PRIORITY_DEFAULT, PRIORITY_BACKGROUND)
+
+
+def test_get_priority():
+    '''Тест функции get_priority.
+    '''
+    assert get_priority('messages.send') == PRIORITY_USER
+    assert get_priority('photos.get') == PRIORITY_DEFAULT
+    with request_priority(PRIORITY_BACKGROUND):
+        assert get_priority('photos.get') == PRIORITY_BACKGROUND
+    assert get_priority('photos.get') == PRIORITY_DEFAULT
+
+
+def test_acquire_order_by_priority():
+    '''Тест выдачи разрешений на запросы в порядке приоритета.
+    '''
+    scheduler = RateLimitScheduler(rate=20, capacity=1)
+    scheduler.acquire()
+    order = []
+
+    def request(priority):
+        scheduler.acquire(priority)
+        order.append(priority)
+
+    threads = [threading.Thread(target=request, args=(priority,))
+               for priority in (PRIORITY_BACKGROUND, PRIORITY_DEFAULT, PRIORITY_USER)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+    assert order == [PRIORITY_USER, PRIORITY_DEFAULT, PRIORITY_BACKGROUND]
+
+    result_func = scheduler.get_stats()
+    assert result_func['queued'] == 0
+    assert result_func['priorities'][PRIORITY_BACKGROUND]['waited'] == 1
+    assert result_func['priorities'][PRIORITY_BACKGROUND]['max_wait'] > 0.05
+
+
+def test_set_rate():
+    '''Тест изменения скорости пополнения корзины.
+    '''
+    scheduler = RateLimitScheduler(rate=20, capacity=10)
+    scheduler.set_rate(5)
+    assert scheduler._bucket.rate == 5
+    assert scheduler._bucket.capacity == 2.5
+    assert scheduler._bucket.tokens <= 2.5
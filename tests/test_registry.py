@@ -0,0 +1,65 @@
+'''
+Модуль тестирования классов BloomFilter, UserRegistry модуля extrapacks.registry.
+
+'''
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from extrapacks.registry import BloomFilter, UserRegistry
+
+
+def test_bloom_filter():
+    '''Тест отсутствия ложноотрицательных ответов и доли ложноположительных.
+    '''
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    bloom.update(range(0, 20000, 2))
+    assert all(item in bloom for item in range(0, 20000, 2))
+    false_positive = sum(item in bloom for item in range(1, 20000, 2))
+    assert false_positive < 10000 * 0.02
+    assert len(bloom.bits) < 10000 * 10 // 8 + 1024
+
+
+def test_registry_before_build():
+    '''Тест проверки регистрации запросом к базе данных до построения фильтра.
+    '''
+    probes = []
+    registry = UserRegistry(probe=lambda user_id: probes.append(user_id) or user_id == 1,
+                            load_ids=lambda: iter(()), count=lambda: 0)
+    assert registry.check(1) is True
+    assert registry.check(2) is False
+    assert probes == [1, 2]
+
+
+def test_registry_filter():
+    '''Тест отсечения незарегистрированных пользователей фильтром.
+    '''
+    users = set(range(1, 1000))
+    probes = []
+    registry = UserRegistry(probe=lambda user_id: probes.append(user_id) or user_id in users,
+                            load_ids=lambda: iter(users), count=lambda: len(users))
+    registry.add(5000)
+    users.add(5000)
+    registry.start()
+    assert registry.wait(5)
+    assert all(registry.check(user_id) for user_id in users)
+    assert len(probes) == len(users)
+    probes.clear()
+    assert not any(registry.check(user_id) for user_id in range(10000, 20000))
+    assert len(probes) < 10000 * 0.05
+    assert registry.stats['filtered'] + registry.stats['probes'] == 10000 + len(users)
+
+
+def test_registry_restart():
+    '''Тест перестроения фильтра с учетом пользователей, зарегистрированных после построения.
+    '''
+    users = set(range(1, 100))
+    registry = UserRegistry(probe=lambda user_id: user_id in users,
+                            load_ids=lambda: iter(list(users)), count=lambda: len(users))
+    registry.start()
+    assert registry.wait(5)
+    users.add(5000)
+    assert registry.check(5000) is False
+    registry.start()
+    assert registry.wait(5)
+    assert registry.check(5000) is True
@@ -0,0 +1,89 @@
+'''
+Модуль тестирования распределения событий по процессам модуля extrapacks.sharding.
+
+'''
+from collections import defaultdict
+import functools
+import multiprocessing
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from vk_api.longpoll import Event
+
+from extrapacks.sharding import ShardRouter, shard_of
+
+
+class RecordingBot:
+    '''Бот процесса-обработчика, передающий полученные события в очередь output.
+    '''
+    def __init__(self, output):
+        self.output = output
+        self.shard = None
+
+    def start(self, shard: int=None):
+        self.shard = shard
+
+    def dispatch(self, event):
+        self.output.put(('event', self.shard, event.user_id, event.text))
+
+    def release_users(self, keep) -> int:
+        self.output.put(('release', self.shard))
+        return 0
+
+    def set_rate_share(self, share: float):
+        pass
+
+    def shutdown(self):
+        self.output.put(('stop', self.shard))
+
+
+def create_event(user_id: int, text: str) -> Event:
+    '''Функция создания события нового сообщения.
+    '''
+    return Event([4, 1, 1, user_id, 0, text, {}, {}])
+
+
+def test_shard_of():
+    '''Тест равномерного и стабильного распределения пользователей.
+    '''
+    counts = [0] * 4
+    for user_id in range(100000, 110000):
+        counts[shard_of(user_id, 4)] += 1
+    assert min(counts) > 2000
+    assert shard_of(123456789, 4) == shard_of(123456789, 4)
+
+
+def test_router_resize():
+    '''Тест распределения событий по процессам до и после изменения количества процессов.
+    '''
+    output = multiprocessing.get_context('spawn').Queue()
+    router = ShardRouter(functools.partial(RecordingBot, output), processes=2)
+    router.start()
+    users = range(1, 31)
+    for index in range(3):
+        for user_id in users:
+            router.submit(create_event(user_id, f'before {index}'))
+    router.resize(3)
+    for user_id in users:
+        router.submit(create_event(user_id, 'after'))
+    router.shutdown()
+
+    records = []
+    while (stops := sum(record[0] == 'stop' for record in records)) < 3:
+        records.append(output.get(timeout=30))
+    assert stops == 3
+    assert sorted(record[1] for record in records if record[0] == 'release') == [0, 1]
+
+    handled = defaultdict(list)
+    for kind, *values in records:
+        if kind == 'event':
+            shard, user_id, text = values
+            handled[user_id].append((text, shard))
+    for user_id in users:
+        assert handled[user_id] == [('before 0', shard_of(user_id, 2)),
+                                    ('before 1', shard_of(user_id, 2)),
+                                    ('before 2', shard_of(user_id, 2)),
+                                    ('after', shard_of(user_id, 3))]
+    assert sum(router.stats['events']) == len(users) * 4
+    assert router.stats['rebalances'] == 1
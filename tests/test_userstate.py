@@ -0,0 +1,125 @@
+'''
+Модуль тестирования классов UserSession, UserStateStore модуля extrapacks.userstate.
+
+'''
+from collections import deque
+import threading
+import sys
+import os
+import time
+sys.path.append(os.getcwd())
+
+from extrapacks.cursor import SearchCursor
+from extrapacks.userstate import UserSession, UserStateStore
+
+
+def test_get_or_create():
+    '''Тест функций get, get_or_create.
+    '''
+    store = UserStateStore(max_sessions=10, max_objects=1000, idle_timeout=60)
+    assert store.get(1) is None
+    session = store.get_or_create(1)
+    assert store.get_or_create(1) is session
+    assert session.current_partner is None
+    assert 1 in store
+    assert list(store) == [1]
+    assert store.get_stats()['created'] == 1
+
+
+def test_slots():
+    '''Тест фиксированного набора полей записи.
+    '''
+    session = UserSession(1)
+    assert not hasattr(session, '__dict__')
+
+
+def test_weight():
+    '''Тест оценки объема записи.
+    '''
+    session = UserSession(1)
+    assert session.weight() == 1
+    session.cards = deque([{}, {}])
+    session.ignored = {1, 2, 3}
+    session.search_cursor = SearchCursor({}, seen={4, 5}, page_size=200)
+    session.all_partners = iter(())
+    assert session.weight() == 1 + 2 + 3 + 2 + 200
+    session.clear_search()
+    assert session.weight() == 4
+
+
+def test_lru_eviction():
+    '''Тест удаления давно не использовавшихся записей при превышении количества записей.
+    '''
+    evicted = []
+    store = UserStateStore(max_sessions=2, max_objects=1000, idle_timeout=60,
+                           on_evict=lambda session: evicted.append(session.user_id))
+    store.get_or_create(1)
+    store.get_or_create(2)
+    store.get(1)
+    store.get_or_create(3)
+    assert evicted == [2]
+    assert sorted(store) == [1, 3]
+
+
+def test_retained_partner():
+    '''Тест восстановления отображаемого партнера после удаления записи.
+    '''
+    store = UserStateStore(max_sessions=1, max_objects=1000, idle_timeout=60, max_retained=1)
+    store.get_or_create(1).current_partner = {'id': 10}
+    store.get_or_create(2)
+    assert 1 not in store
+    assert store.get_stats()['retained'] == 1
+    assert store.get_or_create(1).current_partner == {'id': 10}
+    assert store.get_stats()['retained'] == 0
+
+    # сохраняется не более max_retained последних партнеров: партнер пользователя 1
+    # вытесняется партнером пользователя 2
+    store.get_or_create(2).current_partner = {'id': 20}
+    store.get_or_create(3)
+    assert store.get_or_create(1).current_partner is None
+    assert store.get_or_create(2).current_partner == {'id': 20}
+
+
+def test_objects_cap():
+    '''Тест удаления записей при превышении суммарного объема.
+    '''
+    store = UserStateStore(max_sessions=10, max_objects=10, idle_timeout=60)
+    store.get_or_create(1).ignored = set(range(8))
+    store.get_or_create(2).ignored = set(range(5))
+    store.trim(force=True)
+    assert list(store) == [2]
+
+
+def test_idle_eviction():
+    '''Тест удаления записей неактивных пользователей.
+    '''
+    store = UserStateStore(max_sessions=10, max_objects=1000, idle_timeout=0.05)
+    store.get_or_create(1)
+    time.sleep(0.1)
+    store.get_or_create(2)
+    store.trim(force=True)
+    assert list(store) == [2]
+
+
+def test_locked_not_evicted():
+    '''Тест сохранения записи, заблокированной другим потоком.
+    '''
+    store = UserStateStore(max_sessions=1, max_objects=1000, idle_timeout=60)
+    session = store.get_or_create(1)
+    locked = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with session.lock:
+            locked.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    locked.wait()
+    store.get_or_create(2)
+    assert 1 in store and 2 in store
+    release.set()
+    thread.join()
+    store.get_or_create(3)
+    assert 1 not in store
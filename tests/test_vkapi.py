@@ -32,13 +32,13 @@ def test_find_all_partners():
         'sex': 1
     }
     vkapi = VkontakteAPI(VKUSER_TOKEN)
-    vkapi.user_state[863244386] = {}
     vkapi.find_all_partners(user_info)
-    assert isinstance(vkapi.user_state[863244386]['all_partners'], Generator)
-    partner_info = next(vkapi.user_state[863244386]['all_partners'])
+    session = vkapi.user_state.get(863244386)
+    assert isinstance(session.all_partners, Generator)
+    partner_info = next(session.all_partners)
     assert isinstance(partner_info, dict)
     counter = 0
-    for _ in vkapi.user_state[863244386]['all_partners']:
+    for _ in session.all_partners:
         counter += 1
         if counter == 5:
             break
@@ -54,10 +54,9 @@ def test_get_partner():
         'sex': 1
     }
     vkapi = VkontakteAPI(VKUSER_TOKEN)
-    vkapi.user_state[863244386] = {}
     vkapi.find_all_partners(user_info)
     vkapi.get_partner(863244386)
-    assert isinstance(vkapi.user_state[863244386]['current_partner'], dict)
+    assert isinstance(vkapi.user_state.get(863244386).current_partner, dict)
 
 def test_get_partner_photos():
     '''Тест функции get_partner_photos.
@@ -68,3 +67,30 @@ def test_get_partner_photos():
     result_func = list(result_func)
     assert len(result_func) == 3
     assert isinstance(result_func[0], int)
+
+def test_get_partners_photos():
+    '''Тест функции get_partners_photos.
+    '''
+    vkapi = VkontakteAPI(VKUSER_TOKEN)
+    result_func = vkapi.get_partners_photos([863244386, 1])
+    assert isinstance(result_func, dict)
+    assert list(result_func) == [863244386, 1]
+    assert len(result_func[863244386]) == 3
+    assert all(isinstance(photo_id, int) for photo_id in result_func[863244386])
+
+def test_build_partner_card():
+    '''Тест функции build_partner_card.
+    '''
+    partner_info = {'id': 1, 'first_name': 'Павел', 'last_name': 'Дуров'}
+    result_func = VkontakteAPI.build_partner_card(partner_info, [10, 11])
+    assert result_func['id'] == 1
+    assert result_func['message'] == 'Павел Дуров\nhttps://vk.com/id1'
+    assert result_func['attachment'] == 'photo1_10,photo1_11'
+
+def test_get_partners_photos_cached():
+    '''Тест получения фотографий партнеров из кэша photos_cache без запросов к API.
+    '''
+    vkapi = VkontakteAPI(VKUSER_TOKEN)
+    vkapi.photos_cache.set_many({1: [10, 11, 12], 2: []})
+    result_func = vkapi.get_partners_photos([2, 1])
+    assert result_func == {2: [], 1: [10, 11, 12]}
@@ -0,0 +1,187 @@
+'''
+Модуль тестирования класса VkontakteBot модуля main.
+
+Запросы к API выполняются к локальному серверу tests.fake_vk, для работы
+требуется доступная база данных. По окончании тестирования удаляет все тестовые данные.
+
+'''
+import json
+import sys
+import os
+import threading
+sys.path.append(os.getcwd())
+
+import pytest
+
+import main
+from main import Buttons, VkontakteBot
+from models import Users, Partners, UsersPartners, SearchCursors, DatabaseConfig
+from extrapacks.longpoll import ResilientLongPoll
+from tests.fake_vk import FakeVkServer
+
+
+USER_ID = 930000001
+NEW_USER_ID = 930000002
+PARTNERS_START = 930000100
+FAVORITES = 25
+
+
+@pytest.fixture(scope='module', autouse=True)
+def filling_delete_test_data():
+    '''Фикстура добавления и удаления тестовых данных.
+    '''
+    with DatabaseConfig.Session() as tsession:
+        tsession.add(Users(id_user=USER_ID, id_city=1, age=25, sex=1))
+        for index in range(FAVORITES * 2):
+            partner_id = PARTNERS_START + index
+            model = Partners(id_partner=partner_id, first_name='Тест', last_name='Тест',
+                             link=f'https://vk.com/id{partner_id}')
+            model.users_partners = [UsersPartners(id_user=USER_ID, ignore=bool(index % 2))]
+            tsession.add(model)
+        tsession.commit()
+
+    yield
+
+    with DatabaseConfig.Session() as tsession:
+        tsession.query(SearchCursors).\
+            filter(SearchCursors.id_user.in_([USER_ID, NEW_USER_ID])).delete()
+        tsession.query(UsersPartners).filter(UsersPartners.id_user == USER_ID).delete()
+        tsession.query(Partners).\
+            filter(Partners.id_partner.between(PARTNERS_START, PARTNERS_START + FAVORITES * 2)).\
+            delete()
+        tsession.query(Users).filter(Users.id_user.in_([USER_ID, NEW_USER_ID])).delete()
+        tsession.commit()
+
+
+@pytest.fixture
+def bot():
+    '''Фикстура бота, отправляющего запросы к локальному серверу API.
+    '''
+    with FakeVkServer() as server:
+        vkbot = VkontakteBot(token='test-vkbot')
+        server.mount(vkbot.http)
+        vkbot.server = server
+        yield vkbot
+
+
+def get_page(vkbot: VkontakteBot) -> tuple:
+    '''Функция разбора последнего отправленного сообщения: номера партнеров и кнопки.
+    '''
+    values = vkbot.server.sent_messages[-1]
+    numbers = [int(line.split('.')[0]) for line in values['message'].splitlines()[1::2]]
+    labels = []
+    if values.get('keyboard'):
+        buttons = json.loads(values['keyboard'])['buttons']
+        labels = [button['action']['label'] for line in buttons for button in line]
+    return numbers, labels
+
+
+def test_show_favorite_partners_pages(bot, monkeypatch):
+    '''Тест постраничного вывода избранных партнеров одним сообщением.
+    '''
+    monkeypatch.setattr(main, 'FAVORITES_PAGE_SIZE', 10)
+    bot.show_favorite_partners(USER_ID)
+    assert get_page(bot) == (list(range(1, 11)), [Buttons.favorites_next_label])
+
+    bot.show_favorite_partners(USER_ID, step=1)
+    assert get_page(bot) == (list(range(11, 21)), [Buttons.favorites_prev_label,
+                                                   Buttons.favorites_next_label])
+    bot.show_favorite_partners(USER_ID, step=1)
+    assert get_page(bot) == (list(range(21, 26)), [Buttons.favorites_prev_label])
+    bot.show_favorite_partners(USER_ID, step=1)
+    assert get_page(bot)[0] == list(range(21, 26))
+
+    bot.show_favorite_partners(USER_ID, step=-1)
+    assert get_page(bot)[0] == list(range(11, 21))
+    assert bot.server.calls['messages.send'] == 5
+
+
+def test_search_exact_ages(bot):
+    '''Тест запроса с точным возрастным окном пользователя (SEARCH_AGE_BAND = 0).
+    '''
+    bot.server.mount(bot.api_user_token.http)
+    bot.find_all_partners({'id_user': USER_ID, 'sex': 1, 'id_city': 5, 'age': 26})
+    session = bot.user_state.get(USER_ID)
+    assert session.search_cursor.params['age_from'] == 21
+    assert session.search_cursor.params['age_to'] == 31
+    assert 'fields' not in session.search_cursor.params and session.age_range is None
+    assert len(bot.collect_candidates(USER_ID, count=50)) == 50
+
+
+def test_search_cache_overlapping_ages(bot, monkeypatch):
+    '''Тест общей страницы результатов поиска для пользователей с разными,
+       но пересекающимися возрастными окнами.
+    '''
+    monkeypatch.setattr(main, 'SEARCH_AGE_BAND', 5)
+    bot.server.mount(bot.api_user_token.http)
+    ages = {USER_ID: 26, NEW_USER_ID: 28}
+    for user_id, age in ages.items():
+        bot.find_all_partners({'id_user': user_id, 'sex': 1, 'id_city': 4, 'age': age})
+        candidates = bot.collect_candidates(user_id, count=50)
+        assert len(candidates) == 50
+        cursor = bot.user_state.get(user_id).search_cursor
+        page = bot.search_users(dict(cursor.params, offset=0, count=cursor.page_size))
+        bdates = {item['id']: item['bdate'] for item in page['items']}
+        for partner in candidates:
+            assert age - 5 <= bot.get_age(bdates[partner['id']]) <= age + 5
+    assert bot.server.calls['users.search'] == 1
+    assert bot.search_cache.get_stats()['hits'] >= 1
+    assert bot.user_state.get(USER_ID).age_range == (21, 31)
+
+
+def test_reaction_without_partner(bot):
+    '''Тест реакции, которую нельзя отнести к партнеру (карточка не найдена в состоянии
+       пользователя): пользователь получает предупреждение и следующую карточку.
+    '''
+    bot.server.mount(bot.api_user_token.http)
+    bot.reaction_like_handling(USER_ID)
+    messages = [values['message'] for values in bot.server.sent_messages]
+    assert len(messages) == 2
+    assert messages[0].startswith('Не удалось определить')
+    assert messages[1] == bot.user_state.get(USER_ID).current_partner['message']
+
+
+def test_longpoll_messages(bot):
+    '''Тест обработки сообщений, полученных от Long Poll сервера, до команды 'Стоп'.
+    '''
+    def create_longpoll():
+        longpoll = ResilientLongPoll(bot, wait=1)
+        bot.server.mount(longpoll.session)
+        return longpoll
+
+    bot.create_longpoll = create_longpoll
+    thread = threading.Thread(target=bot)
+    thread.start()
+    # фильтр регистрации строится после подключения к Long Poll серверу
+    assert bot.registry.wait(timeout=10)
+    bot.server.push_message(NEW_USER_ID, 'Начать')
+    assert bot.server.wait_replies(NEW_USER_ID, 2)
+    bot.server.push_message(NEW_USER_ID, Buttons.favorites_label)
+    assert bot.server.wait_replies(NEW_USER_ID, 1)
+    bot.server.push_message(NEW_USER_ID, 'Стоп')
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert bot.server.calls['users.get'] == 1
+    assert [values['message'].split()[0] for values in bot.server.sent_messages] == \
+        ['Доброго', 'Для', 'В']
+
+
+def test_partners_exhausted(bot):
+    '''Тест окончания результатов поиска: пользователь получает предупреждение
+       с кнопкой поиска сначала, сохраненный курсор удаляется.
+    '''
+    bot.server.mount(bot.api_user_token.http)
+    bot.server.search_total = 3
+    bot.start_searching_handling(USER_ID)
+    while bot.user_state.get(USER_ID).current_partner is not None:
+        bot.show_found_people(USER_ID)
+    values = bot.server.sent_messages[-1]
+    assert values['message'].startswith('К сожалению, партнеры закончились')
+    assert values['keyboard'] == Buttons.get_keyboard('update')
+    assert main.Database.get_search_cursor(USER_ID) is None
+    assert bot.user_state.get(USER_ID).search_cursor is None
+
+    # поиск начинается сначала
+    bot.show_found_people(USER_ID)
+    assert bot.user_state.get(USER_ID).current_partner is not None
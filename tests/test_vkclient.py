@@ -0,0 +1,99 @@
+'''
+Модуль тестирования клиентов API модуля extrapacks.vkclient.
+Запросы выполняются к локальному серверу tests.fake_vk.
+
+'''
+import asyncio
+import logging
+import sys
+import os
+import time
+sys.path.append(os.getcwd())
+
+import vk_api
+
+from extrapacks.vkclient import PooledVkApi, AsyncVkClient
+from tests.fake_vk import FakeVkServer
+
+
+def test_pooled_session_per_token():
+    '''Тест использования одной HTTP-сессии для экземпляров с одним токеном.
+    '''
+    first = PooledVkApi(token='session-token')
+    second = PooledVkApi(token='session-token')
+    other = PooledVkApi(token='other-session-token')
+    assert first.http is second.http
+    assert first.http is not other.http
+
+
+def test_pool_settings_conflict(caplog):
+    '''Тест предупреждения о неприменяемых параметрах пула соединений токена.
+    '''
+    first = PooledVkApi(token='conflict-token', pool_size=4, max_in_flight=4)
+    with caplog.at_level(logging.WARNING):
+        PooledVkApi(token='conflict-token', pool_size=4, max_in_flight=4)
+        assert not caplog.records
+        second = PooledVkApi(token='conflict-token', pool_size=8, max_in_flight=2)
+    assert 'не применены' in caplog.text
+    assert second.in_flight is first.in_flight
+
+
+def test_method():
+    '''Тест функции method.
+    '''
+    with FakeVkServer() as server:
+        vk = PooledVkApi(token='method-token')
+        server.mount(vk.http)
+        result_func = vk.method('users.get', {'user_ids': 863244386})
+        assert result_func[0]['id'] == 863244386
+        try:
+            vk.method('unknown.method')
+        except vk_api.ApiError as error:
+            assert error.code == 3
+        else:
+            assert False
+
+
+def test_async_throughput():
+    '''Тест пропускной способности асинхронного клиента в сравнении с VkApi.method.
+    '''
+    calls = 20
+    with FakeVkServer(latency=0.05) as server:
+        vk = vk_api.VkApi(token='baseline-token')
+        vk.RPS_DELAY = 0
+        server.mount(vk.http)
+        start = time.perf_counter()
+        for index in range(calls):
+            vk.method('photos.get', {'owner_id': index + 1})
+        baseline = time.perf_counter() - start
+
+        pooled = PooledVkApi(token='async-token', rps=1000, max_in_flight=5)
+        server.mount(pooled.http)
+        client = AsyncVkClient(pooled, max_in_flight=10)
+        server.max_in_flight = 0
+        start = time.perf_counter()
+        result_func = asyncio.run(client.gather(
+            ('photos.get', {'owner_id': index + 1}) for index in range(calls)))
+        pooled_time = time.perf_counter() - start
+        client.close()
+
+    assert [item['items'][0]['owner_id'] for item in result_func] == list(range(1, calls + 1))
+    assert server.max_in_flight <= 5
+    assert pooled_time * 2 < baseline
+
+
+def test_rate_limit_shared_by_token():
+    '''Тест ограничения частоты запросов общим планировщиком токена.
+    '''
+    with FakeVkServer() as server:
+        first = PooledVkApi(token='limited-token', rps=10)
+        second = PooledVkApi(token='limited-token', rps=10)
+        server.mount(first.http)
+        assert first.scheduler is second.scheduler
+        start = time.perf_counter()
+        for vk in (first, second) * 10:
+            vk.method('users.get', {'user_ids': 1})
+        assert time.perf_counter() - start >= 0.9
+        stats = first.scheduler.get_stats()['priorities']
+        assert stats[1]['calls'] == 20
+        assert stats[1]['waited'] >= 9
@@ -0,0 +1,41 @@
+'''
+Модуль тестирования класса WriteBehindBuffer модуля extrapacks.writebehind.
+
+'''
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from extrapacks.writebehind import WriteBehindBuffer
+
+
+def test_batches():
+    '''Тест пакетной записи накопленных записей.
+    '''
+    batches = []
+    buffer = WriteBehindBuffer(batches.append, interval=60, max_batch=1000)
+    for item in range(10):
+        buffer.add(item)
+    buffer.flush()
+    buffer.add(10)
+    buffer.close()
+    assert batches == [list(range(10)), [10]]
+    assert buffer.stats == {'items': 11, 'batches': 2, 'failed': 0}
+
+
+def test_failed_item():
+    '''Тест повтора записи по одной при ошибке записи пакета.
+    '''
+    written = []
+
+    def flush(items):
+        if 'error' in items:
+            raise ValueError
+        written.extend(items)
+
+    buffer = WriteBehindBuffer(flush, interval=60)
+    for item in (1, 'error', 2):
+        buffer.add(item)
+    buffer.close()
+    assert written == [1, 2]
+    assert buffer.stats['failed'] == 1